@@ -70,7 +70,7 @@ def create_app(env='default'):
     login_mgr.init_app(app)
     csrf.init_app(app)
     limiter.init_app(app)
-    socketio.init_app(app)
+    socketio.init_app(app, message_queue=app.config.get('SOCKETIO_MESSAGE_QUEUE') or None)
     jwt.init_app(app)
     cors_ext.init_app(app, resources={r'/api/*': {'origins': '*'}})
 
@@ -119,24 +119,31 @@ def create_app(env='default'):
 
     @app.before_request
     def update_last_active():
-        """Update last_active_at at most once per hour to avoid per-request DB writes."""
+        """Record HTTP activity in the Redis presence set (at most once a minute).
+        users.last_active_at is written in bulk by the presence-flush Beat task,
+        so this never touches the database."""
         from flask_login import current_user
         from flask import session
         if not current_user.is_authenticated:
             return
-        from datetime import datetime
-        now      = datetime.utcnow()
-        last_str = session.get('_last_active_written')
-        if last_str:
-            try:
-                last_dt = datetime.fromisoformat(last_str)
-                if (now - last_dt).total_seconds() < 3600:
-                    return
-            except (ValueError, TypeError):
-                pass
-        current_user.last_active_at = now
-        db.session.commit()
-        session['_last_active_written'] = now.isoformat()
+        import time
+        now  = int(time.time())
+        last = session.get('_last_active_ping')
+        if isinstance(last, int) and now - last < 60:
+            return
+        from app.presence import heartbeat
+        heartbeat(current_user.id, online=False)
+        session['_last_active_ping'] = now
+
+    from app.utils import register_session_hooks
+    register_session_hooks()        # after-commit callbacks (live notification bell)
+
+    @app.teardown_request
+    def flush_notifications(exc=None):
+        """Write notifications queued via queue_notification() in one INSERT."""
+        if exc is None:
+            from app.utils import flush_notification_buffer
+            flush_notification_buffer()
 
     @app.before_request
     def enforce_phone_verification():
@@ -205,38 +212,16 @@ def create_app(env='default'):
     @app.context_processor
     def inject_globals():
         from flask_login import current_user
-        from app.models import Interest, Message, Conversation, Notification
-        from app.cache import cache_get, cache_set
         unread_messages   = 0
         pending_interests = 0
         unread_notifs     = 0
         if current_user.is_authenticated:
-            cache_key = f'ctx_globals:{current_user.id}'
-            cached = cache_get(cache_key)
-            if cached:
-                unread_messages   = cached['unread_messages']
-                pending_interests = cached['pending_interests']
-                unread_notifs     = cached['unread_notifs']
-            else:
-                unread_messages = (Message.query
-                                   .join(Conversation)
-                                   .filter(
-                                       Message.sender_id != current_user.id,
-                                       Message.is_read   == False,
-                                       ((Conversation.user1_id == current_user.id) |
-                                        (Conversation.user2_id == current_user.id))
-                                   ).count())
-                pending_interests = (Interest.query
-                                     .filter_by(receiver_id=current_user.id, status='pending')
-                                     .count())
-                unread_notifs = (Notification.query
-                                 .filter_by(user_id=current_user.id, is_read=False)
-                                 .count())
-                cache_set(cache_key, {
-                    'unread_messages':   unread_messages,
-                    'pending_interests': pending_interests,
-                    'unread_notifs':     unread_notifs,
-                }, ttl=60)
+            # One HGETALL — counters are maintained incrementally (app.counters)
+            from app.counters import get_badges
+            badges            = get_badges(current_user.id)
+            unread_messages   = badges['messages']
+            pending_interests = badges['interests']
+            unread_notifs     = badges['notifs']
         return dict(
             datetime=datetime, date=date,
             unread_messages=unread_messages,
@@ -255,6 +240,15 @@ def create_app(env='default'):
         except Exception:
             return image_url
 
+    @app.template_filter('signed_urls')
+    def signed_urls_filter(image_urls, expiry=3600):
+        """Template filter: {{ urls | signed_urls }} — batch form of signed_url."""
+        try:
+            from app.utils import get_signed_image_urls
+            return get_signed_image_urls(image_urls, expiry)
+        except Exception:
+            return list(image_urls)
+
     @app.template_filter('from_json')
     def from_json_filter(s):
         import json
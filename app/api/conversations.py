@@ -2,11 +2,10 @@
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import or_
-from app import db
-from app.models import Conversation, Message, User, Interest
+from sqlalchemy.orm import joinedload
+from app.models import Conversation, User
 from app.api.errors import api_ok, api_error, NOT_FOUND, FORBIDDEN, VALIDATION_ERROR
 from app.api.schemas import conv_summary_schema, convs_summary_schema, message_schema, messages_schema
-from app.cache import cache_delete
 
 conversations_api_bp = Blueprint('conversations_api', __name__)
 
@@ -28,7 +27,11 @@ def list_conversations():
     per  = min(50, request.args.get('per_page', 20, type=int))
     q = (Conversation.query
          .filter(or_(Conversation.user1_id == uid, Conversation.user2_id == uid))
-         .order_by(Conversation.updated_at.desc()))
+         .options(
+             joinedload(Conversation.user1).selectinload(User.profile_images),
+             joinedload(Conversation.user2).selectinload(User.profile_images),
+         )
+         .order_by(Conversation.last_message_at.desc()))
     total = q.count()
     convs = q.offset((page - 1) * per).limit(per).all()
     return api_ok(convs_summary_schema.dump(convs),
@@ -44,21 +47,11 @@ def get_messages(conv_id):
     if err:
         return err
 
-    # Cursor-based pagination: before=<message_id>
+    # Keyset pagination: before=<message_id> (exclusive), newest page first
+    from app.messaging.service import history_page
     before = request.args.get('before', type=int)
-    per    = min(50, request.args.get('per_page', 30, type=int))
-
-    q = conv.messages.order_by(Message.sent_at.desc())
-    if before:
-        pivot = Message.query.get(before)
-        if pivot:
-            q = q.filter(Message.sent_at < pivot.sent_at)
-    msgs = q.limit(per).all()
-    msgs = list(reversed(msgs))   # chronological order
-
-    has_more = False
-    if msgs:
-        has_more = (conv.messages.filter(Message.sent_at < msgs[0].sent_at).count() > 0)
+    per    = max(1, min(50, request.args.get('per_page', 30, type=int)))
+    msgs, has_more = history_page(conv, uid, before=before, limit=per)
 
     return api_ok(messages_schema.dump(msgs),
                   meta={'has_more': has_more,
@@ -74,17 +67,10 @@ def send_message(conv_id):
     if err:
         return err
 
-    # Must have accepted interest to message
-    u1, u2 = conv.user1_id, conv.user2_id
-    accepted = (Interest.query
-                .filter(
-                    Interest.status == 'accepted',
-                    or_(
-                        (Interest.sender_id == u1) & (Interest.receiver_id == u2),
-                        (Interest.sender_id == u2) & (Interest.receiver_id == u1),
-                    )
-                ).first())
-    if not accepted:
+    # Accepted interest or a messaging plan, and no block (cached capability)
+    from app.capabilities import can_message
+    other_uid = conv.user2_id if uid == conv.user1_id else conv.user1_id
+    if not can_message(uid, other_uid):
         return api_error(FORBIDDEN, 'Interest must be accepted before messaging', 403)
 
     data = request.get_json(silent=True) or {}
@@ -94,23 +80,8 @@ def send_message(conv_id):
     if len(body) > 2000:
         return api_error(VALIDATION_ERROR, 'Message too long (max 2000 chars)')
 
-    from datetime import datetime as _dt
-    msg = Message(conversation_id=conv_id, sender_id=uid, body=body)
-    conv.updated_at = _dt.utcnow()
-    db.session.add(msg)
-    db.session.commit()
-    other_uid = conv.user2_id if uid == conv.user1_id else conv.user1_id
-    cache_delete(f'ctx_globals:{other_uid}')
-
-    # In-app notification (non-fatal)
-    try:
-        other_uid = conv.user2_id if uid == conv.user1_id else conv.user1_id
-        from app.utils import create_notification
-        create_notification(user_id=other_uid, notif_type='new_message',
-                            message=f'{me.full_name} sent you a message.',
-                            link=f'/messages/{conv_id}')
-    except Exception:
-        pass
+    from app.messaging.service import send_message as _send
+    msg = _send(conv, uid, body, notify=me.full_name)
 
     return api_ok(message_schema.dump(msg), status=201)
 
@@ -123,10 +94,6 @@ def mark_read(conv_id):
     if err:
         return err
 
-    (Message.query
-     .filter_by(conversation_id=conv_id, is_read=False)
-     .filter(Message.sender_id != uid)
-     .update({'is_read': True}))
-    db.session.commit()
-    cache_delete(f'ctx_globals:{uid}')
+    from app.messaging.service import mark_read as _mark_read
+    _mark_read(conv, uid)
     return api_ok({'success': True})
@@ -1,12 +1,13 @@
 """REST API interest endpoints — /api/v1/interests/*"""
-from flask import Blueprint, request
+from flask import Blueprint, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import or_
 from app import db, limiter
 from app.models import Interest, User, BlockList, Conversation
 from app.api.errors import api_ok, api_error, NOT_FOUND, FORBIDDEN, VALIDATION_ERROR
 from app.api.schemas import interest_schema, interests_schema
-from app.cache import cache_delete
+from app import counters as badges
+from app.capabilities import invalidate_pair
 
 interests_api_bp = Blueprint('interests_api', __name__)
 
@@ -83,19 +84,22 @@ def send_interest():
             plan.interests_this_month = (plan.interests_this_month or 0) + 1
             db.session.commit()
 
-    cache_delete(f'ctx_globals:{receiver_id}')
+    badges.incr(receiver_id, 'interests')
+    invalidate_pair(uid, receiver_id)
 
     # Side effects (non-fatal)
     try:
         from app.tasks import send_interest_email_task
-        send_interest_email_task.delay(receiver_id, me.full_name)
+        from app.dedupe import enqueue_once
+        enqueue_once(send_interest_email_task, f'interest-email:{uid}:{receiver_id}',
+                     current_app.config['INTEREST_EMAIL_DEDUPE'],
+                     receiver_id, me.full_name)
     except Exception:
         pass
     try:
-        from app.utils import create_notification, record_signal
-        create_notification(user_id=receiver_id, notif_type='interest_received',
-                            message=f'{me.full_name} sent you an interest request!',
-                            link='/interests')
+        from app.utils import notify_coalesced, record_signal
+        notify_coalesced(receiver_id, 'interest_received', me.full_name,
+                         link='/interests')
         record_signal(uid, receiver_id, 'interest_sent')
     except Exception:
         pass
@@ -171,12 +175,15 @@ def respond_interest(interest_id):
     if action not in ('accept', 'decline', 'withdraw'):
         return api_error(VALIDATION_ERROR, 'action must be accept | decline | withdraw')
 
+    was_pending = interest.status == 'pending'
     if action == 'withdraw':
         if interest.sender_id != uid:
             return api_error(FORBIDDEN, 'Not your interest to withdraw', 403)
         interest.status = 'withdrawn'
         db.session.commit()
-        cache_delete(f'ctx_globals:{interest.receiver_id}')
+        if was_pending:
+            badges.decr(interest.receiver_id, 'interests')
+        invalidate_pair(interest.sender_id, interest.receiver_id)
         return api_ok(interest_schema.dump(interest))
 
     # accept / decline — only receiver can act
@@ -200,10 +207,10 @@ def respond_interest(interest_id):
         except Exception:
             pass
         try:
-            from app.utils import create_notification, record_signal
-            create_notification(user_id=interest.sender_id, notif_type='interest_accepted',
-                                message=f'{me.full_name} accepted your interest! Start chatting.',
-                                link=f'/messages/{conv_id}')
+            from app.utils import queue_notification, record_signal
+            queue_notification(user_id=interest.sender_id, notif_type='interest_accepted',
+                               message=f'{me.full_name} accepted your interest! Start chatting.',
+                               link=f'/messages/{conv_id}')
             record_signal(uid, interest.sender_id, 'interest_accepted')
             record_signal(interest.sender_id, uid, 'interest_accepted')
         except Exception:
@@ -218,7 +225,9 @@ def respond_interest(interest_id):
         except Exception:
             pass
 
-    cache_delete(f'ctx_globals:{interest.sender_id}', f'ctx_globals:{interest.receiver_id}')
+    if was_pending:
+        badges.decr(interest.receiver_id, 'interests')
+    invalidate_pair(interest.sender_id, interest.receiver_id)
     out = interest_schema.dump(interest)
     if conv_id:
         out['conversation_id'] = conv_id
@@ -5,7 +5,8 @@ from app import db
 from app.models import Notification
 from app.api.errors import api_ok, api_error, NOT_FOUND
 from app.api.schemas import notification_schema, notifications_schema
-from app.cache import cache_delete
+from app.counters import get_badges, decr
+from app.utils import emit_notif_update
 
 notifications_api_bp = Blueprint('notifications_api', __name__)
 
@@ -29,9 +30,8 @@ def list_notifications():
 @notifications_api_bp.route('/unread-count', methods=['GET'])
 @jwt_required()
 def unread_count():
-    uid   = int(get_jwt_identity())
-    count = Notification.query.filter_by(user_id=uid, is_read=False).count()
-    return api_ok({'count': count})
+    uid = int(get_jwt_identity())
+    return api_ok({'count': get_badges(uid)['notifs']})
 
 
 @notifications_api_bp.route('/read', methods=['PATCH'])
@@ -49,5 +49,6 @@ def mark_read():
 
     updated = q.update({'is_read': True}, synchronize_session='fetch')
     db.session.commit()
-    cache_delete(f'ctx_globals:{uid}')
+    decr(uid, 'notifs', updated)
+    emit_notif_update([uid])
     return api_ok({'marked': updated})
@@ -142,10 +142,17 @@ def get_feed():
     start       = (page - 1) * per_page
     page_items  = scored[start:start + per_page]
 
+    # Presence for the whole page in one Redis round-trip
+    from app.presence import get_presence
+    presence = get_presence([u.id for _, u in page_items])
+
     serialized = []
     for score, u in page_items:
         d = profile_card_schema.dump(u)
         d['match_score'] = score
+        d['is_online']   = presence[u.id]['online']
+        if presence[u.id]['last_seen']:
+            d['last_active_at'] = presence[u.id]['last_seen'].isoformat()
         serialized.append(d)
 
     return api_ok(serialized, meta={
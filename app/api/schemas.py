@@ -26,6 +26,7 @@ class ProfileCardSchema(Schema):
     income_range   = fields.Method('get_income_range')
     photo_url      = fields.Method('get_photo_url')
     thumb_url      = fields.Method('get_thumb_url')
+    photo_srcset   = fields.Method('get_photo_srcset')
     match_score    = fields.Int(load_default=0)
     trust_tier     = fields.Method('get_trust_tier')
     trust_label    = fields.Method('get_trust_label')
@@ -93,6 +94,16 @@ class ProfileCardSchema(Schema):
                 return img.thumb_url or img.image_url
         return None
 
+    def get_photo_srcset(self, obj):
+        """{format: 'url 150w, url 400w, url 800w'} for the primary photo, URLs
+        signed for an hour — clients pick the smallest format they decode and
+        the width they need."""
+        for img in obj.profile_images:
+            if img.is_primary:
+                sets = {fmt: img.srcset(fmt) for fmt in ('avif', 'webp', 'jpeg')}
+                return {fmt: s for fmt, s in sets.items() if s} or None
+        return None
+
     def get_trust_tier(self, obj):
         score = 0
         if obj.is_verified:      score += 1
@@ -204,7 +215,10 @@ class ProfileFullSchema(ProfileCardSchema):
     def get_photos(self, obj):
         return [
             {'id': img.id, 'url': img.image_url,
-             'thumb': img.thumb_url, 'is_primary': img.is_primary}
+             'thumb': img.thumb_url, 'is_primary': img.is_primary,
+             'status': img.status,
+             'variants': [{'format': v.format, 'width': v.width, 'url': v.url}
+                          for v in img.variants]}
             for img in obj.profile_images
         ]
 
@@ -268,9 +282,14 @@ class MessageSchema(Schema):
     conversation_id = fields.Int(dump_only=True)
     sender_id       = fields.Int(dump_only=True)
     body            = fields.Str(dump_only=True)
-    is_read         = fields.Bool(dump_only=True)
+    is_read         = fields.Method('get_is_read')
     sent_at         = fields.DateTime(dump_only=True)
 
+    def get_is_read(self, obj):
+        # Derived from the conversation's read watermark (Message.is_read is
+        # no longer written) — kept so older app builds keep their ticks.
+        return obj.conversation.message_is_read(obj)
+
 
 class ConversationSummarySchema(Schema):
     id           = fields.Int(dump_only=True)
@@ -297,23 +316,20 @@ class ConversationSummarySchema(Schema):
         }
 
     def get_last_message(self, obj):
-        msg = obj.last_message()
-        if not msg:
+        # Denormalized on the conversation row — no per-conversation query
+        if obj.last_message_id is None:
             return None
-        return {'id': msg.id, 'body': msg.body, 'sender_id': msg.sender_id,
-                'sent_at': msg.sent_at.isoformat()}
+        return {'id': obj.last_message_id, 'body': obj.last_message_preview,
+                'sender_id': obj.last_message_sender_id,
+                'sent_at': obj.last_message_at.isoformat()}
 
     def get_unread_count(self, obj):
         from flask_jwt_extended import get_jwt_identity
-        from app.models import Message
         try:
             uid = int(get_jwt_identity())
         except Exception:
             return 0
-        return (Message.query
-                .filter_by(conversation_id=obj.id, is_read=False)
-                .filter(Message.sender_id != uid)
-                .count())
+        return obj.unread_count_for(uid)
 
 
 class NotificationSchema(Schema):
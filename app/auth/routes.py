@@ -246,59 +246,6 @@ def logout():
 
 
 # ── PHONE OTP ─────────────────────────────────────────────────────────────
-def _send_sms_otp(phone, otp):
-    """Send OTP via Fast2SMS (primary) → MSG91 (when DLT ready) → console (dev).
-    Priority: Fast2SMS if key set, else MSG91 if key set, else log to console.
-    Returns True on success."""
-    import requests as req
-
-    fast2sms_key = current_app.config.get('FAST2SMS_API_KEY', '')
-    msg91_key    = current_app.config.get('MSG91_AUTH_KEY', '')
-
-    # ── Fast2SMS (interim, no DLT needed) ────────────────────────────────
-    if fast2sms_key:
-        try:
-            resp = req.get(
-                "https://www.fast2sms.com/dev/bulkV2",
-                params={
-                    "authorization": fast2sms_key,
-                    "message":  f"Your iJodidar verification code is {otp}. Valid for 10 minutes. Do not share.",
-                    "route":    "q",
-                    "numbers":  phone,
-                },
-                headers={"cache-control": "no-cache"},
-                timeout=10,
-            )
-            data = resp.json()
-            if data.get('return') is True:
-                current_app.logger.info(f"Fast2SMS OTP sent to {phone}")
-                return True
-            current_app.logger.error(f"Fast2SMS error: {data}")
-        except Exception as e:
-            current_app.logger.error(f"Fast2SMS exception: {e}")
-        return False
-
-    # ── MSG91 (production, after DLT approval) ───────────────────────────
-    if msg91_key:
-        template_id = current_app.config.get('MSG91_TEMPLATE_ID', '')
-        try:
-            resp = req.post(
-                "https://api.msg91.com/api/v5/otp",
-                json={"template_id": template_id,
-                      "mobile": f"91{phone}",
-                      "authkey": msg91_key,
-                      "otp": otp},
-                timeout=10,
-            )
-            return resp.status_code == 200
-        except Exception as e:
-            current_app.logger.error(f"MSG91 error: {e}")
-            return False
-
-    # ── Dev fallback (no keys configured) ────────────────────────────────
-    current_app.logger.info(f"[DEV OTP] Phone: {phone}  OTP: {otp}")
-    return True
-
 
 @auth_bp.route('/send-phone-otp', methods=['POST'])
 @login_required
@@ -321,12 +268,13 @@ def send_phone_otp():
     current_user.phone_otp_expiry = expiry
     if number_changed:
         current_user.phone_verified = False   # must re-verify after number change
+    # Plaintext OTP goes to the SMS task via the outbox (cleared once sent) —
+    # the provider call never runs inside this request
+    from app import outbox
+    outbox.enqueue('send_sms_task', phone, otp)
     db.session.commit()
 
-    if _send_sms_otp(phone, otp):   # send plaintext OTP to user via SMS
-        flash('OTP sent to your phone. Enter it below to verify.', 'success')
-    else:
-        flash('Could not send OTP. Please try again later.', 'danger')
+    flash('OTP sent to your phone. Enter it below to verify.', 'success')
 
     return redirect(url_for('auth.verify_phone'))
 
@@ -353,7 +301,7 @@ def verify_phone():
 
             # Trigger referral reward now that phone is verified
             from app.models import Referral
-            from app.utils import reward_referrer, create_notification
+            from app.utils import create_notifications_bulk
             pending_ref = Referral.query.filter_by(
                 referred_id=current_user.id, rewarded_at=None
             ).first()
@@ -370,19 +318,17 @@ def verify_phone():
                         reward_referred(current_user)
                         pending_ref.referred_rewarded_at = datetime.utcnow()
 
+                    create_notifications_bulk([
+                        dict(user_id    = referrer.id,
+                             notif_type = 'system',
+                             message    = f'🎉 {current_user.full_name} verified their phone via your referral link! You earned 1 month Silver.',
+                             link       = '/referral'),
+                        dict(user_id    = current_user.id,
+                             notif_type = 'system',
+                             message    = '🎁 Welcome bonus! You got 15 days Silver free for joining via referral.',
+                             link       = '/plans'),
+                    ], commit=False)
                     db.session.commit()
-                    create_notification(
-                        user_id    = referrer.id,
-                        notif_type = 'system',
-                        message    = f'🎉 {current_user.full_name} verified their phone via your referral link! You earned 1 month Silver.',
-                        link       = '/referral',
-                    )
-                    create_notification(
-                        user_id    = current_user.id,
-                        notif_type = 'system',
-                        message    = '🎁 Welcome bonus! You got 15 days Silver free for joining via referral.',
-                        link       = '/plans',
-                    )
 
             flash('Phone verified! Trust badge added to your profile.', 'success')
             return redirect(url_for('main.my_profile'))
@@ -2,11 +2,13 @@
 Thin Redis cache helper — DB2 is reserved for app-layer caching.
 
 Usage:
-    from app.cache import cache_get, cache_set, cache_delete, cache_delete_prefix
+    from app.cache import cache_get, cache_get_many, cache_set, cache_delete, cache_delete_prefix
 
 Key conventions:
-    ctx_globals:{user_id}           — inject_globals() badge counts, TTL 60s
     match_score:{uid}:{candidate}   — calculate_match_score result, TTL 3600s
+    presence:*                      — online / last-seen sorted sets, see app.presence
+    cap_plan:{uid}, cap_pair:{a}:{b} — messaging capability, TTL 300s, see app.capabilities
+    badges:{user_id}                — unread badge counters (hash), see app.counters
 """
 import json
 import os
@@ -16,15 +18,18 @@ import redis
 _client = None
 
 
+def _redis_url():
+    base = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    # swap DB suffix to 2
+    if base.endswith('/0') or base.endswith('/1') or base.endswith('/4'):
+        base = base.rsplit('/', 1)[0]
+    return base.rstrip('/') + '/2'
+
+
 def _get_client():
     global _client
     if _client is None:
-        base = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
-        # swap DB suffix to 2
-        if base.endswith('/0') or base.endswith('/1') or base.endswith('/4'):
-            base = base.rsplit('/', 1)[0]
-        url = base.rstrip('/') + '/2'
-        _client = redis.from_url(url, decode_responses=True,
+        _client = redis.from_url(_redis_url(), decode_responses=True,
                                  socket_connect_timeout=1,
                                  socket_timeout=0.5)
     return _client
@@ -38,6 +43,15 @@ def cache_get(key):
         return None
 
 
+def cache_get_many(*keys):
+    """MGET — one round-trip; returns a list aligned with keys (None = miss)."""
+    try:
+        raws = _get_client().mget(keys) if keys else []
+        return [json.loads(r) if r is not None else None for r in raws]
+    except Exception:
+        return [None] * len(keys)
+
+
 def cache_set(key, value, ttl=60):
     try:
         _get_client().setex(key, ttl, json.dumps(value))
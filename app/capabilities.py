@@ -0,0 +1,93 @@
+"""
+Messaging capability — "can A message B?" computed once, cached in Redis.
+
+Usage:
+    from app.capabilities import can_message, invalidate_plan, invalidate_pair
+
+The answer splits into two independently cached halves so each invalidation
+is a single key delete:
+
+    cap_plan:{user_id}      — does user_id's active plan include messaging,
+                              and until when (plan expiry is checked on read,
+                              so an expired plan stops working before the
+                              hourly sweep runs)
+    cap_pair:{lo}:{hi}      — relationship between the two users:
+                              'blocked' | 'accepted' | 'none'
+
+can_message(a, b) = pair != 'blocked' and (plan(a) or pair == 'accepted')
+
+Both halves are fetched with one MGET. Invalidate with:
+    invalidate_plan(user_id)        — subscription activated / expired / changed
+    invalidate_pair(a, b)           — interest status change, block / unblock
+"""
+import time
+
+from app.cache import cache_get_many, cache_set, cache_delete
+
+CAP_TTL = 300   # seconds — short, invalidation is the primary freshness mechanism
+
+
+def _plan_key(user_id):
+    return f'cap_plan:{user_id}'
+
+
+def _pair_key(a, b):
+    lo, hi = sorted((int(a), int(b)))
+    return f'cap_pair:{lo}:{hi}'
+
+
+def _load_plan(user_id):
+    from app.models import User
+    user = User.query.get(user_id)
+    sub  = user.active_subscription if user else None
+    if not sub or not sub.plan or not sub.plan.can_message:
+        return {'can_message': False, 'expires': None}
+    return {'can_message': True,
+            'expires': sub.expires_at.timestamp() if sub.expires_at else None}
+
+
+def _load_pair(a, b):
+    from sqlalchemy import or_, and_
+    from app.models import BlockList, Interest
+    blocked = BlockList.query.filter(
+        or_(and_(BlockList.blocker_id == a, BlockList.blocked_id == b),
+            and_(BlockList.blocker_id == b, BlockList.blocked_id == a))
+    ).first()
+    if blocked:
+        return 'blocked'
+    accepted = Interest.query.filter(
+        or_(and_(Interest.sender_id == a, Interest.receiver_id == b),
+            and_(Interest.sender_id == b, Interest.receiver_id == a)),
+        Interest.status == 'accepted'
+    ).first()
+    return 'accepted' if accepted else 'none'
+
+
+def can_message(sender_id, receiver_id):
+    """True if sender_id may message receiver_id. One Redis MGET when warm."""
+    plan_key = _plan_key(sender_id)
+    pair_key = _pair_key(sender_id, receiver_id)
+    plan, pair = cache_get_many(plan_key, pair_key)
+
+    if pair is None:
+        pair = _load_pair(sender_id, receiver_id)
+        cache_set(pair_key, pair, ttl=CAP_TTL)
+    if pair == 'blocked':
+        return False
+    if pair == 'accepted':
+        return True
+
+    if plan is None:
+        plan = _load_plan(sender_id)
+        cache_set(plan_key, plan, ttl=CAP_TTL)
+    if not plan['can_message']:
+        return False
+    return plan['expires'] is None or plan['expires'] > time.time()
+
+
+def invalidate_plan(*user_ids):
+    cache_delete(*[_plan_key(u) for u in user_ids])
+
+
+def invalidate_pair(a, b):
+    cache_delete(_pair_key(a, b))
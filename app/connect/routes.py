@@ -1,7 +1,10 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort, current_app
 from flask_login import login_required, current_user
 from app import db, limiter
 from app.models import Interest, User, Shortlist, Conversation, BlockList, UserReport
+from app.capabilities import invalidate_pair
+from app import counters as badges
+from app import outbox
 
 connect_bp = Blueprint('connect', __name__)
 
@@ -57,6 +60,8 @@ def send_interest(receiver_id):
             existing.status  = 'pending'
             existing.message = request.form.get('message', '').strip()[:300]
             db.session.commit()
+            invalidate_pair(current_user.id, receiver_id)
+            badges.incr(receiver_id, 'interests')
             flash(f'Interest re-sent to {receiver.full_name}.', 'success')
         else:
             flash('You have already sent interest to this person.', 'info')
@@ -68,33 +73,32 @@ def send_interest(receiver_id):
         message     = request.form.get('message', '').strip()[:300],
         status      = 'pending',
     ))
+    # WhatsApp notification (Phase 14.3) — via the outbox, same transaction
+    if receiver.phone:
+        outbox.enqueue('send_whatsapp_task', receiver.phone, 'interest_received',
+                       [receiver.first_name, current_user.full_name])
     db.session.commit()
+    badges.incr(receiver_id, 'interests')
     # Track monthly interest count
     plan = current_user.active_subscription
     if plan:
         plan.interests_this_month = (plan.interests_this_month or 0) + 1
         db.session.commit()
 
-    # Async email via Celery
+    # Async email via Celery — once per sender → receiver per INTEREST_EMAIL_DEDUPE
     try:
         from app.tasks import send_interest_email_task
-        send_interest_email_task.delay(receiver_id, current_user.full_name)
+        from app.dedupe import enqueue_once
+        enqueue_once(send_interest_email_task, f'interest-email:{current_user.id}:{receiver_id}',
+                     current_app.config['INTEREST_EMAIL_DEDUPE'],
+                     receiver_id, current_user.full_name)
     except Exception:
         pass
 
-    # In-app notification
-    from app.utils import create_notification
-    create_notification(
-        user_id    = receiver_id,
-        notif_type = 'interest_received',
-        message    = f'{current_user.full_name} sent you an interest request!',
-        link       = f'/interests',
-    )
-    # WhatsApp notification (Phase 14.3)
-    from app.utils import send_whatsapp
-    if receiver.phone:
-        send_whatsapp(receiver.phone, 'interest_received',
-                      [receiver.first_name, current_user.full_name])
+    # In-app notification (coalesced: "X and N others sent you interest requests!")
+    from app.utils import notify_coalesced
+    notify_coalesced(receiver_id, 'interest_received', current_user.full_name,
+                     link='/interests')
 
     # Record behavior signal
     try:
@@ -120,6 +124,7 @@ def respond_interest(interest_id, action):
     interest = Interest.query.get_or_404(interest_id)
     if interest.receiver_id != current_user.id:
         abort(403)
+    was_pending = interest.status == 'pending'
 
     if action == 'accept':
         interest.status = 'accepted'
@@ -128,7 +133,14 @@ def respond_interest(interest_id, action):
         if not conv:
             conv = Conversation(user1_id=u1, user2_id=u2, interest_id=interest.id)
             db.session.add(conv)
+        # WhatsApp notification (Phase 14.3) — via the outbox, same transaction
+        if interest.sender.phone:
+            outbox.enqueue('send_whatsapp_task', interest.sender.phone, 'interest_accepted',
+                           [interest.sender.first_name, current_user.full_name])
         db.session.commit()
+        invalidate_pair(interest.sender_id, interest.receiver_id)
+        if was_pending:
+            badges.decr(current_user.id, 'interests')
 
         # Async email via Celery
         try:
@@ -139,18 +151,13 @@ def respond_interest(interest_id, action):
             pass
 
         # In-app notification to sender
-        from app.utils import create_notification
-        create_notification(
+        from app.utils import queue_notification
+        queue_notification(
             user_id    = interest.sender_id,
             notif_type = 'interest_accepted',
             message    = f'{current_user.full_name} accepted your interest! Start chatting.',
             link       = f'/messages/{conv.id}',
         )
-        # WhatsApp notification (Phase 14.3)
-        from app.utils import send_whatsapp
-        if interest.sender.phone:
-            send_whatsapp(interest.sender.phone, 'interest_accepted',
-                          [interest.sender.first_name, current_user.full_name])
 
         # Record acceptance signal for both sides
         try:
@@ -172,6 +179,9 @@ def respond_interest(interest_id, action):
     elif action == 'decline':
         interest.status = 'declined'
         db.session.commit()
+        invalidate_pair(interest.sender_id, interest.receiver_id)
+        if was_pending:
+            badges.decr(current_user.id, 'interests')
         # Record signal: receiver declined
         try:
             from app.utils import record_signal
@@ -190,8 +200,12 @@ def withdraw_interest(interest_id):
     interest = Interest.query.get_or_404(interest_id)
     if interest.sender_id != current_user.id:
         abort(403)
+    was_pending     = interest.status == 'pending'
     interest.status = 'withdrawn'
     db.session.commit()
+    invalidate_pair(interest.sender_id, interest.receiver_id)
+    if was_pending:
+        badges.decr(interest.receiver_id, 'interests')
     flash('Interest withdrawn.', 'info')
     return redirect(url_for('connect.my_interests'))
 
@@ -265,6 +279,7 @@ def block_user(target_id):
         return jsonify(success=False, msg='Already blocked.')
     db.session.add(BlockList(blocker_id=current_user.id, blocked_id=target_id))
     db.session.commit()
+    invalidate_pair(current_user.id, target_id)
     try:
         from app.utils import record_signal
         record_signal(current_user.id, target_id, 'blocked')
@@ -281,6 +296,7 @@ def unblock_user(target_id):
         blocker_id=current_user.id, blocked_id=target_id).first_or_404()
     db.session.delete(block)
     db.session.commit()
+    invalidate_pair(current_user.id, target_id)
     flash('User unblocked.', 'success')
     return redirect(url_for('main.home'))
 
@@ -451,8 +451,10 @@ def user_detail(user_id):
             # Create in-app notification as admin note to user
             note = request.form.get('note', '').strip()
             if note:
-                from app.utils import create_notification
-                create_notification(u.id, 'system', f'[Staff message] {note}', '')
+                from app.utils import create_notifications_bulk
+                create_notifications_bulk([dict(user_id=u.id, notif_type='system',
+                                                message=f'[Staff message] {note}')],
+                                          commit=False)
                 flash('Note sent to user as notification.', 'success')
         db.session.commit()
         return redirect(url_for('console.user_detail', user_id=user_id))
@@ -548,10 +550,10 @@ def update_assisted(req_id):
     db.session.commit()
 
     if ar.status == 'active' and old_status != 'active':
-        from app.utils import create_notification
-        create_notification(ar.user_id, 'system',
-            f'Your Assisted Plan is now active! {ar.assigned_manager or "Your manager"} will contact you soon.',
-            '/plans/assisted')
+        from app.utils import create_notifications_bulk
+        create_notifications_bulk([dict(user_id=ar.user_id, notif_type='system',
+            message=f'Your Assisted Plan is now active! {ar.assigned_manager or "Your manager"} will contact you soon.',
+            link='/plans/assisted')], commit=False)
 
     _audit('update_assisted', 'assisted_request', ar.id,
            f"status={ar.status} manager={ar.assigned_manager}")
@@ -651,6 +653,42 @@ def toggle_staff(staff_id):
     return redirect(url_for('console.staff'))
 
 
+# ── BROADCAST (CEO only) ───────────────────────────────────────────────────
+
+@console_bp.route('/broadcast', methods=['POST'])
+@console_login_required
+@perm_required('settings')
+def broadcast():
+    """Queue a system notification to every active user (one INSERT … SELECT)."""
+    message = request.form.get('message', '').strip()
+    link    = request.form.get('link', '').strip()
+    if not message or len(message) > 200:
+        flash('Broadcast message must be 1–200 characters.', 'danger')
+        return redirect(url_for('console.dashboard'))
+    from app.tasks import broadcast_notification_task
+    broadcast_notification_task.delay(message, link)
+    _audit('broadcast_notification', detail=message)
+    db.session.commit()
+    flash('Broadcast queued — users will see it within a minute.', 'success')
+    return redirect(url_for('console.dashboard'))
+
+
+# ── TASK QUEUES (CEO only) ─────────────────────────────────────────────────
+
+@console_bp.route('/tasks')
+@console_login_required
+@perm_required('settings')
+def tasks():
+    """Celery throughput: per-task lag / runtime / failures and queue depths."""
+    from app.task_metrics import task_summary, queue_depths, depth_history
+    admin = get_current_admin()
+    hours = min(max(request.args.get('hours', 1, type=int), 1), 48)
+    return render_template('console/tasks.html', admin=admin, hours=hours,
+                           task_rows=task_summary(hours),
+                           depths=queue_depths(),
+                           history=depth_history(60))
+
+
 # ── API endpoints for dashboard widgets ────────────────────────────────────
 
 # ── ACTIVATE PENDING MANUAL SUBSCRIPTION (admin verification) ─────────────
@@ -676,12 +714,14 @@ def activate_subscription(user_id, sub_id):
         UserSubscription.id      != sub_id,
         UserSubscription.is_active == True
     ).update({'is_active': False})
+    # Notify user — same transaction as the activation
+    from app.utils import create_notifications_bulk
+    create_notifications_bulk([dict(user_id=user_id, notif_type='system',
+        message=f'Your {sub.plan.name} plan is now active! Welcome to iJodidar {sub.plan.name}.',
+        link='/plans')], commit=False)
     db.session.commit()
-    # Notify user
-    from app.utils import create_notification
-    create_notification(user_id, 'system',
-        f'Your {sub.plan.name} plan is now active! Welcome to iJodidar {sub.plan.name}.',
-        '/plans')
+    from app.capabilities import invalidate_plan
+    invalidate_plan(user_id)
     flash(f'{sub.plan.name} plan activated for user #{user_id}.', 'success')
     return redirect(url_for('console.user_detail', user_id=user_id))
 
@@ -690,6 +730,9 @@ def activate_subscription(user_id, sub_id):
 @console_login_required
 def api_live_stats():
     """Polled every 60s by dashboard for live counts."""
+    from app.messaging.coalesce import get_socket_stats
+    from app.retention import get_retention_stats
+    from app.images import get_variant_stats
     return jsonify(
         total_users    = User.query.filter_by(is_staff=False).count(),
         online_today   = User.query.filter(
@@ -697,4 +740,7 @@ def api_live_stats():
             User.is_staff == False).count(),
         pending_reports= UserReport.query.filter_by(status='pending').count(),
         assisted_pending= AssistedRequest.query.filter_by(status='pending').count(),
+        socket_frames   = get_socket_stats(),
+        retention       = get_retention_stats(),
+        image_variants  = get_variant_stats(),
     )
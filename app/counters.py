@@ -0,0 +1,187 @@
+"""
+Badge counters — per-user unread counts kept in a Redis hash (DB2).
+
+Usage:
+    from app.counters import get_badges, peek_badges, incr, decr, incr_many
+
+    badges:{user_id}  HASH  messages  — unread chat messages
+                            interests — pending interests received
+                            notifs    — unread notifications
+
+Counters are adjusted at the points where those rows are created or read
+(messaging service, interest routes, notification helpers) instead of being
+re-COUNTed whenever a 60 s cache expires. A missing hash is seeded from the
+database on first read; increments never create a hash (a partial hash would
+read as zeros), so a user with no hash simply gets seeded later.
+reconcile() — run by the badge-reconcile Beat task — recomputes every live
+hash in grouped queries and corrects any drift.
+
+Fails soft like app.cache: with Redis down, get_badges() counts in SQL.
+"""
+from app.cache import _get_client
+
+FIELDS  = ('messages', 'interests', 'notifs')
+KEY_TTL = 7 * 86400     # idle users' hashes expire; re-seeded on next read
+
+# HINCRBY only if the hash exists; never let a counter go below zero.
+_ADJUST_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return nil end
+local v = redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+if v < 0 then redis.call('HSET', KEYS[1], ARGV[1], 0); v = 0 end
+return v
+"""
+_adjust_script = None
+
+
+def _key(user_id):
+    return f'badges:{user_id}'
+
+
+def _adjust():
+    global _adjust_script
+    if _adjust_script is None:
+        _adjust_script = _get_client().register_script(_ADJUST_LUA)
+    return _adjust_script
+
+
+# ── Database side ────────────────────────────────────────────────────────────
+def _count_from_db(user_ids):
+    """{uid: {'messages', 'interests', 'notifs'}} — three grouped queries."""
+    from app import db
+    from app.models import Conversation, Interest, Notification
+    out = {uid: dict.fromkeys(FIELDS, 0) for uid in user_ids}
+    if not user_ids:
+        return out
+    C = Conversation
+    for uid_col, unread_col in ((C.user1_id, C.unread_count_user1),
+                                (C.user2_id, C.unread_count_user2)):
+        rows = (db.session.query(uid_col, db.func.sum(unread_col))
+                .filter(uid_col.in_(user_ids), unread_col > 0)
+                .group_by(uid_col).all())
+        for uid, n in rows:
+            out[uid]['messages'] += int(n or 0)
+    for uid, n in (db.session.query(Interest.receiver_id, db.func.count(Interest.id))
+                   .filter(Interest.receiver_id.in_(user_ids), Interest.status == 'pending')
+                   .group_by(Interest.receiver_id).all()):
+        out[uid]['interests'] = n
+    for uid, n in (db.session.query(Notification.user_id, db.func.count(Notification.id))
+                   .filter(Notification.user_id.in_(user_ids), Notification.is_read == False)
+                   .group_by(Notification.user_id).all()):
+        out[uid]['notifs'] = n
+    return out
+
+
+# ── Reads ────────────────────────────────────────────────────────────────────
+def get_badges(user_id):
+    """{'messages': n, 'interests': n, 'notifs': n} — one HGETALL when warm."""
+    try:
+        raw = _get_client().hgetall(_key(user_id))
+    except Exception:
+        return _count_from_db([user_id])[user_id]
+    if raw and all(f in raw for f in FIELDS):
+        return {f: int(raw[f]) for f in FIELDS}
+    counts = _count_from_db([user_id])[user_id]
+    try:
+        pipe = _get_client().pipeline(transaction=True)
+        pipe.hset(_key(user_id), mapping=counts)
+        pipe.expire(_key(user_id), KEY_TTL)
+        pipe.execute()
+    except Exception:
+        pass
+    return counts
+
+
+def peek_badges(user_ids):
+    """{uid: counts or None} straight from Redis, one pipelined round-trip.
+    Never seeds from SQL — safe inside after-commit hooks. None = cold hash."""
+    user_ids = list(user_ids)
+    try:
+        pipe = _get_client().pipeline(transaction=False)
+        for uid in user_ids:
+            pipe.hgetall(_key(uid))
+        raws = pipe.execute()
+    except Exception:
+        return dict.fromkeys(user_ids)
+    return {uid: ({f: int(raw[f]) for f in FIELDS}
+                  if raw and all(f in raw for f in FIELDS) else None)
+            for uid, raw in zip(user_ids, raws)}
+
+
+# ── Writes ───────────────────────────────────────────────────────────────────
+def incr(user_id, field, n=1):
+    if not n:
+        return
+    try:
+        _adjust()(keys=[_key(user_id)], args=[field, int(n)])
+    except Exception:
+        pass
+
+
+def decr(user_id, field, n=1):
+    incr(user_id, field, -n)
+
+
+def incr_many(field, per_user):
+    """Apply {user_id: delta} for one field in a single pipelined round-trip."""
+    if not per_user:
+        return
+    try:
+        pipe   = _get_client().pipeline(transaction=False)
+        script = _adjust()
+        for uid, n in per_user.items():
+            if n:
+                script(keys=[_key(uid)], args=[field, int(n)], client=pipe)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def incr_all_live(field, n=1, only=None):
+    """Bump `field` on every existing hash (after a broadcast). SCAN-based.
+    only(user_ids) → the subset that should be bumped, called once per SCAN
+    batch, so hashes of users the broadcast skipped stay exact."""
+    try:
+        client = _get_client()
+        cursor = 0
+        while True:
+            cursor, keys = client.scan(cursor, match='badges:*', count=500)
+            if keys:
+                uids = [int(k.split(':', 1)[1]) for k in keys]
+                if only is not None:
+                    uids = only(uids)
+                incr_many(field, dict.fromkeys(uids, n))
+            if cursor == 0:
+                break
+    except Exception:
+        pass
+
+
+# ── Reconciliation ───────────────────────────────────────────────────────────
+def reconcile(batch_size=500):
+    """Recompute every live badges:* hash from the database and overwrite
+    fields that drifted. Returns (hashes checked, hashes corrected)."""
+    client  = _get_client()
+    cursor  = 0
+    checked = fixed = 0
+    while True:
+        cursor, keys = client.scan(cursor, match='badges:*', count=batch_size)
+        if keys:
+            uids   = [int(k.split(':', 1)[1]) for k in keys]
+            truth  = _count_from_db(uids)
+            pipe   = client.pipeline(transaction=False)
+            for k in keys:
+                pipe.hgetall(k)
+            current = pipe.execute()
+            pipe = client.pipeline(transaction=False)
+            for k, uid, cur in zip(keys, uids, current):
+                checked += 1
+                want = truth[uid]
+                if cur and any(int(cur.get(f, -1)) != want[f] for f in FIELDS):
+                    pipe.hset(k, mapping=want)
+                    fixed += 1
+            pipe.execute()
+        if cursor == 0:
+            break
+    from app import db
+    db.session.rollback()   # read-only; release the connection
+    return checked, fixed
@@ -0,0 +1,90 @@
+"""
+Deduplicated and coalesced task enqueueing.
+
+Usage:
+    from app.dedupe import enqueue_once, enqueue_coalesced, pending, ack
+
+    # At most one publish per key per ttl — repeats inside the window are dropped
+    enqueue_once(send_interest_email_task, f'interest-email:{a}:{b}', 86400, b, name)
+
+    # Buffer items under a key; the first item in a window schedules ONE task
+    # (countdown = window) that reads everything buffered and sends a summary
+    enqueue_coalesced(send_message_digest_email_task, f'msg-email:{uid}:{cid}',
+                      600, item={'id': msg.id, 'preview': body[:200]},
+                      args=(uid, cid))
+
+Both gate on a Redis SET NX EX key (DB2), so the window holds across every
+web and Celery process. The coalesced task gets the key as its first
+argument:
+
+    items = pending(key)        # everything buffered so far, oldest first
+    ... send ...
+    ack(key, len(items))        # drop what was sent — a retry re-reads the rest
+
+Items buffered after the task has read the list stay for the next window's
+task. If Redis is unreachable both helpers fall back to publishing directly
+(the coalesced task then gets items=[item] as a keyword) — a duplicate
+email beats a lost one.
+"""
+import json
+
+ONCE_PREFIX   = 'taskonce:'
+WINDOW_PREFIX = 'taskwin:'
+BUFFER_PREFIX = 'taskbuf:'
+BUFFER_MAX    = 100      # items kept per key; older ones are dropped
+
+
+def _claim(key, ttl):
+    """True if this caller opened the window (or Redis is down)."""
+    try:
+        from app.cache import _get_client
+        return bool(_get_client().set(key, 1, nx=True, ex=int(ttl)))
+    except Exception:
+        return True
+
+
+def enqueue_once(task, key, ttl, *args, **kwargs):
+    """task.delay(*args, **kwargs) unless `key` was enqueued in the last `ttl`
+    seconds. Returns True if published."""
+    if not _claim(ONCE_PREFIX + key, ttl):
+        return False
+    task.delay(*args, **kwargs)
+    return True
+
+
+def enqueue_coalesced(task, key, window, item=None, args=()):
+    """Buffer `item` under `key`; schedule task(key, *args) `window` seconds out
+    if no task is scheduled for this key yet. Returns True if published."""
+    buf = BUFFER_PREFIX + key
+    try:
+        from app.cache import _get_client
+        pipe = _get_client().pipeline(transaction=True)
+        pipe.rpush(buf, json.dumps(item))
+        pipe.ltrim(buf, -BUFFER_MAX, -1)
+        pipe.expire(buf, int(window) * 10)
+        pipe.execute()
+    except Exception:
+        task.apply_async(args=(key, *args), kwargs={'items': [item]})
+        return True   # no buffer — this item goes out alone
+    if not _claim(WINDOW_PREFIX + key, window):
+        return False
+    task.apply_async(args=(key, *args), countdown=window)
+    return True
+
+
+def pending(key):
+    """Buffered items for `key`, oldest first ([] if none or Redis is down)."""
+    try:
+        from app.cache import _get_client
+        return [json.loads(x) for x in _get_client().lrange(BUFFER_PREFIX + key, 0, -1)]
+    except Exception:
+        return []
+
+
+def ack(key, n):
+    """Remove the first n buffered items (the ones just handled)."""
+    try:
+        from app.cache import _get_client
+        _get_client().ltrim(BUFFER_PREFIX + key, n, -1)
+    except Exception:
+        pass
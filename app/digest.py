@@ -0,0 +1,167 @@
+"""
+Daily match digest — batched candidate selection and scoring.
+
+Usage:
+    from app.digest import eligible_user_ids, build_digests, digest_message
+
+    send_daily_matches_all  (Beat, 02:30 UTC)
+        └─ send_match_digest_chunk(ids)  × ceil(users / CHUNK_SIZE)
+              └─ build_digests(ids) → send_bulk_mail_task (queue 'email')
+                                        'daily_digest' template, app.mail
+
+Per chunk of ~CHUNK_SIZE recipients, queries are bounded by the chunk, not
+by the number of users in it:
+
+  1. recipients with profile + partner preference        one query (+ eager loads)
+  2. candidate pool per segment (gender × religion),      one query per segment,
+     most recently active first, shared by every           not per user
+     recipient in the segment
+  3. pairs already interacted with (interests either      one UNION query
+     way) or blocked either way
+  4. signal boosts and nakshatras for chunk × pools       two queries
+
+then every recipient's pool is scored in memory with calculate_match_score
+(preloaded inputs, no per-pair queries) and the top DIGEST_SIZE are kept.
+A recipient whose religion segment has too few fresh candidates falls back
+to the religion-agnostic pool for the same gender.
+"""
+from datetime import datetime, timedelta
+
+CHUNK_SIZE   = 500     # recipients per Celery task
+POOL_SIZE    = 200     # candidates per segment
+DIGEST_SIZE  = 3       # matches per email
+ACTIVE_DAYS  = 90      # recipients must have been active this recently
+EMAIL_BATCH  = 500     # recipients per send_bulk_mail_task message
+
+
+def _live_users():
+    from app.models import User, Profile
+    return (User.query
+            .join(Profile)
+            .filter(User.is_active_acc == True,
+                    User.is_hidden     == False,
+                    User.is_staff      == False,
+                    Profile.gender      != None,
+                    Profile.looking_for != None))
+
+
+def eligible_user_ids():
+    """Ids of users who get a digest today, in id order."""
+    from app.models import User
+    cutoff = datetime.utcnow() - timedelta(days=ACTIVE_DAYS)
+    rows = (_live_users()
+            .filter((User.last_active_at == None) | (User.last_active_at > cutoff))
+            .order_by(User.id)
+            .with_entities(User.id)
+            .all())
+    return [uid for (uid,) in rows]
+
+
+def _segment(user):
+    """(wanted gender, own gender, religion or None)."""
+    p    = user.profile
+    pref = user.partner_preference
+    religion = (pref and pref.religion) or p.religion
+    return (p.looking_for, p.gender, religion.strip().lower() if religion else None)
+
+
+def _load_pool(segment):
+    from sqlalchemy.orm import joinedload, selectinload
+    from app import db
+    from app.models import User, Profile, Address
+    wanted, own, religion = segment
+    q = (_live_users()
+         .filter(Profile.gender == wanted, Profile.looking_for == own)
+         .options(joinedload(User.profile),
+                  selectinload(User.profile_images),
+                  selectinload(User.educations),
+                  selectinload(User.addresses).joinedload(Address.city),
+                  selectinload(User.addresses).joinedload(Address.state))
+         .order_by(User.last_active_at.desc().nullslast(), User.id.desc())
+         .limit(POOL_SIZE))
+    if religion:
+        q = q.filter(db.func.lower(Profile.religion) == religion)
+    return q.all()
+
+
+def _excluded_pairs(user_ids):
+    """{(recipient_id, other_id)} for interests either way and blocks either way."""
+    from app import db
+    from app.models import Interest, BlockList
+    I, B = Interest, BlockList
+    q = db.union_all(
+        db.select(I.sender_id,   I.receiver_id).where(I.sender_id.in_(user_ids)),
+        db.select(I.receiver_id, I.sender_id).where(I.receiver_id.in_(user_ids)),
+        db.select(B.blocker_id,  B.blocked_id).where(B.blocker_id.in_(user_ids)),
+        db.select(B.blocked_id,  B.blocker_id).where(B.blocked_id.in_(user_ids)),
+    )
+    return {(a, b) for a, b in db.session.execute(q)}
+
+
+def _signal_boosts(user_ids, candidate_ids):
+    from app import db
+    from app.models import UserSignal as S
+    rows = (db.session.query(S.user_id, S.target_user_id, db.func.sum(S.signal_value))
+            .filter(S.user_id.in_(user_ids), S.target_user_id.in_(candidate_ids))
+            .group_by(S.user_id, S.target_user_id).all())
+    return {(u, t): float(v or 0) for u, t, v in rows}
+
+
+def _nakshatras(user_ids):
+    from app import db
+    from app.models import KundliDetail as K
+    return dict(db.session.query(K.user_id, K.nakshatra)
+                .filter(K.user_id.in_(user_ids), K.nakshatra != None).all())
+
+
+def build_digests(user_ids):
+    """[(user, [top candidates])] for recipients with at least one match."""
+    from sqlalchemy.orm import joinedload
+    from app.models import User
+    from app.utils import calculate_match_score
+    recipients = (_live_users()
+                  .filter(User.id.in_(user_ids))
+                  .options(joinedload(User.profile),
+                           joinedload(User.partner_preference))
+                  .all())
+    if not recipients:
+        return []
+
+    pools = {}
+    for u in recipients:
+        seg = _segment(u)
+        for key in (seg, seg[:2] + (None,)):
+            if key not in pools:
+                pools[key] = _load_pool(key)
+            if key[2] is None:
+                break
+    candidate_ids = {c.id for pool in pools.values() for c in pool}
+    ids           = [u.id for u in recipients]
+    excluded      = _excluded_pairs(ids)
+    boosts        = _signal_boosts(ids, candidate_ids)
+    naks          = _nakshatras(set(ids) | candidate_ids)
+
+    out = []
+    for u in recipients:
+        seg  = _segment(u)
+        pool = [c for c in pools[seg] if c.id != u.id and (u.id, c.id) not in excluded]
+        if len(pool) < DIGEST_SIZE and seg[2] is not None:
+            seen  = {c.id for c in pool}
+            pool += [c for c in pools[seg[:2] + (None,)]
+                     if c.id != u.id and c.id not in seen and (u.id, c.id) not in excluded]
+        if not pool:
+            continue
+        scored = sorted(pool, reverse=True, key=lambda c: calculate_match_score(
+            u, c, signal_boost=boosts.get((u.id, c.id), 0.0),
+            nakshatras=(naks.get(u.id), naks.get(c.id))))
+        out.append((u, scored[:DIGEST_SIZE]))
+    return out
+
+
+def digest_message(user, candidates):
+    """(to, data) for the 'daily_digest' mail template (app.mail)."""
+    return user.email, {
+        'first_name': user.first_name,
+        'matches':    [{'id': c.id, 'name': f'{c.first_name} {c.last_name[:1]}.'}
+                       for c in candidates],
+    }
@@ -0,0 +1,334 @@
+"""
+Profile photo pipeline — the request stores the upload once; a worker makes
+the sizes; anything else is resized on demand.
+
+Usage:
+    from app.images import store_original, PLACEHOLDER_URL
+    from app import outbox
+
+    original_key, err = store_original(file, user_id)      # request thread
+    img = ProfileImage(user_id=uid, original_key=original_key,
+                       image_url=PLACEHOLDER_URL, status='processing')
+    db.session.add(img); db.session.flush()
+    outbox.enqueue('upload_image_task', img.id)            # uploads queue
+    db.session.commit()
+
+Files go through app.storage (S3 in production, local disk in development);
+rows store keys, and URLs come from the backend.
+
+store_original() reads only the image header (format and dimensions — no
+pixel decode) and stores the bytes as-is at profiles/{uid}/{hex}_o.{ext}.
+Until the worker finishes, image_url points at PLACEHOLDER_URL, so every
+template that renders a photo shows the placeholder without changes.
+
+process(image_id) runs on the worker: one decode of the original — with
+draft() letting libjpeg decode at a reduced DCT scale when the source is
+much bigger than 800 px — EXIF rotation, one square crop, then each size is
+resized from the previous one (800 → 400 → 150, reducing_gap so Pillow
+reduce()s by whole factors first). Each size is encoded as JPEG and WebP
+(and AVIF when IMAGE_AVIF is on and Pillow supports it); all variants are
+stored in parallel, recorded as ProfileImageVariant rows, and the row's
+image/card/thumb URLs are switched to the JPEGs with status 'ready'.
+
+Other sizes are made on demand (the profile.photo_variant route): width is
+snapped up to DERIVATIVE_WIDTHS; if that variant exists the route redirects
+to its signed URL, otherwise request_derivative() queues make_derivative_task
+on the uploads queue (one per size, guarded by a Redis lock) and the route
+serves the placeholder meanwhile. The worker resizes from the original (or,
+for photos uploaded before originals were kept, the 800 px JPEG), stores it
+and records it as another ProfileImageVariant. No image work runs in the web
+worker, and a new card size is a template change, not a reprocessing job.
+
+Templates use ProfileImage.sources / srcset() for <picture> markup; the API
+card schema returns the same sets. Encoded sizes per format and width are
+summed in the Redis hash imagevariants:stats — get_variant_stats() reports
+the average bytes and the saving against JPEG.
+"""
+import io
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+PLACEHOLDER_URL = '/static/img/photo-processing.svg'
+SIZES = (                       # column, square px, key suffix — largest first
+    ('image_url', 800, ''),
+    ('card_url',  400, '_c'),
+    ('thumb_url', 150, '_t'),
+)
+FORMATS    = {'JPEG': ('jpg', 'image/jpeg'), 'PNG': ('png', 'image/png')}
+MAX_PIXELS = 40_000_000         # refuse decompression bombs before storing
+ENCODERS   = {                  # format → ext, mime, Pillow format, save options
+    'jpeg': ('jpg',  'image/jpeg', 'JPEG', {'quality': 85, 'optimize': True}),
+    'webp': ('webp', 'image/webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'avif': ('avif', 'image/avif', 'AVIF', {'quality': 60, 'speed': 6}),
+}
+DERIVATIVE_WIDTHS = (48, 64, 96, 128, 150, 200, 256, 320, 400, 480, 640, 800, 1080)
+DERIVATIVE_LOCK_PREFIX = 'imgderiv:'
+DERIVATIVE_LOCK_TTL    = 120    # seconds — a crashed generation can be retried after this
+UPLOAD_THREADS    = 8
+STATS_KEY         = 'imagevariants:stats'
+
+
+# ── Request side ─────────────────────────────────────────────────────────────
+def store_original(file, user_id):
+    """Validate the header and store the upload unchanged.
+    Returns (original_key, error)."""
+    from PIL import Image
+    from flask import current_app
+    from app.storage import get_backend
+    from app.utils import allowed_file
+
+    if not file or file.filename == '':
+        return None, 'No file selected.'
+    if not allowed_file(file.filename):
+        return None, 'Only JPG/PNG files are allowed.'
+
+    raw = file.read()
+    try:
+        header = Image.open(io.BytesIO(raw))       # lazy — parses the header only
+        fmt    = FORMATS.get(header.format)
+        w, h   = header.size
+    except Exception:
+        return None, 'That file is not a valid image.'
+    if fmt is None:
+        return None, 'Only JPG/PNG files are allowed.'
+    if w * h > MAX_PIXELS:
+        return None, 'That image is too large. Please upload a smaller photo.'
+
+    ext, content_type = fmt
+    key = f"profiles/{user_id or 'u'}/{uuid.uuid4().hex}_o.{ext}"
+    try:
+        get_backend().put(key, raw, content_type)
+    except Exception as e:
+        current_app.logger.error(f"Photo upload error: {e}")
+        return None, 'Upload failed. Please try again.'
+    return key, None
+
+
+# ── Worker side ──────────────────────────────────────────────────────────────
+def encoders():
+    """Formats to produce, in ENCODERS order. AVIF only when enabled in config
+    (IMAGE_AVIF) and this Pillow can write it (Pillow ≥ 11.3, or the
+    pillow-avif-plugin package)."""
+    from PIL import Image
+    from flask import current_app
+    out = ['jpeg', 'webp']
+    if current_app.config.get('IMAGE_AVIF'):
+        try:
+            import pillow_avif  # noqa: F401 — registers the AVIF plugin
+        except ImportError:
+            pass
+        Image.init()
+        if 'AVIF' in Image.SAVE:
+            out.append('avif')
+    return out
+
+
+def _square(raw, target):
+    """Decode `raw` once (draft() toward `target` px), EXIF-rotate, RGB,
+    centre-crop square."""
+    from PIL import Image, ImageOps
+    img = Image.open(io.BytesIO(raw))
+    img.draft('RGB', (target, target))             # JPEG: decode at 1/2, 1/4, 1/8 scale
+    img = ImageOps.exif_transpose(img)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    w, h = img.size
+    side = min(w, h)
+    left, top = (w - side) // 2, (h - side) // 2
+    return img.crop((left, top, left + side, top + side))
+
+
+def _resize(img, size):
+    from PIL import Image
+    if img.width == size:
+        return img
+    return img.resize((size, size), Image.LANCZOS, reducing_gap=2.0)
+
+
+def _encode(img, fmt):
+    pil_fmt, opts = ENCODERS[fmt][2], dict(ENCODERS[fmt][3])
+    if fmt == 'jpeg':
+        opts['progressive'] = img.width > 200
+    buf = io.BytesIO()
+    img.save(buf, pil_fmt, **opts)
+    return buf.getvalue()
+
+
+def _derivatives(raw, formats):
+    """[(width, format, bytes)] for SIZES × formats from one decode of `raw`."""
+    img = _square(raw, SIZES[0][1])
+    out = []
+    for _, size, _ in SIZES:
+        img = _resize(img, size)
+        out.extend((size, fmt, _encode(img, fmt)) for fmt in formats)
+    return out
+
+
+def process(image_id):
+    """Build and store every variant of one ProfileImage. Returns a status
+    dict; raises on storage / decode errors so the task can retry."""
+    from app import db
+    from app.models import ProfileImage, ProfileImageVariant
+    from app.storage import get_backend
+    img = db.session.get(ProfileImage, image_id)
+    if img is None or img.status != 'processing' or not img.original_key:
+        return {'status': 'skipped'}
+
+    original = img.original_key
+    db.session.rollback()                 # no transaction open across decode + upload
+    store    = get_backend()
+    variants = _derivatives(store.get(original), encoders())
+    base     = original.rsplit('_o.', 1)[0]
+    suffix   = {size: sfx for _, size, sfx in SIZES}
+
+    def put(variant):
+        size, fmt, data = variant
+        ext, mime = ENCODERS[fmt][:2]
+        key = f'{base}{suffix[size]}.{ext}'
+        store.put(key, data, mime)
+        return size, fmt, len(data), key
+
+    with ThreadPoolExecutor(max_workers=min(len(variants), UPLOAD_THREADS)) as pool:
+        stored = list(pool.map(put, variants))
+
+    jpeg    = {size: store.url(key) for size, fmt, _, key in stored if fmt == 'jpeg'}
+    updated = (ProfileImage.query
+               .filter_by(id=image_id, status='processing')
+               .update({column: jpeg[size] for column, size, _ in SIZES} | {'status': 'ready'},
+                       synchronize_session=False))
+    if updated:
+        db.session.add_all(ProfileImageVariant(image_id=image_id, width=size, format=fmt,
+                                               key=key, url=store.url(key), bytes=n)
+                           for size, fmt, n, key in stored)
+    db.session.commit()
+    if not updated:                       # photo deleted while we worked
+        store.delete(*(key for *_, key in stored))
+        return {'status': 'deleted'}
+    _record(stored)
+    return {'status': 'ready', 'variants': len(stored),
+            'bytes': sum(n for _, _, n, _ in stored)}
+
+
+def mark_failed(image_id):
+    from app import db
+    from app.models import ProfileImage
+    (ProfileImage.query.filter_by(id=image_id, status='processing')
+     .update({'status': 'failed'}, synchronize_session=False))
+    db.session.commit()
+
+
+# ── On-demand sizes ──────────────────────────────────────────────────────────
+def snap_width(width):
+    """Smallest DERIVATIVE_WIDTHS entry ≥ width (the largest if none)."""
+    return next((w for w in DERIVATIVE_WIDTHS if w >= width), DERIVATIVE_WIDTHS[-1])
+
+
+def find_variant(img, width, fmt):
+    """The stored ProfileImageVariant of `img` at snap_width(width) in `fmt`, or None."""
+    width = snap_width(width)
+    return next((v for v in img.variants if v.width == width and v.format == fmt), None)
+
+
+def request_derivative(image_id, width, fmt):
+    """Queue generation of a missing size on the uploads queue — at most one
+    task per (image, width, format) at a time, however many requests miss."""
+    from app.cache import _get_client
+    width = snap_width(width)
+    lock  = f'{DERIVATIVE_LOCK_PREFIX}{image_id}:{width}:{fmt}'
+    try:
+        if not _get_client().set(lock, 1, nx=True, ex=DERIVATIVE_LOCK_TTL):
+            return False
+    except Exception:
+        pass                              # Redis down — duplicate work beats none
+    from app.tasks import make_derivative_task
+    make_derivative_task.delay(image_id, width, fmt)
+    return True
+
+
+def make_derivative(image_id, width, fmt):
+    """Worker side of request_derivative(): resize from the original (or the
+    800 px JPEG of older uploads), store it and record it as a variant."""
+    from app import db
+    from app.cache import _get_client
+    from app.models import ProfileImage, ProfileImageVariant
+    from app.storage import get_backend
+    width = snap_width(width)
+    try:
+        img = db.session.get(ProfileImage, image_id)
+        if img is None or img.status != 'ready' or find_variant(img, width, fmt):
+            return {'status': 'skipped'}
+        store  = get_backend()
+        source = img.original_key or store.key_for(img.image_url)
+        if not source:
+            return {'status': 'no_source'}
+        db.session.rollback()             # no transaction open across decode + upload
+        data = _encode(_resize(_square(store.get(source), width), width), fmt)
+        ext, mime = ENCODERS[fmt][:2]
+        base = source.rsplit('_o.', 1)[0] if '_o.' in source else source.rsplit('.', 1)[0]
+        key  = f'{base}_w{width}.{ext}'
+        store.put(key, data, mime)
+        if db.session.get(ProfileImage, image_id) is None:   # deleted meanwhile
+            store.delete(key)
+            return {'status': 'deleted'}
+        db.session.add(ProfileImageVariant(image_id=image_id, width=width, format=fmt,
+                                           key=key, url=store.url(key), bytes=len(data)))
+        try:
+            db.session.commit()
+        except Exception:                 # uq_image_variant — someone else won
+            db.session.rollback()
+            store.delete(key)
+            return {'status': 'duplicate'}
+        _record([(width, fmt, len(data), key)])
+        return {'status': 'ready', 'bytes': len(data)}
+    finally:
+        try:
+            _get_client().delete(f'{DERIVATIVE_LOCK_PREFIX}{image_id}:{width}:{fmt}')
+        except Exception:
+            pass
+
+
+def delete_files(img):
+    """Remove everything stored for ProfileImage `img`: original, every
+    variant (pre-generated and on-demand) and legacy sizes. Never raises."""
+    try:
+        from app.storage import get_backend
+        store = get_backend()
+        store.delete(*dict.fromkeys(img.stored_keys(store)))
+    except Exception as e:
+        from flask import current_app
+        current_app.logger.warning(f"Photo delete error for image {img.id}: {e}")
+
+
+# ── Metrics ──────────────────────────────────────────────────────────────────
+def _record(stored):
+    """Add each variant's size to STATS_KEY ({format}:{width}:bytes / :count)."""
+    try:
+        from app.cache import _get_client
+        pipe = _get_client().pipeline(transaction=False)
+        for size, fmt, n, _ in stored:
+            pipe.hincrby(STATS_KEY, f'{fmt}:{size}:bytes', n)
+            pipe.hincrby(STATS_KEY, f'{fmt}:{size}:count', 1)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def get_variant_stats():
+    """{width: {format: {'count', 'avg_bytes', 'saving_pct'}}} — saving is
+    against the JPEG of the same width."""
+    try:
+        from app.cache import _get_client
+        raw = _get_client().hgetall(STATS_KEY)
+    except Exception:
+        return {}
+    out = {}
+    for field, value in raw.items():
+        fmt, size, metric = field.split(':')
+        out.setdefault(int(size), {}).setdefault(fmt, {})[metric] = int(value)
+    for size, fmts in out.items():
+        for fmt, m in fmts.items():
+            m['avg_bytes'] = m.get('bytes', 0) // max(m.get('count', 0), 1)
+        base = fmts.get('jpeg', {}).get('avg_bytes')
+        for fmt, m in fmts.items():
+            m['saving_pct'] = round(100 * (1 - m['avg_bytes'] / base), 1) if base else None
+    return dict(sorted(out.items()))
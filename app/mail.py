@@ -0,0 +1,265 @@
+"""
+Mail — outbound email through a pluggable backend, with named templates.
+
+Usage:
+    from app.mail import send, send_bulk, render, get_backend
+
+    send(to, subject, html)                          # one-off HTML email
+    send_bulk('daily_digest', [(to, data), ...])     # templated, batched
+
+Backends — MAIL_BACKEND selects one by name:
+    'ses'   SESBackend: one boto3 client per process. Templates are pushed
+            to SES once per process; send_bulk() uses
+            SendBulkTemplatedEmail, BULK_MAX destinations per request.
+    'file'  FileBackend: renders locally and appends JSON lines to
+            MAIL_FILE_DIR/outbox.jsonl — offline runs and throughput tests.
+    ''      auto: 'ses' when MAIL_FROM and AWS_REGION are set, else disabled
+            (send() returns False, send_bulk() reports everything skipped).
+register_backend(name, cls) adds another.
+
+Templates (TEMPLATES, register_template) use the Handlebars subset SES
+understands — {{var}} and {{#each list}}…{{/each}}, values HTML-escaped.
+render() implements the same subset for local backends.
+
+Module-level imports are stdlib only; scripts/bench_mail.py loads this file
+on its own to measure batching without Flask or AWS.
+"""
+import html as _html
+import json
+import os
+import re
+import threading
+import time
+
+BULK_MAX        = 50            # SES SendBulkTemplatedEmail destination limit
+TEMPLATE_PREFIX = 'ijodidar_'   # SES templates are account-wide
+RETRYABLE_CODES = {'Throttling', 'ThrottlingException', 'TooManyRequestsException',
+                   'RequestThrottled', 'ServiceUnavailable', 'InternalFailure'}
+
+
+# ── Templates ────────────────────────────────────────────────────────────────
+TEMPLATES = {}
+
+_EACH = re.compile(r'{{#each (\w+)}}(.*?){{/each}}', re.S)
+_VAR  = re.compile(r'{{\s*(\w+)\s*}}')
+
+
+def register_template(name, subject, html):
+    TEMPLATES[name] = (subject, html)
+
+
+def _fill(text, data):
+    return _VAR.sub(lambda m: _html.escape(str(data.get(m.group(1), ''))), text)
+
+
+def render(name, data):
+    """(subject, html) for template `name` filled with `data`."""
+    subject, body = TEMPLATES[name]
+    body = _EACH.sub(lambda m: ''.join(_fill(m.group(2), item)
+                                       for item in data.get(m.group(1)) or ()), body)
+    return _fill(subject, data), _fill(body, data)
+
+
+register_template(
+    'daily_digest',
+    'Your daily matches on iJodidar, {{first_name}}!',
+    """<div style="font-family:sans-serif;max-width:500px;margin:0 auto;">
+    <h2 style="color:#dc3545;">Today's Matches, {{first_name}}!</h2>
+    <p>Here are new profiles you might like:</p>
+    <table style="width:100%;border-collapse:collapse">{{#each matches}}<tr>
+    <td style='padding:8px'>{{name}}</td>
+    <td style='padding:8px'><a href='https://ijodidar.com/profile/{{id}}' style='color:#dc3545'>View</a></td>
+    </tr>{{/each}}</table>
+    <a href="https://ijodidar.com/home"
+       style="background:#dc3545;color:white;padding:12px 28px;
+       border-radius:25px;text-decoration:none;display:inline-block;margin-top:16px;">
+       See All Matches</a>
+    <p style="color:#999;font-size:11px;margin-top:16px;">
+    <a href="https://ijodidar.com/profile/settings" style="color:#999">
+    Unsubscribe from daily digest</a></p>
+    </div>""")
+
+
+# ── Backends ─────────────────────────────────────────────────────────────────
+class Backend:
+    """Base class. send() delivers one email; send_bulk() delivers one
+    template to up to bulk_max recipients and returns (sent, failed)."""
+    bulk_max = BULK_MAX
+
+    def send(self, to, subject, html):
+        raise NotImplementedError
+
+    def send_bulk(self, template, recipients):
+        sent = failed = 0
+        for to, data in recipients:
+            try:
+                self.send(to, *render(template, data))
+                sent += 1
+            except Exception:
+                failed += 1
+        return sent, failed
+
+
+class SESBackend(Backend):
+    """Amazon SES. The boto3 client is created once and reused."""
+
+    def __init__(self, region, sender):
+        import boto3
+        self.client  = boto3.client('ses', region_name=region)
+        self.sender  = sender
+        self._pushed = set()
+        self._lock   = threading.Lock()
+
+    def send(self, to, subject, html):
+        self.client.send_email(
+            Source=self.sender,
+            Destination={'ToAddresses': [to]},
+            Message={
+                'Subject': {'Data': subject, 'Charset': 'UTF-8'},
+                'Body':    {'Html': {'Data': html, 'Charset': 'UTF-8'}},
+            }
+        )
+
+    def _ensure_template(self, name):
+        """Create or update the SES copy of a template, once per process."""
+        if name in self._pushed:
+            return
+        with self._lock:
+            if name in self._pushed:
+                return
+            subject, body = TEMPLATES[name]
+            tpl = {'TemplateName': TEMPLATE_PREFIX + name,
+                   'SubjectPart': subject, 'HtmlPart': body}
+            try:
+                self.client.update_template(Template=tpl)
+            except self.client.exceptions.TemplateDoesNotExistException:
+                self.client.create_template(Template=tpl)
+            self._pushed.add(name)
+
+    def send_bulk(self, template, recipients):
+        self._ensure_template(template)
+        resp = self.client.send_bulk_templated_email(
+            Source=self.sender,
+            Template=TEMPLATE_PREFIX + template,
+            DefaultTemplateData='{}',
+            Destinations=[{'Destination': {'ToAddresses': [to]},
+                           'ReplacementTemplateData': json.dumps(data)}
+                          for to, data in recipients],
+        )
+        sent = sum(1 for s in resp.get('Status', []) if s.get('Status') == 'Success')
+        return sent, len(recipients) - sent
+
+
+class FileBackend(Backend):
+    """Local sink — one JSON line per rendered email in <directory>/outbox.jsonl.
+
+    latency  simulated seconds per API call (benchmarks)
+    """
+
+    def __init__(self, directory, latency=0.0):
+        os.makedirs(directory, exist_ok=True)
+        self.path    = os.path.join(directory, 'outbox.jsonl')
+        self.latency = latency
+        self._lock   = threading.Lock()
+
+    def _write(self, lines):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+
+    @staticmethod
+    def _line(to, subject, html):
+        return json.dumps({'to': to, 'subject': subject, 'html': html,
+                           'ts': time.time()}) + '\n'
+
+    def send(self, to, subject, html):
+        self._write([self._line(to, subject, html)])
+
+    def send_bulk(self, template, recipients):
+        self._write([self._line(to, *render(template, data)) for to, data in recipients])
+        return len(recipients), 0
+
+
+BACKENDS = {'ses': SESBackend, 'file': FileBackend}
+_backend = None
+
+
+def register_backend(name, cls):
+    BACKENDS[name] = cls
+
+
+def get_backend():
+    """The configured backend instance (cached per process), or None."""
+    global _backend
+    if _backend is None:
+        from flask import current_app
+        cfg    = current_app.config
+        name   = cfg.get('MAIL_BACKEND', '')
+        if not name:
+            name = 'ses' if cfg.get('MAIL_FROM') and cfg.get('AWS_REGION') else ''
+        if not name:
+            return None
+        cls = BACKENDS[name]
+        if cls is SESBackend:
+            _backend = cls(cfg['AWS_REGION'], cfg['MAIL_FROM'])
+        elif cls is FileBackend:
+            _backend = cls(cfg.get('MAIL_FILE_DIR') or 'instance/mail')
+        else:
+            _backend = cls()
+    return _backend
+
+
+def set_backend(backend):
+    """Override the process backend (tests / benchmarks)."""
+    global _backend
+    _backend = backend
+
+
+# ── Sending ──────────────────────────────────────────────────────────────────
+def send(to, subject, html):
+    """Send one email. False when mail is not configured; raises on send errors."""
+    backend = get_backend()
+    if backend is None:
+        return False
+    backend.send(to, subject, html)
+    return True
+
+
+def _retryable(exc):
+    """Throttling, 5xx or a dropped connection — worth sending again later.
+    Duck-typed on botocore's ClientError so this module stays stdlib-only."""
+    resp = getattr(exc, 'response', None)
+    if isinstance(resp, dict):
+        status = resp.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+        return resp.get('Error', {}).get('Code') in RETRYABLE_CODES or status >= 500
+    return isinstance(exc, (ConnectionError, TimeoutError)) or type(exc).__name__ in (
+        'EndpointConnectionError', 'ConnectionClosedError',
+        'ReadTimeoutError', 'ConnectTimeoutError')
+
+
+def send_bulk(template, recipients, retry=None):
+    """Send template to [(to, data)] in bulk_max-sized calls.
+    Returns {'sent', 'failed', 'skipped', 'requests'}.
+
+    retry: a list to collect the recipients of calls that failed with a
+    retryable error (see _retryable) instead of counting them as failed —
+    the caller re-sends just those, never the chunks that went out."""
+    stats   = dict.fromkeys(('sent', 'failed', 'skipped', 'requests'), 0)
+    backend = get_backend()
+    if backend is None:
+        stats['skipped'] = len(recipients)
+        return stats
+    for i in range(0, len(recipients), backend.bulk_max):
+        chunk = recipients[i:i + backend.bulk_max]
+        stats['requests'] += 1
+        try:
+            sent, failed = backend.send_bulk(template, chunk)
+        except Exception as e:
+            if retry is not None and _retryable(e):
+                retry.extend(chunk)
+                continue
+            sent, failed = 0, len(chunk)
+        stats['sent']   += sent
+        stats['failed'] += failed
+    return stats
@@ -150,9 +150,13 @@ def home():
     remaining     = scored[:24 - len(top_spotlight)]
     top           = top_spotlight + remaining
 
+    from app.presence import get_presence
+    presence = get_presence([u.id for _, u in top])   # one round-trip for all cards
+
     return render_template('main/home.html',
                            scored_users=top,
                            spotlight_count=len(top_spotlight),
+                           presence=presence,
                            user=current_user,
                            tab=tab,
                            has_preferences=bool(current_user.partner_preference))
@@ -193,15 +197,11 @@ def user_profile(username):
             db.session.add(ProfileView(viewer_id=current_user.id,
                                        viewed_id=user.id,
                                        timestamp=datetime.utcnow()))
+            # Notify profile owner — folded into today's "X and N others" row
+            from app.utils import notify_coalesced
+            notify_coalesced(user.id, 'profile_viewed', current_user.full_name,
+                             link=f'/{current_user.username}', commit=False)
             db.session.commit()
-            # Notify profile owner
-            from app.utils import create_notification
-            create_notification(
-                user_id    = user.id,
-                notif_type = 'profile_viewed',
-                message    = f'{current_user.full_name} viewed your profile.',
-                link       = f'/{current_user.username}',
-            )
         else:
             db.session.commit()
 
@@ -356,13 +356,13 @@ def delete_account():
             user.profile.birth_city    = None
 
         # Delete profile photos, notifications, family details
-        from app.models import ProfileImage, Notification, PhoneAlternate
-        from app.utils import delete_image_from_s3
+        from app.models import ProfileImage, ProfileImageVariant, Notification, PhoneAlternate
+        from app.images import delete_files
         for img in user.profile_images:
-            try:
-                delete_image_from_s3(img.image_url)
-            except Exception:
-                pass
+            delete_files(img)
+        ProfileImageVariant.query.filter(ProfileImageVariant.image_id.in_(
+            db.select(ProfileImage.id).where(ProfileImage.user_id == user_id))
+        ).delete(synchronize_session=False)
         ProfileImage.query.filter_by(user_id=user_id).delete()
         Notification.query.filter_by(user_id=user_id).delete()
         PhoneAlternate.query.filter_by(user_id=user_id).delete()
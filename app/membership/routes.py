@@ -34,6 +34,8 @@ def _activate_plan(user, plan, payment_ref, amount_paise):
     )
     db.session.add(sub)
     db.session.commit()
+    from app.capabilities import invalidate_plan
+    invalidate_plan(user.id)
     return sub
 
 
@@ -0,0 +1,188 @@
+"""
+coalesce.py — Server-side rate shaping for chatty socket events.
+
+Usage:
+    from app.messaging.coalesce import typing_event, typing_stop, relay_ice, discard_sid
+
+typing      A per-sid token bucket lets one `user_typing` through every
+            TYPING_INTERVAL seconds however fast the client emits `typing`.
+            A watcher emits `user_stopped_typing` once the sid has been quiet
+            for TYPING_IDLE seconds, so the receiver no longer guesses with
+            its own timer.
+ICE         Candidates are buffered per (sid, target) for ICE_BATCH_WINDOW
+            seconds (or until ICE_BATCH_MAX) and relayed as one
+            `webrtc_ice_candidates` frame.
+
+Counters (frames in vs frames out) are kept per process and added to the
+Redis hash `socket_stats` at most every STATS_FLUSH seconds; read the
+cluster-wide totals with get_socket_stats(). All state is in-process and
+keyed by sid — a sid only ever lives on one worker.
+"""
+import threading
+import time
+from collections import Counter
+
+TYPING_INTERVAL  = 2.0    # at most one user_typing per sid per interval
+TYPING_IDLE      = 3.0    # quiet this long → user_stopped_typing
+ICE_BATCH_WINDOW = 0.1    # seconds to gather candidates before relaying
+ICE_BATCH_MAX    = 10     # relay immediately once this many are buffered
+STATS_KEY        = 'socket_stats'
+STATS_FLUSH      = 60     # seconds between Redis counter flushes
+
+_lock    = threading.Lock()
+_typing  = {}             # sid → typing state
+_ice     = {}             # (sid, target_id) → {'from_id', 'candidates'}
+_counts  = Counter()
+_flushed = [time.monotonic()]
+
+
+class _TokenBucket:
+    """capacity tokens, refilled at `rate` per second."""
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate     = rate
+        self.tokens   = capacity
+        self.ts       = time.monotonic()
+
+    def take(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+        self.ts     = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+# ── Counters ─────────────────────────────────────────────────────────────────
+def _count(**deltas):
+    with _lock:
+        _counts.update(deltas)
+        due = time.monotonic() - _flushed[0] >= STATS_FLUSH
+        if due:
+            pending = dict(_counts)
+            _counts.clear()
+            _flushed[0] = time.monotonic()
+    if due:
+        _flush_counts(pending)
+
+
+def _flush_counts(pending):
+    try:
+        from app.cache import _get_client
+        pipe = _get_client().pipeline(transaction=False)
+        for k, v in pending.items():
+            pipe.hincrby(STATS_KEY, k, v)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def get_socket_stats():
+    """Cluster-wide frame counters, e.g. {'typing_in': 9120, 'typing_out': 611, ...}.
+    Lags each worker by up to STATS_FLUSH seconds."""
+    try:
+        from app.cache import _get_client
+        return {k.decode() if isinstance(k, bytes) else k: int(v)
+                for k, v in _get_client().hgetall(STATS_KEY).items()}
+    except Exception:
+        return {}
+
+
+# ── Typing ───────────────────────────────────────────────────────────────────
+def typing_event(socketio, sid, conv_id, user_id, first_name):
+    """Handle one `typing` frame from sid. Emits at most one user_typing per
+    TYPING_INTERVAL to the conversation room (excluding sid)."""
+    now = time.monotonic()
+    with _lock:
+        st = _typing.get(sid)
+        if st and st['conv_id'] != conv_id:
+            st = None                               # switched conversation
+        start_watch = st is None
+        if start_watch:
+            st = _typing[sid] = {
+                'conv_id': conv_id, 'user_id': user_id,
+                'bucket':  _TokenBucket(1, 1 / TYPING_INTERVAL),
+            }
+        st['last_key'] = now
+        allowed = st['bucket'].take(now)
+    _count(typing_in=1, typing_out=int(allowed))
+    if allowed:
+        socketio.emit('user_typing', {'user': first_name, 'sender_id': user_id},
+                      room=f'conv_{conv_id}', skip_sid=sid)
+    if start_watch:
+        socketio.start_background_task(_watch_typing, socketio, sid, st)
+
+
+def _watch_typing(socketio, sid, st):
+    wait = TYPING_IDLE
+    while True:
+        socketio.sleep(wait)
+        with _lock:
+            if _typing.get(sid) is not st:
+                return                              # stopped or replaced elsewhere
+            idle = time.monotonic() - st['last_key']
+            if idle >= TYPING_IDLE:
+                del _typing[sid]
+                break
+        wait = TYPING_IDLE - idle
+    _emit_stopped(socketio, sid, st)
+
+
+def typing_stop(socketio, sid, notify=True):
+    """sid sent a message or went away — end its typing state now.
+    notify=False when the peer learns it another way (the new_message itself)."""
+    with _lock:
+        st = _typing.pop(sid, None)
+    if st and notify:
+        _emit_stopped(socketio, sid, st)
+
+
+def _emit_stopped(socketio, sid, st):
+    _count(typing_stop_out=1)
+    socketio.emit('user_stopped_typing', {'sender_id': st['user_id']},
+                  room=f"conv_{st['conv_id']}", skip_sid=sid)
+
+
+# ── WebRTC ICE ───────────────────────────────────────────────────────────────
+def relay_ice(socketio, sid, from_id, target_id, candidate):
+    """Buffer one ICE candidate for target_id; relayed in batches."""
+    key = (sid, target_id)
+    with _lock:
+        buf = _ice.get(key)
+        start_flush = buf is None
+        if start_flush:
+            buf = _ice[key] = {'from_id': from_id, 'candidates': []}
+        buf['candidates'].append(candidate)
+        full = len(buf['candidates']) >= ICE_BATCH_MAX
+        if full:
+            del _ice[key]
+    _count(ice_in=1)
+    if full:
+        _emit_ice(socketio, target_id, buf)
+    elif start_flush:
+        socketio.start_background_task(_flush_ice_later, socketio, key, buf)
+
+
+def _flush_ice_later(socketio, key, buf):
+    socketio.sleep(ICE_BATCH_WINDOW)
+    with _lock:
+        if _ice.get(key) is not buf:
+            return                                  # already sent (batch filled up)
+        del _ice[key]
+    _emit_ice(socketio, key[1], buf)
+
+
+def _emit_ice(socketio, target_id, buf):
+    _count(ice_out=1)
+    socketio.emit('webrtc_ice_candidates', {
+        'candidates': buf['candidates'],
+        'from_id':    buf['from_id'],
+    }, room=f'user_{target_id}')
+
+
+def discard_sid(sid):
+    """Drop pending ICE batches for sid (hang-up / disconnect)."""
+    with _lock:
+        for key in [k for k in _ice if k[0] == sid]:
+            del _ice[key]
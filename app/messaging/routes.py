@@ -1,10 +1,11 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort
+from flask import (Blueprint, render_template, redirect, url_for, flash, request,
+                   jsonify, abort, current_app)
 from flask_login import login_required, current_user
-from sqlalchemy import or_, and_
+from sqlalchemy import or_
 from sqlalchemy.orm import joinedload, selectinload
 from app import db, limiter
-from app.models import Conversation, Message, User, Interest
-from app.cache import cache_delete
+from app.models import Conversation, Message, User
+from app.capabilities import can_message
 
 messaging_bp = Blueprint('messaging', __name__)
 
@@ -16,24 +17,6 @@ def _get_or_403(conv_id):
     return conv
 
 
-def _can_message(current_user, other_id):
-    """Return True if current_user is allowed to message other_id."""
-    plan    = current_user.active_subscription
-    can_msg = plan and plan.plan.can_message if plan else False
-    if not can_msg:
-        interest = Interest.query.filter(
-            or_(
-                and_(Interest.sender_id   == current_user.id,
-                     Interest.receiver_id == other_id),
-                and_(Interest.sender_id   == other_id,
-                     Interest.receiver_id == current_user.id),
-            ),
-            Interest.status == 'accepted'
-        ).first()
-        can_msg = bool(interest)
-    return can_msg
-
-
 # ── INBOX ──────────────────────────────────────────────────────────────────
 @messaging_bp.route('/messages')
 @login_required
@@ -45,7 +28,7 @@ def inbox():
                  joinedload(Conversation.user1).selectinload(User.profile_images),
                  joinedload(Conversation.user2).selectinload(User.profile_images),
              )
-             .order_by(Conversation.updated_at.desc())
+             .order_by(Conversation.last_message_at.desc())
              .all())
     return render_template('messaging/inbox.html',
                            user=current_user, conversations=convs)
@@ -58,7 +41,7 @@ def inbox():
 def conversation(conv_id):
     conv    = _get_or_403(conv_id)
     other   = conv.other_user(current_user.id)
-    can_msg = _can_message(current_user, other.id)
+    can_msg = can_message(current_user.id, other.id)
 
     if request.method == 'POST':
         # Gate 1: phone must be verified before messaging
@@ -74,84 +57,108 @@ def conversation(conv_id):
             flash('Invalid message.', 'danger')
             return redirect(url_for('messaging.conversation', conv_id=conv_id))
 
-        msg             = Message(conversation_id=conv_id,
-                                  sender_id=current_user.id, body=body)
-        conv.updated_at = db.func.now()
-        db.session.add(msg)
-        db.session.commit()
-        cache_delete(f'ctx_globals:{other.id}')
-
-        # In-app notification (sync — fast DB write)
-        from app.utils import create_notification
-        create_notification(
-            user_id    = other.id,
-            notif_type = 'new_message',
-            message    = f'{current_user.full_name} sent you a message.',
-            link       = f'/messages/{conv_id}',
-        )
-        # Async email + WhatsApp via Celery
-        try:
-            from app.tasks import send_message_email_task
-            send_message_email_task.delay(
-                other.id, current_user.full_name, body[:200], conv_id)
-        except Exception:
-            pass
+        # Message + in-app notification + WhatsApp outbox row in one transaction
+        # (send_message commits the session, including the pending outbox row)
+        from app import outbox
+        from app.messaging.service import send_message
+        if other.phone:
+            outbox.enqueue('send_whatsapp_task', other.phone, 'new_message',
+                           [other.first_name, current_user.full_name])
+        msg = send_message(conv, current_user.id, body,
+                           notify=current_user.full_name)
+
+        # Async email via Celery — one summary per receiver per conversation
+        # per MESSAGE_EMAIL_WINDOW, however many messages arrive in it
         try:
-            from app.utils import send_whatsapp
-            if other.phone:
-                send_whatsapp(other.phone, 'new_message',
-                              [other.first_name, current_user.full_name])
+            from app.tasks import send_message_digest_email_task
+            from app.dedupe import enqueue_coalesced
+            enqueue_coalesced(send_message_digest_email_task, f'msg-email:{other.id}:{conv_id}',
+                              current_app.config['MESSAGE_EMAIL_WINDOW'],
+                              item={'id': msg.id, 'sender': current_user.full_name,
+                                    'preview': body[:200]},
+                              args=(other.id, conv_id))
         except Exception:
             pass
 
         return redirect(url_for('messaging.conversation', conv_id=conv_id))
 
     # Mark received messages as read
-    (Message.query
-     .filter_by(conversation_id=conv_id, is_read=False)
-     .filter(Message.sender_id != current_user.id)
-     .update({'is_read': True}))
-    db.session.commit()
-    cache_delete(f'ctx_globals:{current_user.id}')
+    from app.messaging.service import mark_read
+    mark_read(conv, current_user.id)
 
-    uid = current_user.id
-    messages = [
-        m for m in conv.messages.all()
-        if not (m.sender_id == uid and m.is_deleted_by_sender)
-        and not (m.sender_id != uid and m.is_deleted_by_receiver)
-    ]
+    from app.messaging.service import history_page
+    from app.presence import is_online
+    before = request.args.get('before', type=int)
+    messages, has_more = history_page(conv, current_user.id, before=before)
     return render_template('messaging/conversation.html',
                            user=current_user, conv=conv, other=other,
-                           messages=messages, can_msg=can_msg)
+                           messages=messages, can_msg=can_msg, has_more=has_more,
+                           other_online=is_online(other.id),
+                           other_read_id=conv.read_watermark_for(other.id))
 
 
 # ── POLL (fallback for non-WS clients) ────────────────────────────────────
+# Read-only. ETag = conversation's last_message_id, so an unchanged poll is a
+# 304 after one primary-key read. ?wait=N (≤ 30 s) turns it into a long-poll
+# that blocks until a message arrives. Marking read is a separate POST.
+POLL_MAX_WAIT = 30
+
+
+def _poll_etag(last_id):
+    return f'"m{last_id or 0}"'
+
+
 @messaging_bp.route('/messages/<int:conv_id>/poll')
 @login_required
 def poll_messages(conv_id):
     conv     = _get_or_403(conv_id)
+    uid      = current_user.id
     after_id = request.args.get('after', 0, type=int)
-    uid  = current_user.id
+    wait     = max(0, min(POLL_MAX_WAIT, request.args.get('wait', 0, type=int)))
+    last_id  = conv.last_message_id or 0
+    etag     = _poll_etag(last_id)
+
+    known_id = after_id
+    if request.headers.get('If-None-Match') == etag:
+        known_id = max(known_id, last_id)
+    if last_id <= known_id:
+        if wait:
+            from app.messaging.service import wait_for_message
+            last_id = wait_for_message(conv_id, known_id, wait)
+        else:
+            last_id = None
+        if not last_id:
+            resp = current_app.response_class(status=304)
+            resp.headers['ETag'] = etag
+            resp.headers['Cache-Control'] = 'private, no-cache'
+            return resp
+
+    from app.messaging.service import visible_to
     msgs = (Message.query
-            .filter_by(conversation_id=conv_id)
-            .filter(Message.id > after_id)
-            .order_by(Message.sent_at.asc()).all())
-    for m in msgs:
-        if m.sender_id != uid:
-            m.is_read = True
-    db.session.commit()
-    visible = [
-        m for m in msgs
-        if not (m.sender_id == uid and m.is_deleted_by_sender)
-        and not (m.sender_id != uid and m.is_deleted_by_receiver)
-    ]
-    return jsonify([{
+            .filter(Message.conversation_id == conv_id,
+                    Message.id > after_id,
+                    visible_to(uid))
+            .order_by(Message.id.asc()).all())
+    resp = jsonify([{
         'id':        m.id,
         'body':      m.body,
         'sender_id': m.sender_id,
         'sent_at':   m.sent_at.strftime('%I:%M %p'),
         'is_mine':   m.sender_id == uid,
-    } for m in visible])
+    } for m in msgs])
+    resp.headers['ETag'] = _poll_etag(msgs[-1].id if msgs else last_id)
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
+
+
+# ── MARK READ (non-WS clients; WS clients emit mark_read) ──────────────────
+@messaging_bp.route('/messages/<int:conv_id>/read', methods=['POST'])
+@login_required
+def mark_conversation_read(conv_id):
+    conv = _get_or_403(conv_id)
+    from app.messaging.service import mark_read
+    mark_read(conv, current_user.id)
+    return jsonify({'success': True})
 
 
 # ── SOFT DELETE MESSAGE ────────────────────────────────────────────────────
@@ -159,7 +166,10 @@ def poll_messages(conv_id):
 @login_required
 def delete_message(conv_id, msg_id):
     _get_or_403(conv_id)
-    msg = Message.query.filter_by(id=msg_id, conversation_id=conv_id).first_or_404()
+    from app.messaging.service import find_message
+    msg = find_message(conv_id, msg_id)
+    if not msg:
+        abort(404)
     uid = current_user.id
     if msg.sender_id == uid:
         msg.is_deleted_by_sender = True
@@ -0,0 +1,287 @@
+"""
+service.py — the single write path for chat messages.
+
+Web form, Socket.IO and REST API all send and read through here so the
+denormalized inbox columns on `conversations` (last_message_*, unread_count_*,
+last_read_id_*) stay consistent. Counter changes are issued as SQL expressions
+(`unread_count_user2 = unread_count_user2 + 1`) so concurrent senders never
+lose an increment.
+
+Old messages of fully-read conversations are moved to `messages_archive` by
+archive_old_messages(); history_page() falls through to it transparently.
+"""
+import time
+from datetime import datetime, timedelta
+
+import redis
+from flask import current_app
+from sqlalchemy import and_, or_
+
+from app import db
+from app import counters as badges
+from app.models import Conversation, Message, ArchivedMessage
+
+PREVIEW_LEN  = 120
+HISTORY_PAGE = 30
+
+
+def _unread_col(conv, user_id):
+    return (Conversation.unread_count_user1 if user_id == conv.user1_id
+            else Conversation.unread_count_user2)
+
+
+def send_message(conv, sender_id, body, notify=None):
+    """Persist a message and bump the conversation's inbox state. Commits.
+
+    notify: sender's display name — the receiver's 'new_message' notification
+    is written (or coalesced into "X sent you N messages") in the same
+    transaction as the message.
+    """
+    now = datetime.utcnow()
+    msg = Message(conversation_id=conv.id, sender_id=sender_id,
+                  body=body, sent_at=now)
+    db.session.add(msg)
+    db.session.flush()   # need msg.id for last_message_id
+
+    receiver_id = conv.user2_id if sender_id == conv.user1_id else conv.user1_id
+    unread_col  = _unread_col(conv, receiver_id)
+    (Conversation.query
+     .filter_by(id=conv.id)
+     .update({
+         Conversation.last_message_id:        msg.id,
+         Conversation.last_message_sender_id: sender_id,
+         Conversation.last_message_at:        now,
+         Conversation.last_message_preview:   body[:PREVIEW_LEN],
+         Conversation.updated_at:             now,
+         unread_col:                          unread_col + 1,
+     }, synchronize_session=False))
+    if notify:
+        from app.utils import notify_coalesced
+        notify_coalesced(receiver_id, 'new_message', notify,
+                         link=f'/messages/{conv.id}',
+                         group_key=f'new_message:{conv.id}', commit=False)
+    db.session.commit()
+    db.session.refresh(conv)
+    badges.incr(receiver_id, 'messages')
+    _publish_new_message(conv.id, msg.id)
+    return msg
+
+
+def _watermark_col(conv, user_id):
+    return (Conversation.last_read_id_user1 if user_id == conv.user1_id
+            else Conversation.last_read_id_user2)
+
+
+def mark_read(conv, reader_id, emit_receipt=True):
+    """Advance reader_id's read watermark to the latest message. Commits.
+
+    One UPDATE on the conversation row, whatever the number of unread
+    messages — no per-row Message.is_read writes. Returns the number of
+    messages that were unread; a no-op (no writes) when it is already zero.
+    A `messages_read` receipt is pushed to the conversation room so the
+    sender's ticks update live.
+    """
+    unread = conv.unread_count_for(reader_id)
+    if not unread:
+        return 0
+    # Watermark and counter move together in one statement, reading
+    # last_message_id in SQL so a concurrent send can't slip between them.
+    (Conversation.query
+     .filter_by(id=conv.id)
+     .update({
+         _watermark_col(conv, reader_id): db.func.coalesce(Conversation.last_message_id, 0),
+         _unread_col(conv, reader_id):    0,
+     }, synchronize_session=False))
+    db.session.commit()
+    db.session.refresh(conv)
+    badges.decr(reader_id, 'messages', unread)
+    last_id = conv.read_watermark_for(reader_id)
+    if emit_receipt:
+        try:
+            from app import socketio
+            socketio.emit('messages_read', {
+                'conv_id':      conv.id,
+                'reader_id':    reader_id,
+                'last_read_id': last_id,
+            }, room=f'conv_{conv.id}')
+        except Exception:
+            pass   # receipts are best-effort
+    return unread
+
+
+def visible_to(user_id, model=Message):
+    """SQL filter hiding messages user_id has soft-deleted on their side."""
+    return or_(
+        and_(model.sender_id == user_id, model.is_deleted_by_sender == False),
+        and_(model.sender_id != user_id, model.is_deleted_by_receiver == False),
+    )
+
+
+def _page(model, conv_id, user_id, before, n):
+    q = model.query.filter(model.conversation_id == conv_id, visible_to(user_id, model))
+    if before:
+        q = q.filter(model.id < before)
+    return q.order_by(model.id.desc()).limit(n).all()
+
+
+def history_page(conv, user_id, before=None, limit=HISTORY_PAGE):
+    """One page of conversation history, newest page first, keyset on message id.
+
+    Walks ix_messages_conv_id (conversation_id, id) backwards from `before`
+    (exclusive). Fetches limit+1 rows so has_more needs no COUNT. When the hot
+    table runs out, the rest of the page comes from messages_archive — archived
+    ids are always older than the conversation's remaining hot ones.
+    Returns (messages in chronological order, has_more); rows may be Message
+    or ArchivedMessage, which share the same columns.
+    """
+    rows = _page(Message, conv.id, user_id, before, limit + 1)
+    if len(rows) <= limit:
+        floor = rows[-1].id if rows else before
+        rows += _page(ArchivedMessage, conv.id, user_id, floor, limit + 1 - len(rows))
+    has_more = len(rows) > limit
+    return list(reversed(rows[:limit])), has_more
+
+
+def find_message(conv_id, msg_id):
+    """A single message by id, hot table first, then the archive."""
+    return (Message.query.filter_by(id=msg_id, conversation_id=conv_id).first()
+            or ArchivedMessage.query.filter_by(id=msg_id, conversation_id=conv_id).first())
+
+
+# ── Archival ─────────────────────────────────────────────────────────────────
+_ARCHIVE_COLS = ('id', 'conversation_id', 'sender_id', 'body', 'sent_at',
+                 'is_deleted_by_sender', 'is_deleted_by_receiver')
+
+
+def _ensure_archive_partitions(first, last):
+    """PostgreSQL only: create the monthly partitions covering [first, last]."""
+    month = first.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while month <= last:
+        nxt = (month + timedelta(days=32)).replace(day=1)
+        db.session.execute(db.text(
+            f"CREATE TABLE IF NOT EXISTS messages_archive_y{month:%Y}m{month:%m} "
+            f"PARTITION OF messages_archive "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{nxt:%Y-%m-%d}')"))
+        month = nxt
+
+
+def archive_old_messages(days=None, batch_size=None, max_batches=200):
+    """Move messages older than `days` out of conversations with nothing
+    unread on either side into messages_archive. Needs an app context.
+
+    Works in id-ordered chunks: INSERT … SELECT then DELETE, one transaction
+    per chunk, so the hot table is never locked for long and a crash loses
+    nothing. Returns the number of messages moved.
+    """
+    days       = days or current_app.config.get('MESSAGE_ARCHIVE_DAYS', 180)
+    batch_size = batch_size or current_app.config.get('MESSAGE_ARCHIVE_BATCH', 5000)
+    cutoff     = datetime.utcnow() - timedelta(days=days)
+    partitioned = db.engine.dialect.name == 'postgresql'
+
+    eligible = (db.select(Message.id)
+                .join(Conversation, Conversation.id == Message.conversation_id)
+                .where(Message.sent_at < cutoff,
+                       Conversation.unread_count_user1 == 0,
+                       Conversation.unread_count_user2 == 0)
+                .order_by(Message.id)
+                .limit(batch_size))
+    moved = 0
+    for _ in range(max_batches):
+        ids = db.session.execute(eligible).scalars().all()
+        if not ids:
+            break
+        if partitioned:
+            first, last = db.session.execute(
+                db.select(db.func.min(Message.sent_at), db.func.max(Message.sent_at))
+                .where(Message.id.in_(ids))).one()
+            _ensure_archive_partitions(first, last)
+        src = db.select(*[getattr(Message, c) for c in _ARCHIVE_COLS],
+                        db.literal(datetime.utcnow(), db.DateTime)
+                        ).where(Message.id.in_(ids))
+        db.session.execute(db.insert(ArchivedMessage).from_select(
+            [*_ARCHIVE_COLS, 'archived_at'], src))
+        db.session.execute(db.delete(Message).where(Message.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
+    return moved
+
+
+# ── Long-poll wake-ups ───────────────────────────────────────────────────────
+# send_message() publishes the new id on conv:{id}; /poll?wait=N subscribers
+# block on that channel instead of re-querying. Without Redis, waiters fall
+# back to a 1 s read-only check of conversations.last_message_id.
+
+_pubsub_client = None
+
+
+def _channel(conv_id):
+    return f'conv:{conv_id}'
+
+
+def _get_pubsub_client():
+    # Separate client: app.cache's 0.5 s socket_timeout would abort blocking reads
+    global _pubsub_client
+    if _pubsub_client is None:
+        from app.cache import _redis_url
+        _pubsub_client = redis.from_url(_redis_url(), decode_responses=True,
+                                        socket_connect_timeout=1)
+    return _pubsub_client
+
+
+def _publish_new_message(conv_id, msg_id):
+    try:
+        from app.cache import _get_client
+        _get_client().publish(_channel(conv_id), msg_id)
+    except Exception:
+        pass
+
+
+def _current_last_id(conv_id):
+    last = (db.session.query(Conversation.last_message_id)
+            .filter_by(id=conv_id).scalar())
+    db.session.rollback()   # hand the connection back to the pool while we wait
+    return last or 0
+
+
+def wait_for_message(conv_id, after_id, timeout):
+    """Block cooperatively until conv_id has a message newer than after_id,
+    or timeout seconds pass. Read-only. Returns the new last id or None.
+
+    Subscribes before re-checking the row so a message sent in between is
+    never missed. Under gevent/eventlet both the Redis read and time.sleep
+    yield to other greenlets.
+    """
+    pubsub = None
+    try:
+        pubsub = _get_pubsub_client().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(_channel(conv_id))
+    except Exception:
+        pubsub = None
+    deadline = time.monotonic() + timeout
+    try:
+        last = _current_last_id(conv_id)
+        if last > after_id:
+            return last
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if pubsub is not None:
+                try:
+                    event = pubsub.get_message(timeout=min(remaining, 5))
+                except Exception:
+                    pubsub = None
+                    continue
+                if event and int(event['data']) > after_id:
+                    return int(event['data'])
+            else:
+                time.sleep(min(remaining, 1))
+                last = _current_last_id(conv_id)
+                if last > after_id:
+                    return last
+    finally:
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
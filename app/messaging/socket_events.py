@@ -2,10 +2,9 @@
 socket_events.py — Flask-SocketIO real-time chat events.
 Registered in app/__init__.py via register_socket_events(socketio).
 """
-from flask import request
+from flask import request, current_app
 from flask_socketio import emit, join_room, leave_room
 from flask_login import current_user
-from datetime import datetime
 
 
 def register_socket_events(socketio):
@@ -15,10 +14,36 @@ def register_socket_events(socketio):
         if current_user.is_authenticated:
             # Each user joins a personal room for direct notifications
             join_room(f'user_{current_user.id}')
+            from app.presence import connect
+            connect(current_user.id, request.sid)
 
     @socketio.on('disconnect')
     def on_disconnect():
-        pass
+        from app.messaging.coalesce import typing_stop, discard_sid
+        typing_stop(socketio, request.sid)
+        discard_sid(request.sid)
+        if current_user.is_authenticated:
+            from app.presence import disconnect
+            disconnect(current_user.id, request.sid)
+
+    @socketio.on('heartbeat')
+    def on_heartbeat(data=None):
+        """Client keep-alive (every HEARTBEAT_INTERVAL s). Optional `watch`: list of
+        user ids whose presence the client wants back — answered in one batch lookup."""
+        if not current_user.is_authenticated:
+            return
+        from app.presence import heartbeat, get_presence
+        heartbeat(current_user.id)
+        watch = (data or {}).get('watch') or []
+        if not isinstance(watch, list):
+            return
+        ids = [int(i) for i in watch[:50] if str(i).isdigit()]
+        if ids:
+            emit('presence', {
+                str(uid): {'online': p['online'],
+                           'last_seen': p['last_seen'].isoformat() if p['last_seen'] else None}
+                for uid, p in get_presence(ids).items()
+            }, room=request.sid)
 
     @socketio.on('join_conversation')
     def on_join(data):
@@ -41,14 +66,26 @@ def register_socket_events(socketio):
         conv_id = data.get('conv_id')
         leave_room(f'conv_{conv_id}')
 
+    @socketio.on('mark_read')
+    def on_mark_read(data):
+        """Client has seen the conversation — advance its read watermark."""
+        if not current_user.is_authenticated:
+            return
+        from app.models import Conversation
+        from app.messaging.service import mark_read
+        conv = Conversation.query.get(data.get('conv_id'))
+        if not conv:
+            return
+        if conv.user1_id != current_user.id and conv.user2_id != current_user.id:
+            return
+        mark_read(conv, current_user.id)
+
     @socketio.on('send_message')
     def on_send_message(data):
         """Receive message from client, save to DB, broadcast to room."""
         if not current_user.is_authenticated:
             return
-        from app import db
-        from app.models import Conversation, Message, User
-        from app.utils import create_notification
+        from app.models import Conversation, User
 
         conv_id = data.get('conv_id')
         body    = (data.get('body') or '').strip()
@@ -61,33 +98,19 @@ def register_socket_events(socketio):
         if conv.user1_id != current_user.id and conv.user2_id != current_user.id:
             return
 
-        # Check messaging permission
-        from sqlalchemy import or_, and_
-        from app.models import Interest
+        # Check messaging permission (cached capability — shared with web + API)
+        from app.capabilities import can_message
         other_id = conv.user2_id if conv.user1_id == current_user.id else conv.user1_id
-        plan     = current_user.active_subscription
-        can_msg  = plan and plan.plan.can_message if plan else False
-        if not can_msg:
-            interest = Interest.query.filter(
-                or_(
-                    and_(Interest.sender_id   == current_user.id,
-                         Interest.receiver_id == other_id),
-                    and_(Interest.sender_id   == other_id,
-                         Interest.receiver_id == current_user.id),
-                ),
-                Interest.status == 'accepted'
-            ).first()
-            can_msg = bool(interest)
-        if not can_msg:
+        if not can_message(current_user.id, other_id):
             emit('error', {'msg': 'Upgrade plan to send messages.'}, room=request.sid)
             return
 
-        # Save message
-        msg              = Message(conversation_id=conv_id,
-                                   sender_id=current_user.id, body=body)
-        conv.updated_at  = datetime.utcnow()
-        db.session.add(msg)
-        db.session.commit()
+        # Save message + receiver's in-app notification (one transaction)
+        from app.messaging.service import send_message
+        from app.messaging.coalesce import typing_stop
+        msg = send_message(conv, current_user.id, body,
+                           notify=current_user.full_name)
+        typing_stop(socketio, request.sid, notify=False)   # new_message clears it client-side
 
         payload = {
             'id':        msg.id,
@@ -100,21 +123,18 @@ def register_socket_events(socketio):
         emit('new_message', {**payload, 'sender_id': msg.sender_id},
              room=f'conv_{conv_id}')
 
-        # In-app notification to receiver
+        # The receiver's bell is updated by the notification's after-commit hook
         other = User.query.get(other_id)
         if other:
-            create_notification(
-                user_id    = other_id,
-                notif_type = 'new_message',
-                message    = f'{current_user.full_name} sent you a message.',
-                link       = f'/messages/{conv_id}',
-            )
-            # Emit real-time notification badge update to receiver's personal room
-            socketio.emit('notif_update', {}, room=f'user_{other_id}')
-
-            # Email via Celery — never block the SocketIO event loop
-            from app.tasks import send_message_email_task
-            send_message_email_task.delay(other_id, current_user.full_name, body[:200], conv_id)
+            # Email via Celery — never block the SocketIO event loop. Coalesced:
+            # one summary per receiver per conversation per MESSAGE_EMAIL_WINDOW
+            from app.tasks import send_message_digest_email_task
+            from app.dedupe import enqueue_coalesced
+            enqueue_coalesced(send_message_digest_email_task, f'msg-email:{other_id}:{conv_id}',
+                              current_app.config['MESSAGE_EMAIL_WINDOW'],
+                              item={'id': msg.id, 'sender': current_user.full_name,
+                                    'preview': body[:200]},
+                              args=(other_id, conv_id))
 
     # ── WebRTC Signalling (Phase 13.1) ───────────────────────────────────
     @socketio.on('webrtc_offer')
@@ -158,22 +178,22 @@ def register_socket_events(socketio):
 
     @socketio.on('webrtc_ice_candidate')
     def on_webrtc_ice(data):
-        """Relay ICE candidate between peers."""
+        """Relay ICE candidates between peers, batched (see coalesce.py)."""
         if not current_user.is_authenticated:
             return
         target_id = data.get('target_id')
         candidate = data.get('candidate')
         if target_id and candidate:
-            socketio.emit('webrtc_ice_candidate', {
-                'candidate': candidate,
-                'from_id':   current_user.id,
-            }, room=f'user_{target_id}')
+            from app.messaging.coalesce import relay_ice
+            relay_ice(socketio, request.sid, current_user.id, target_id, candidate)
 
     @socketio.on('webrtc_hang_up')
     def on_webrtc_hang_up(data):
         """Signal hang-up to the other participant."""
         if not current_user.is_authenticated:
             return
+        from app.messaging.coalesce import discard_sid
+        discard_sid(request.sid)
         target_id = data.get('target_id')
         if target_id:
             socketio.emit('webrtc_hang_up', {
@@ -193,10 +213,12 @@ def register_socket_events(socketio):
 
     @socketio.on('typing')
     def on_typing(data):
-        """Broadcast typing indicator to conversation room."""
+        """Typing indicator — throttled per sid, with an automatic stop event."""
         if not current_user.is_authenticated:
             return
         conv_id = data.get('conv_id')
-        emit('user_typing',
-             {'user': current_user.first_name, 'sender_id': current_user.id},
-             room=f'conv_{conv_id}', include_self=False)
+        if not conv_id:
+            return
+        from app.messaging.coalesce import typing_event
+        typing_event(socketio, request.sid, conv_id,
+                     current_user.id, current_user.first_name)
@@ -45,6 +45,13 @@ class UserSubscription(db.Model):
     # Manual payment tracking (Phase 17)
     # payment_ref 'PENDING:xxx' = awaiting admin verification
 
+    __table_args__ = (
+        # Expiry sweep (app.sweepers) — only live, expiring rows are indexed
+        db.Index('ix_subs_active_expiry', 'expires_at',
+                 postgresql_where=db.text('is_active = true AND expires_at IS NOT NULL'),
+                 sqlite_where=db.text('is_active = 1 AND expires_at IS NOT NULL')),
+    )
+
     def interests_remaining(self):
         """Return interests left this month. Auto-resets monthly."""
         from datetime import timedelta
@@ -105,6 +112,19 @@ class User(UserMixin, db.Model):
     languages            = db.relationship('Language',            backref='user', cascade='all, delete-orphan')
     subscriptions        = db.relationship('UserSubscription',    backref='user', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # Token expiry sweeps (app.sweepers) — rows without a pending token aren't indexed
+        db.Index('ix_users_phone_otp_expiry', 'phone_otp_expiry',
+                 postgresql_where=db.text('phone_otp_expiry IS NOT NULL'),
+                 sqlite_where=db.text('phone_otp_expiry IS NOT NULL')),
+        db.Index('ix_users_reset_token_expiry', 'reset_token_expiry',
+                 postgresql_where=db.text('reset_token_expiry IS NOT NULL'),
+                 sqlite_where=db.text('reset_token_expiry IS NOT NULL')),
+        db.Index('ix_users_verify_token_expiry', 'verify_token_expiry',
+                 postgresql_where=db.text('verify_token_expiry IS NOT NULL'),
+                 sqlite_where=db.text('verify_token_expiry IS NOT NULL')),
+    )
+
     def set_password(self, password):
         self.password_hash  = generate_password_hash(password)
         self.session_version = (self.session_version or 1) + 1  # invalidate all sessions
@@ -238,6 +258,19 @@ class Conversation(db.Model):
     created_at  = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at  = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     interest_id = db.Column(db.Integer, db.ForeignKey('interests.id'), nullable=True)
+    # Denormalized inbox state — maintained by app.messaging.service, never by hand.
+    # last_message_at doubles as "last activity" (= created_at until the first message)
+    # so the inbox can be a single indexed ORDER BY.
+    last_message_id        = db.Column(db.Integer, nullable=True)
+    last_message_sender_id = db.Column(db.Integer, nullable=True)
+    last_message_at        = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_message_preview   = db.Column(db.String(120), nullable=True)
+    unread_count_user1     = db.Column(db.Integer, default=0, nullable=False)   # unread by user1
+    unread_count_user2     = db.Column(db.Integer, default=0, nullable=False)   # unread by user2
+    # Read watermarks — highest message id each participant has read. Replaces
+    # per-row Message.is_read updates; marking read is one O(1) UPDATE here.
+    last_read_id_user1     = db.Column(db.Integer, default=0, nullable=False)
+    last_read_id_user2     = db.Column(db.Integer, default=0, nullable=False)
 
     user1    = db.relationship('User', foreign_keys=[user1_id], backref='conversations_as_user1')
     user2    = db.relationship('User', foreign_keys=[user2_id], backref='conversations_as_user2')
@@ -246,6 +279,8 @@ class Conversation(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('user1_id', 'user2_id', name='uq_conversation'),
+        db.Index('ix_conv_user1_last_msg', 'user1_id', 'last_message_at'),
+        db.Index('ix_conv_user2_last_msg', 'user2_id', 'last_message_at'),
     )
 
     def other_user(self, current_id):
@@ -254,6 +289,27 @@ class Conversation(db.Model):
     def last_message(self):
         return self.messages.order_by(db.text('sent_at desc')).first()
 
+    def unread_count_for(self, user_id):
+        """Unread messages for user_id in this conversation — no query."""
+        if user_id == self.user1_id:
+            return self.unread_count_user1 or 0
+        if user_id == self.user2_id:
+            return self.unread_count_user2 or 0
+        return 0
+
+    def read_watermark_for(self, user_id):
+        """Highest message id user_id has read in this conversation."""
+        if user_id == self.user1_id:
+            return self.last_read_id_user1 or 0
+        if user_id == self.user2_id:
+            return self.last_read_id_user2 or 0
+        return 0
+
+    def message_is_read(self, msg):
+        """Has the receiver of msg read it? Derived from the receiver's watermark."""
+        receiver_id = self.user2_id if msg.sender_id == self.user1_id else self.user1_id
+        return msg.id <= self.read_watermark_for(receiver_id)
+
 
 class Message(db.Model):
     __tablename__ = 'messages'
@@ -261,6 +317,8 @@ class Message(db.Model):
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
     sender_id       = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     body            = db.Column(db.Text, nullable=False)
+    # Deprecated — no longer written. Read state lives in the conversation's
+    # last_read_id_user1/2 watermarks; use Conversation.message_is_read(msg).
     is_read         = db.Column(db.Boolean, default=False)
     sent_at         = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     is_deleted_by_sender   = db.Column(db.Boolean, default=False, nullable=False)
@@ -268,6 +326,36 @@ class Message(db.Model):
 
     sender = db.relationship('User', foreign_keys=[sender_id], backref='messages_sent')
 
+    __table_args__ = (
+        # Keyset history pagination: WHERE conversation_id = ? AND id < ? ORDER BY id DESC
+        db.Index('ix_messages_conv_id', 'conversation_id', 'id'),
+    )
+
+
+class ArchivedMessage(db.Model):
+    """Cold copy of a Message, moved out of `messages` by the archive-messages
+    Beat task. Keeps the original id, so keyset pagination continues seamlessly.
+    On PostgreSQL the table is range-partitioned by month on sent_at
+    (primary key (id, sent_at) there; partitions created on demand)."""
+    __tablename__ = 'messages_archive'
+    id              = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
+    sender_id       = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    body            = db.Column(db.Text, nullable=False)
+    sent_at         = db.Column(db.DateTime, nullable=False)
+    is_deleted_by_sender   = db.Column(db.Boolean, default=False, nullable=False)
+    is_deleted_by_receiver = db.Column(db.Boolean, default=False, nullable=False)
+    archived_at     = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    sender       = db.relationship('User', foreign_keys=[sender_id])
+    conversation = db.relationship('Conversation', backref=db.backref(
+        'archived_messages', lazy='dynamic', order_by='ArchivedMessage.id',
+        cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.Index('ix_messages_archive_conv_id', 'conversation_id', 'id'),
+    )
+
 
 # ─────────────────────────────────────────────
 #  SHORTLIST / SAVED PROFILES
@@ -426,9 +514,64 @@ class ProfileImage(db.Model):
     image_url   = db.Column(db.String(500), nullable=False)   # full size
     thumb_url   = db.Column(db.String(500), nullable=True)    # 150px square
     card_url    = db.Column(db.String(500), nullable=True)    # 400px
+    original_key = db.Column(db.String(300), nullable=True)   # storage key of the upload as received
+    # processing → ready (sizes built) | failed. image_url is the placeholder until ready.
+    status      = db.Column(db.String(12), nullable=False, default='ready', server_default='ready')
     is_primary  = db.Column(db.Boolean, default=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Every size × format the pipeline produced (app/images.py); loaded in one
+    # IN query per batch of photos, so feeds don't go N+1
+    variants    = db.relationship('ProfileImageVariant', lazy='selectin',
+                                  cascade='all, delete-orphan',
+                                  order_by='ProfileImageVariant.width')
+
+    SOURCE_TYPES = (('avif', 'image/avif'), ('webp', 'image/webp'))
+
+    def stored_keys(self, store):
+        """Every storage key behind this photo (app.storage backend `store`),
+        including the legacy image/card/thumb columns of older uploads."""
+        keys = [self.original_key, *(v.key for v in self.variants),
+                *map(store.key_for, (self.image_url, self.card_url, self.thumb_url))]
+        return [k for k in keys if k]
+
+    def srcset(self, fmt='jpeg', expiry=3600):
+        """'url 150w, url 400w, url 800w' for one format ('' if none). URLs are
+        signed for `expiry` s (objects are private; S3 signing is memoized)."""
+        variants = [v for v in self.variants if v.format == fmt]
+        if not variants:
+            return ''
+        try:
+            from app.storage import get_backend
+            store = get_backend()
+            urls  = [store.signed_url(v.key, expiry) for v in variants]
+        except Exception:
+            urls  = [v.url for v in variants]
+        return ', '.join(f'{url} {v.width}w' for url, v in zip(urls, variants))
+
+    @property
+    def sources(self):
+        """[(mime, srcset)] for <picture><source>, smallest format first."""
+        return [(mime, self.srcset(fmt)) for fmt, mime in self.SOURCE_TYPES
+                if any(v.format == fmt for v in self.variants)]
+
+
+class ProfileImageVariant(db.Model):
+    """One encoded size of a ProfileImage — jpeg / webp / avif at 150, 400, 800 px."""
+    __tablename__ = 'profile_image_variants'
+    id       = db.Column(db.Integer, primary_key=True)
+    image_id = db.Column(db.Integer, db.ForeignKey('profile_images.id', ondelete='CASCADE'),
+                         nullable=False, index=True)
+    format   = db.Column(db.String(8), nullable=False)     # jpeg | webp | avif
+    width    = db.Column(db.Integer, nullable=False)       # square, px
+    key      = db.Column(db.String(300), nullable=False)   # app.storage key
+    url      = db.Column(db.String(500), nullable=False)   # store.url(key), for templates
+    bytes    = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('image_id', 'format', 'width', name='uq_image_variant'),
+    )
+
 
 class Language(db.Model):
     __tablename__ = 'languages'
@@ -449,6 +592,10 @@ class ProfileView(db.Model):
     viewer = db.relationship('User', foreign_keys=[viewer_id], backref='views_made')
     viewed = db.relationship('User', foreign_keys=[viewed_id], backref='views_received')
 
+    __table_args__ = (
+        db.Index('ix_profile_views_timestamp', 'timestamp'),   # retention sweep
+    )
+
 
 # ─────────────────────────────────────────────
 #  PHASE 4 MODELS
@@ -554,9 +701,43 @@ class Notification(db.Model):
     link       = db.Column(db.String(200), default='')
     is_read    = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # NULL until the push dispatcher (app.push) has handled the row
+    pushed_at  = db.Column(db.DateTime, nullable=True)
 
     user = db.relationship('User', foreign_keys=[user_id], backref='notifications')
 
+    __table_args__ = (
+        # Partial: only the (small) pending set is indexed
+        db.Index('ix_notifications_push_pending', 'id',
+                 postgresql_where=db.text('pushed_at IS NULL'),
+                 sqlite_where=db.text('pushed_at IS NULL')),
+        # Retention sweep: read rows past the cutoff (app.retention)
+        db.Index('ix_notifications_read_created', 'is_read', 'created_at'),
+    )
+
+
+class NotificationRollup(db.Model):
+    """Coalescing state for one open Notification. While the window is open and
+    the notification unread, further events with the same group_key update that
+    row ("Priya and 14 others viewed your profile") instead of adding rows.
+    Maintained by app.utils.notify_coalesced()."""
+    __tablename__ = 'notification_rollups'
+    id              = db.Column(db.Integer, primary_key=True)
+    notification_id = db.Column(db.Integer, db.ForeignKey('notifications.id', ondelete='CASCADE'),
+                                nullable=False, unique=True)
+    user_id         = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    group_key       = db.Column(db.String(60), nullable=False)   # type, or type:{conv_id}
+    window_start    = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    actor_count     = db.Column(db.Integer, default=1, nullable=False)
+    last_actor_name = db.Column(db.String(80), nullable=False)
+
+    notification = db.relationship('Notification', backref=db.backref(
+        'rollup', uselist=False, cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.Index('ix_notif_rollup_open', 'user_id', 'group_key', 'window_start'),
+    )
+
 
 # ─────────────────────────────────────────────
 #  SUCCESS STORY  (Phase 7.4)
@@ -604,6 +785,7 @@ class UserSignal(db.Model):
     __table_args__ = (
         db.Index('ix_signal_user_target', 'user_id', 'target_user_id'),
         db.Index('ix_signal_user_type',   'user_id', 'signal_type'),
+        db.Index('ix_signal_created',     'created_at'),             # retention sweep
     )
 
 
@@ -821,3 +1003,26 @@ class UserDevice(db.Model):
     created_at  = db.Column(db.DateTime, default=datetime.utcnow)
 
     user = db.relationship('User', foreign_keys=[user_id], backref='devices')
+
+
+# ─────────────────────────────────────────────
+#  OUTBOX  (side effects committed with the business change)
+# ─────────────────────────────────────────────
+class OutboxEvent(db.Model):
+    """A Celery task to run once the surrounding transaction commits.
+    Written by app.outbox.enqueue(), dispatched by the outbox relay."""
+    __tablename__ = 'outbox'
+    id            = db.Column(db.Integer, primary_key=True)
+    task          = db.Column(db.String(80), nullable=False)    # app.tasks function name
+    payload       = db.Column(db.Text, nullable=False, default='[]')   # JSON args; cleared when processed
+    created_at    = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    dispatched_at = db.Column(db.DateTime, nullable=True)       # last handed to the broker
+    attempts      = db.Column(db.Integer, default=0, nullable=False)
+    started_at    = db.Column(db.DateTime, nullable=True)       # a run's lease (outbox.begin)
+    processed_at  = db.Column(db.DateTime, nullable=True)       # task finished successfully
+
+    __table_args__ = (
+        db.Index('ix_outbox_unprocessed', 'id',
+                 postgresql_where=db.text('processed_at IS NULL'),
+                 sqlite_where=db.text('processed_at IS NULL')),
+    )
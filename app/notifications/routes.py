@@ -2,6 +2,8 @@ from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
 from app import db
 from app.models import Notification
+from app.counters import get_badges, decr
+from app.utils import emit_notif_update
 
 notifications_bp = Blueprint('notifications', __name__)
 
@@ -9,9 +11,7 @@ notifications_bp = Blueprint('notifications', __name__)
 @notifications_bp.route('/notifications/unread-count')
 @login_required
 def unread_count():
-    count = Notification.query.filter_by(
-        user_id=current_user.id, is_read=False).count()
-    return jsonify(count=count)
+    return jsonify(count=get_badges(current_user.id)['notifs'])
 
 
 @notifications_bp.route('/notifications/list')
@@ -36,14 +36,17 @@ def list_notifications():
 def mark_read():
     ids = request.json.get('ids', [])
     if ids:
-        Notification.query.filter(
+        updated = Notification.query.filter(
             Notification.id.in_(ids),
-            Notification.user_id == current_user.id
+            Notification.user_id == current_user.id,
+            Notification.is_read == False
         ).update({'is_read': True}, synchronize_session=False)
     else:
         # Mark all read
-        Notification.query.filter_by(
+        updated = Notification.query.filter_by(
             user_id=current_user.id, is_read=False
         ).update({'is_read': True})
     db.session.commit()
+    decr(current_user.id, 'notifs', updated)
+    emit_notif_update([current_user.id])       # sync the user's other tabs
     return jsonify(success=True)
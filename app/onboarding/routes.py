@@ -165,11 +165,10 @@ def photo():
         if 'skip' in request.form:
             return redirect(url_for('onboarding.preferences'))
 
-        from app.utils import upload_image_to_s3
+        from app.images import store_original, PLACEHOLDER_URL
         from app.models import ProfileImage
         file = request.files.get('image')
-        full_url, thumb_url, card_url, err = upload_image_to_s3(
-            file, user_id=current_user.id)
+        original_key, err = store_original(file, user_id=current_user.id)
         if err:
             flash(err, 'danger')
             return render_template('onboarding/photo.html',
@@ -178,10 +177,13 @@ def photo():
         # Make primary
         ProfileImage.query.filter_by(
             user_id=current_user.id, is_primary=True).update({'is_primary': False})
-        db.session.add(ProfileImage(
-            user_id=current_user.id,
-            image_url=full_url, thumb_url=thumb_url,
-            card_url=card_url, is_primary=True))
+        img = ProfileImage(user_id=current_user.id, original_key=original_key,
+                           image_url=PLACEHOLDER_URL, status='processing', is_primary=True)
+        db.session.add(img)
+        db.session.flush()
+        # Sizes are built on the uploads queue; the placeholder shows until then
+        from app import outbox
+        outbox.enqueue('upload_image_task', img.id)
         db.session.commit()
         flash('Photo uploaded!', 'success')
         return redirect(url_for('onboarding.preferences'))
@@ -0,0 +1,166 @@
+"""
+Transactional outbox — side effects that commit (or roll back) with the
+business change that caused them.
+
+Usage:
+    from app import outbox
+    outbox.enqueue('send_whatsapp_task', phone, 'interest_received', [a, b])
+    db.session.commit()          # the interest and its WhatsApp row, together
+
+enqueue() only adds an OutboxEvent row to the current session; nothing
+leaves the process until the caller commits, and a rolled-back request
+sends nothing. After the commit a relay_outbox task is kicked so delivery
+is immediate; the outbox-relay Beat task sweeps up anything the kick missed
+(broker down, worker crash).
+
+relay() claims unprocessed rows (FOR UPDATE SKIP LOCKED — relays never
+contend), publishes each to its Celery task with task_id 'outbox-<id>' and
+stamps dispatched_at. Rows dispatched REDISPATCH_AFTER ago but still not
+processed, and not running under a live lease, are published again, up to
+MAX_ATTEMPTS. After that — or for an unknown task — the row is parked: its
+payload is cleared and the event logged as an error.
+
+Duplicates are stopped at the consumer: ContextTask (app/tasks.py) calls
+begin() before running a task whose id is 'outbox-<id>'. begin() is one
+conditional UPDATE that stamps started_at only if the row is unprocessed
+and no other run holds a lease younger than LEASE; if no row is updated
+the task is skipped. complete() marks the row processed after the task
+returns; release() drops the lease when it raises, so a Celery retry can
+claim it again. A publish repeated after a relay crash therefore runs once.
+Processed rows have their payload cleared (it can carry OTPs and phone
+numbers); the retention job deletes them after a week.
+"""
+import json
+from datetime import datetime, timedelta
+
+TASK_ID_PREFIX   = 'outbox-'
+RELAY_BATCH      = 500
+REDISPATCH_AFTER = timedelta(minutes=15)   # > the longest task retry window
+LEASE            = REDISPATCH_AFTER         # a run's claim on its row expires after this
+MAX_ATTEMPTS     = 5
+
+
+def enqueue(task, *args):
+    """Add `app.tasks.<task>(*args)` to the caller's transaction."""
+    from app import db
+    from app.models import OutboxEvent
+    from app.utils import _on_commit
+    db.session.add(OutboxEvent(task=task, payload=json.dumps(args),
+                               created_at=datetime.utcnow()))
+    _on_commit(_kick)
+
+
+def _kick():
+    try:
+        from app.tasks import relay_outbox
+        relay_outbox.delay()
+    except Exception:
+        pass   # Beat's outbox-relay picks the rows up
+
+
+# ── Relay ────────────────────────────────────────────────────────────────────
+def relay(limit=RELAY_BATCH):
+    """Publish pending (and stale dispatched) rows, park exhausted ones.
+    Returns the count published."""
+    from app import db
+    from app.models import OutboxEvent as E
+    from app.tasks import celery
+    now  = datetime.utcnow()
+    idle = db.or_(E.started_at.is_(None), E.started_at < now - LEASE)
+    rows = (E.query
+            .filter(E.processed_at.is_(None),
+                    E.attempts < MAX_ATTEMPTS,
+                    db.or_(E.dispatched_at.is_(None),
+                           E.dispatched_at < now - REDISPATCH_AFTER),
+                    idle)
+            .order_by(E.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all())
+    published = 0
+    for row in rows:
+        task = celery.tasks.get(f'app.tasks.{row.task}')
+        row.attempts += 1
+        if task is None:
+            _park(row, 'unknown task')
+            continue
+        try:
+            task.apply_async(args=json.loads(row.payload),
+                             task_id=f'{TASK_ID_PREFIX}{row.id}')
+        except Exception:
+            continue                           # broker down — retry next sweep
+        row.dispatched_at = now
+        published += 1
+
+    # Last attempt published, window passed, still not processed — give up
+    for row in (E.query
+                .filter(E.processed_at.is_(None),
+                        E.attempts >= MAX_ATTEMPTS,
+                        E.payload != '[]',
+                        db.or_(E.dispatched_at.is_(None),
+                               E.dispatched_at < now - REDISPATCH_AFTER),
+                        idle)
+                .order_by(E.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()):
+        _park(row, f'{row.attempts} attempts')
+    db.session.commit()
+    return published
+
+
+def _park(row, reason):
+    """Stop delivering `row`: attempts pinned at MAX_ATTEMPTS, payload (OTPs,
+    phone numbers) cleared. The row stays as a record of the lost event."""
+    import logging
+    row.attempts = max(row.attempts, MAX_ATTEMPTS)
+    row.payload  = '[]'
+    logging.getLogger(__name__).error(
+        f"Outbox event {row.id} ({row.task}) parked undelivered: {reason}")
+
+
+# ── Consumer side (called from ContextTask) ──────────────────────────────────
+def event_id(task_id):
+    """Outbox row id for a Celery task id, or None."""
+    if task_id and task_id.startswith(TASK_ID_PREFIX):
+        try:
+            return int(task_id[len(TASK_ID_PREFIX):])
+        except ValueError:
+            return None
+    return None
+
+
+def begin(eid):
+    """Claim the event for this run. False if it is already processed or
+    another run holds a live lease (duplicate publish) — skip the task."""
+    from app import db
+    from app.models import OutboxEvent as E
+    now     = datetime.utcnow()
+    claimed = db.session.execute(
+        db.update(E)
+        .where(E.id == eid, E.processed_at.is_(None),
+               db.or_(E.started_at.is_(None), E.started_at < now - LEASE))
+        .values(started_at=now)
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+
+def release(eid):
+    """The run raised (or is retrying) — drop its lease so the next run may
+    claim the event."""
+    from app import db
+    from app.models import OutboxEvent as E
+    db.session.rollback()
+    (E.query.filter(E.id == eid, E.processed_at.is_(None))
+     .update({'started_at': None}, synchronize_session=False))
+    db.session.commit()
+
+
+def complete(eid):
+    from app import db
+    from app.models import OutboxEvent as E
+    (E.query.filter(E.id == eid, E.processed_at.is_(None))
+     .update({'processed_at': datetime.utcnow(), 'payload': '[]'},
+             synchronize_session=False))
+    db.session.commit()
@@ -0,0 +1,155 @@
+"""
+Presence — online / last-seen tracking in Redis (DB2, shared with app.cache).
+
+Usage:
+    from app.presence import connect, disconnect, heartbeat, get_presence
+
+Keys:
+    presence:online     ZSET user_id → last socket heartbeat (epoch secs).
+                        Online = heartbeat within ONLINE_WINDOW.
+    presence:last_seen  ZSET user_id → last activity (socket or HTTP request).
+                        Drained to users.last_active_at by flush_to_db().
+    presence:flushed_at STRING epoch of the last successful flush.
+    presence:sids:{uid} SET of the user's live Socket.IO sids — one per tab.
+                        disconnect() drops the user from presence:online
+                        only when the last one closes.
+
+Every key carries an EXPIRE so an idle deployment cleans itself up, and
+stale members are trimmed with ZREMRANGEBYSCORE during the flush.
+Like app.cache, every call fails soft: Redis being down means "offline",
+never an exception in a request or socket handler.
+"""
+import time
+from datetime import datetime
+
+from app.cache import _get_client
+
+ONLINE_KEY    = 'presence:online'
+LAST_SEEN_KEY = 'presence:last_seen'
+FLUSHED_KEY   = 'presence:flushed_at'
+
+HEARTBEAT_INTERVAL = 25          # base.html emits 'heartbeat' this often (seconds)
+ONLINE_WINDOW      = 60          # missed ~2 heartbeats → offline
+KEY_TTL            = 2 * 86400   # whole-key safety expiry
+LAST_SEEN_RETAIN   = 86400       # keep flushed last-seen entries this long for lookups
+
+
+def heartbeat(user_id, online=True):
+    """Record activity for user_id. online=False for plain HTTP activity."""
+    now = time.time()
+    try:
+        pipe = _get_client().pipeline(transaction=False)
+        pipe.zadd(LAST_SEEN_KEY, {user_id: now})
+        pipe.expire(LAST_SEEN_KEY, KEY_TTL)
+        if online:
+            pipe.zadd(ONLINE_KEY, {user_id: now})
+            pipe.expire(ONLINE_KEY, KEY_TTL)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def _sids_key(user_id):
+    return f'presence:sids:{user_id}'
+
+
+# Drop one sid; when none are left, drop the user from the online set.
+# Atomic, so a tab connecting between the two steps is never marked offline.
+_DISCONNECT_LUA = """
+redis.call('SREM', KEYS[1], ARGV[1])
+redis.call('ZADD', KEYS[3], ARGV[3], ARGV[2])
+if redis.call('SCARD', KEYS[1]) > 0 then return 0 end
+redis.call('ZREM', KEYS[2], ARGV[2])
+return 1
+"""
+_disconnect_script = None
+
+
+def _disconnect():
+    global _disconnect_script
+    if _disconnect_script is None:
+        _disconnect_script = _get_client().register_script(_DISCONNECT_LUA)
+    return _disconnect_script
+
+
+def connect(user_id, sid):
+    """Socket connected — remember the sid and mark the user online."""
+    try:
+        pipe = _get_client().pipeline(transaction=False)
+        pipe.sadd(_sids_key(user_id), sid)
+        pipe.expire(_sids_key(user_id), KEY_TTL)
+        pipe.execute()
+    except Exception:
+        pass
+    heartbeat(user_id)
+
+
+def disconnect(user_id, sid):
+    """Socket disconnected — offline once the user's last tab has gone;
+    last-seen is updated either way. Sids of a crashed server linger until
+    KEY_TTL, but without heartbeats the user still ages out of ONLINE_WINDOW."""
+    try:
+        _disconnect()(keys=[_sids_key(user_id), ONLINE_KEY, LAST_SEEN_KEY],
+                      args=[sid, user_id, time.time()])
+    except Exception:
+        pass
+
+
+def get_presence(user_ids):
+    """Batch presence lookup — one Redis round-trip for any number of users.
+
+    Returns {user_id: {'online': bool, 'last_seen': datetime | None}}.
+    last_seen is None when Redis has nothing recent; callers fall back to
+    User.last_active_at.
+    """
+    user_ids = list(user_ids)
+    out = {uid: {'online': False, 'last_seen': None} for uid in user_ids}
+    if not user_ids:
+        return out
+    try:
+        pipe = _get_client().pipeline(transaction=False)
+        pipe.zmscore(ONLINE_KEY, user_ids)
+        pipe.zmscore(LAST_SEEN_KEY, user_ids)
+        online_scores, seen_scores = pipe.execute()
+    except Exception:
+        return out
+    cutoff = time.time() - ONLINE_WINDOW
+    for uid, on, seen in zip(user_ids, online_scores, seen_scores):
+        out[uid]['online'] = bool(on and on >= cutoff)
+        if seen:
+            out[uid]['last_seen'] = datetime.utcfromtimestamp(seen)
+    return out
+
+
+def is_online(user_id):
+    return get_presence([user_id])[user_id]['online']
+
+
+def flush_to_db(batch_size=1000):
+    """Write last-seen timestamps changed since the previous flush to
+    users.last_active_at in bulk, then trim stale members. Returns rows written.
+
+    Called from the presence-flush Beat task; needs an app context.
+    """
+    from app import db
+    from app.models import User
+    client = _get_client()
+    now    = time.time()
+    since  = float(client.get(FLUSHED_KEY) or 0)
+    rows   = client.zrangebyscore(LAST_SEEN_KEY, f'({since}', now, withscores=True)
+    written = 0
+    for i in range(0, len(rows), batch_size):
+        chunk = rows[i:i + batch_size]
+        # executemany-style bulk UPDATE by primary key — one statement per chunk
+        db.session.execute(db.update(User), [
+            {'id': int(uid), 'last_active_at': datetime.utcfromtimestamp(ts)}
+            for uid, ts in chunk
+        ])
+        db.session.commit()
+        written += len(chunk)
+    pipe = client.pipeline(transaction=False)
+    pipe.set(FLUSHED_KEY, now, ex=KEY_TTL)
+    pipe.zremrangebyscore(ONLINE_KEY, '-inf', now - ONLINE_WINDOW)
+    pipe.zremrangebyscore(LAST_SEEN_KEY, '-inf', now - LAST_SEEN_RETAIN)
+    pipe.execute()
+    return written
@@ -1,11 +1,12 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, abort,
+                   send_from_directory)
 from flask_login import login_required, current_user
 from datetime import datetime
 from app import db, limiter
 from app.models import (User, Profile, Address, City, State, Country,
                         Education, ProfessionalDetails, PhoneAlternate,
                         ProfileImage, Language)
-from app.utils import upload_image_to_s3, delete_image_from_s3
+from app.images import store_original, delete_files, PLACEHOLDER_URL
 
 profile_bp = Blueprint('profile', __name__)
 
@@ -374,18 +375,22 @@ def language():
 def upload_image():
     file = request.files.get('image')
     is_primary = 'is_primary' in request.form
-    full_url, thumb_url, card_url, err = upload_image_to_s3(file, user_id=current_user.id)
+    original_key, err = store_original(file, user_id=current_user.id)
     if err:
         flash(err, 'danger')
         return redirect(url_for('main.my_profile'))
     if is_primary:
         ProfileImage.query.filter_by(user_id=current_user.id, is_primary=True)\
                           .update({'is_primary': False})
-    db.session.add(ProfileImage(
-        user_id=current_user.id, image_url=full_url,
-        thumb_url=thumb_url, card_url=card_url, is_primary=is_primary))
+    img = ProfileImage(user_id=current_user.id, original_key=original_key,
+                       image_url=PLACEHOLDER_URL, status='processing', is_primary=is_primary)
+    db.session.add(img)
+    db.session.flush()
+    # Sizes are built on the uploads queue; the outbox row commits with the photo
+    from app import outbox
+    outbox.enqueue('upload_image_task', img.id)
     db.session.commit()
-    flash('Photo uploaded!', 'success')
+    flash('Photo uploaded! It will appear in a few seconds.', 'success')
     return redirect(url_for('main.my_profile'))
 
 
@@ -395,13 +400,87 @@ def delete_image(image_id):
     img = ProfileImage.query.get_or_404(image_id)
     if img.user_id != current_user.id:
         abort(403)
-    delete_image_from_s3(img.image_url)
+    delete_files(img)
     db.session.delete(img)
     db.session.commit()
     flash('Photo deleted.', 'info')
     return redirect(url_for('main.my_profile'))
 
 
+# ── PHOTO FILES ──────────────────────────────────────────────────────────────
+@profile_bp.route('/media/<path:key>')
+@login_required
+def media(key):
+    """Stored files when STORAGE_BACKEND is 'local' (development), under the
+    same visibility rules as photo_variant — a local URL is not a capability."""
+    from app.models import ProfileImageVariant
+    from app.storage import get_backend, LocalBackend
+    store = get_backend()
+    if not isinstance(store, LocalBackend):
+        abort(404)
+    url = store.url(key)
+    img = (ProfileImage.query.join(ProfileImageVariant)
+           .filter(ProfileImageVariant.key == key).first()
+           or ProfileImage.query.filter(db.or_(ProfileImage.original_key == key,
+                                               ProfileImage.image_url == url,
+                                               ProfileImage.card_url == url,
+                                               ProfileImage.thumb_url == url)).first())
+    if img is None or not _can_view_photo(img):
+        abort(404)
+    resp = send_from_directory(store.root, key, max_age=600)
+    resp.cache_control.public  = False
+    resp.cache_control.private = True
+    return resp
+
+
+def _can_view_photo(img):
+    """The profile-view rules, applied to one photo: the owner always; anyone
+    else only if the owner's account is active, neither side has blocked the
+    other and the viewer's plan shows photos (staff exempt from the plan)."""
+    from sqlalchemy import or_
+    from app.models import BlockList
+    if img.user_id == current_user.id:
+        return True
+    owner = db.session.get(User, img.user_id)
+    if owner is None or not owner.is_active_acc:
+        return False
+    block = BlockList.query.filter(
+        or_(
+            (BlockList.blocker_id == current_user.id) & (BlockList.blocked_id == owner.id),
+            (BlockList.blocker_id == owner.id)        & (BlockList.blocked_id == current_user.id),
+        )
+    ).first()
+    if block:
+        return False
+    return current_user.is_staff or current_user.plan_can_view_photos
+
+
+@profile_bp.route('/photo/<int:image_id>/<int:width>.<fmt>')
+@login_required
+def photo_variant(image_id, width, fmt):
+    """Any square size of a photo the viewer may see. Width snaps up to
+    DERIVATIVE_WIDTHS; a stored size redirects to a short-lived signed URL,
+    a missing one is queued on the uploads queue (app.images.request_derivative)
+    and the placeholder is served until it exists."""
+    from app.images import find_variant, request_derivative, encoders
+    from app.storage import get_backend
+    if fmt not in encoders():
+        abort(404)
+    img = ProfileImage.query.get_or_404(image_id)
+    if not _can_view_photo(img):
+        abort(404)
+    variant = find_variant(img, width, fmt) if img.status == 'ready' else None
+    if variant is None:
+        if img.status == 'ready':
+            request_derivative(img.id, width, fmt)
+        resp = redirect(PLACEHOLDER_URL)
+        resp.headers['Cache-Control'] = 'no-store'
+        return resp
+    resp = redirect(get_backend().signed_url(variant.key, expiry=3600))
+    resp.headers['Cache-Control'] = 'private, max-age=600'
+    return resp
+
+
 @profile_bp.route('/set_primary_image/<int:image_id>')
 @login_required
 def set_primary_image(image_id):
@@ -518,13 +597,9 @@ def delete_account():
             current_user.profile.profile_picture = None
             current_user.profile.linkedin_url  = None
 
-        # Delete photos from S3
+        # Delete stored photos (original, variants, cached sizes)
         for img in list(current_user.profile_images):
-            try:
-                from app.utils import delete_image_from_s3
-                delete_image_from_s3(img.image_url)
-            except Exception:
-                pass
+            delete_files(img)
             db.session.delete(img)
 
         # Delete sensitive records
@@ -633,7 +708,8 @@ def export_data():
     messages_export = []
     for conv in convs:
         other_id = conv.user2_id if conv.user1_id == u.id else conv.user1_id
-        for msg in conv.messages.filter_by(sender_id=u.id).all():
+        archived = conv.archived_messages.filter_by(sender_id=u.id).all()
+        for msg in archived + conv.messages.filter_by(sender_id=u.id).all():
             messages_export.append({
                 'conversation_with_user_id': other_id,
                 'sent_at': msg.sent_at.isoformat(),
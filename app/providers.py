@@ -0,0 +1,199 @@
+"""
+Outbound provider clients — pooled HTTP sessions with shared rate limits.
+
+Usage:
+    from app.providers import get_client, RateLimited, send_otp_sms, send_sms_bulk
+
+    resp = get_client('whatsapp').post(url, json=body, timeout=10)
+
+One ProviderClient per provider per process, each wrapping a
+requests.Session whose connection pool keeps TLS connections to the
+provider alive between calls (no handshake per SMS).
+
+Every request first takes a token from that provider's bucket in Redis
+(ratelimit:{provider}, refilled at `rate`/s up to `burst`), so the limit
+holds across all web and Celery workers together. When the bucket is
+empty the call waits — cooperatively under gevent — up to `max_wait`
+seconds, then raises RateLimited(retry_after). Celery tasks turn that into
+a delayed, jittered retry instead of hammering the provider. If Redis is
+unreachable the limiter fails open.
+
+Limits come from config PROVIDER_LIMITS; unknown providers use DEFAULT_LIMIT.
+"""
+import random
+import threading
+import time
+
+DEFAULT_LIMIT = {'rate': 10, 'burst': 20, 'pool': 20, 'max_wait': 5.0}
+
+# Refill, then take n tokens or report the wait in seconds. Server clock.
+_BUCKET_LUA = """
+local rate, burst, n = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local t   = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b   = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or burst
+local ts     = tonumber(b[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local wait = 0
+if tokens >= n then tokens = tokens - n else wait = (n - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+_bucket_script = None
+
+
+class RateLimited(Exception):
+    def __init__(self, provider, retry_after):
+        super().__init__(f'{provider} rate limit — retry in {retry_after:.1f}s')
+        self.provider    = provider
+        self.retry_after = retry_after
+        self.remaining   = None      # batch senders: the part not yet sent
+
+
+def _take(provider, rate, burst, n=1):
+    """Seconds to wait before n tokens are available (0.0 = taken)."""
+    global _bucket_script
+    try:
+        from app.cache import _get_client
+        if _bucket_script is None:
+            _bucket_script = _get_client().register_script(_BUCKET_LUA)
+        return float(_bucket_script(keys=[f'ratelimit:{provider}'], args=[rate, burst, n]))
+    except Exception:
+        return 0.0   # Redis down — don't block sends on the limiter
+
+
+class ProviderClient:
+    """requests.Session for one provider, rate limited through Redis."""
+
+    def __init__(self, name, rate, burst, pool, max_wait):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.name     = name
+        self.rate     = rate
+        self.burst    = burst
+        self.max_wait = max_wait
+        self.session  = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool, pool_block=False)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def acquire(self, n=1, max_wait=None):
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = _take(self.name, self.rate, self.burst, n)
+            if not wait:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimited(self.name, wait)
+            time.sleep(wait)
+
+    def request(self, method, url, tokens=1, **kwargs):
+        self.acquire(tokens)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+_clients = {}
+_lock    = threading.Lock()
+
+
+def get_client(name):
+    """The process-wide ProviderClient for `name`."""
+    client = _clients.get(name)
+    if client is None:
+        from flask import current_app
+        limits = {**DEFAULT_LIMIT, **current_app.config.get('PROVIDER_LIMITS', {}).get(name, {})}
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = ProviderClient(name, **limits)
+    return client
+
+
+def retry_countdown(exc, attempt):
+    """Celery retry delay for a RateLimited error — spread out, not in lockstep."""
+    return exc.retry_after * (attempt + 1) + random.uniform(0, exc.retry_after + 1)
+
+
+# ── SMS ──────────────────────────────────────────────────────────────────────
+FAST2SMS_URL      = 'https://www.fast2sms.com/dev/bulkV2'
+MSG91_OTP_URL     = 'https://api.msg91.com/api/v5/otp'
+FAST2SMS_BULK_MAX = 500    # numbers per bulkV2 request (same message)
+
+
+def send_otp_sms(phone, otp):
+    """Fast2SMS (primary) → MSG91 (after DLT) → log (dev). Returns a status dict;
+    raises RateLimited / requests errors for the caller to retry."""
+    import logging
+    from flask import current_app
+    log          = logging.getLogger(__name__)
+    fast2sms_key = current_app.config.get('FAST2SMS_API_KEY', '')
+    msg91_key    = current_app.config.get('MSG91_AUTH_KEY', '')
+
+    if fast2sms_key:
+        resp = get_client('fast2sms').get(
+            FAST2SMS_URL,
+            params={"authorization": fast2sms_key,
+                    "message": f"Your iJodidar verification code is {otp}. Valid for 10 minutes. Do not share.",
+                    "route": "q",
+                    "numbers": phone},
+            headers={"cache-control": "no-cache"},
+            timeout=10,
+        )
+        data = resp.json()
+        if data.get('return') is True:
+            return {'status': 'sent', 'provider': 'fast2sms'}
+        log.error(f"Fast2SMS error: {data}")
+        return {'status': 'failed', 'provider': 'fast2sms'}
+
+    if msg91_key:
+        resp = get_client('msg91').post(
+            MSG91_OTP_URL,
+            json={"template_id": current_app.config.get('MSG91_TEMPLATE_ID', ''),
+                  "mobile": f"91{phone}",
+                  "authkey": msg91_key,
+                  "otp": otp},
+            timeout=10,
+        )
+        return {'status': 'sent' if resp.status_code == 200 else 'failed',
+                'provider': 'msg91'}
+
+    log.info(f'[DEV OTP] Phone:{phone} OTP:{otp}')
+    return {'status': 'dev_logged'}
+
+
+def send_sms_bulk(numbers, message):
+    """One message to many numbers — Fast2SMS bulkV2 takes a comma-separated
+    list, FAST2SMS_BULK_MAX per request (one rate-limit token each).
+    Returns {'requests', 'sent', 'failed'} in numbers. On RateLimited the
+    exception's `remaining` holds the numbers not yet sent, so a retry never
+    repeats a chunk that went out."""
+    from flask import current_app
+    key   = current_app.config.get('FAST2SMS_API_KEY', '')
+    stats = dict.fromkeys(('requests', 'sent', 'failed'), 0)
+    if not key:
+        stats['failed'] = len(numbers)
+        return stats
+    client = get_client('fast2sms')
+    for i in range(0, len(numbers), FAST2SMS_BULK_MAX):
+        chunk = numbers[i:i + FAST2SMS_BULK_MAX]
+        try:
+            resp = client.get(FAST2SMS_URL,
+                              params={"authorization": key, "message": message,
+                                      "route": "q", "numbers": ','.join(chunk)},
+                              headers={"cache-control": "no-cache"}, timeout=15)
+        except RateLimited as exc:
+            exc.remaining = numbers[i:]
+            raise
+        stats['requests'] += 1
+        ok = resp.json().get('return') is True
+        stats['sent' if ok else 'failed'] += len(chunk)
+    return stats
@@ -0,0 +1,240 @@
+"""
+Push delivery — in-app notifications → FCM tokens registered in user_devices.
+
+Usage:
+    from app.push import dispatch_pending, get_transport, register_transport
+
+Every Notification row starts with pushed_at = NULL. The dispatch-push Beat
+task (queue 'push') calls dispatch_pending(), which
+
+  1. claims a batch of pending rows (FOR UPDATE SKIP LOCKED on PostgreSQL,
+     so several push workers never claim the same row) and stamps pushed_at,
+  2. collapses them into one push per user ("… (+3 more)"),
+  3. loads every recipient's device tokens in one query,
+  4. groups users whose payload is identical (broadcasts) and sends one
+     multicast request per MULTICAST_MAX tokens through the transport,
+  5. deletes tokens the transport reports as invalid / unregistered.
+
+Delivery is at-most-once: rows are marked before sending, so a crashed
+worker drops that batch's pushes rather than sending them twice. The
+in-app notification itself is unaffected.
+
+Transports are pluggable — PUSH_TRANSPORT selects one by name:
+    'fcm'   FCMTransport, firebase-admin (optional dependency)
+    'stub'  StubTransport, records sends in memory (tests, dev, benchmarks)
+    ''      disabled — pending rows are marked pushed without sending
+register_transport(name, cls) adds another.
+
+Module-level imports are stdlib only; scripts/bench_push.py loads this file
+on its own to benchmark batching without a database.
+"""
+import time
+from collections import defaultdict
+
+MULTICAST_MAX = 500      # FCM send_each_for_multicast limit
+CLAIM_BATCH   = 2000     # notifications claimed per round
+APP_TITLE     = 'iJodidar'
+
+
+# ── Transports ───────────────────────────────────────────────────────────────
+class Transport:
+    """Base class. send_multicast() delivers one payload to up to max_batch
+    tokens and returns (delivered_count, invalid_tokens)."""
+    max_batch = MULTICAST_MAX
+
+    def send_multicast(self, tokens, payload):
+        raise NotImplementedError
+
+
+class StubTransport(Transport):
+    """Local transport — nothing leaves the process.
+
+    sent            list of (tokens, payload) per request
+    invalid_tokens  tokens to report back as unregistered
+    latency         simulated seconds per request (benchmarks)
+    """
+
+    def __init__(self, invalid_tokens=(), latency=0.0):
+        self.sent           = []
+        self.invalid_tokens = set(invalid_tokens)
+        self.latency        = latency
+
+    def send_multicast(self, tokens, payload):
+        if self.latency:
+            time.sleep(self.latency)
+        self.sent.append((list(tokens), payload))
+        invalid = [t for t in tokens if t in self.invalid_tokens]
+        return len(tokens) - len(invalid), invalid
+
+
+class FCMTransport(Transport):
+    """Firebase Cloud Messaging via firebase-admin (pip install firebase-admin).
+    Credentials: FCM_CREDENTIALS_FILE, else Application Default Credentials."""
+
+    def __init__(self, credentials_file=None):
+        import firebase_admin
+        from firebase_admin import credentials
+        if not firebase_admin._apps:
+            cred = credentials.Certificate(credentials_file) if credentials_file else None
+            firebase_admin.initialize_app(cred)
+
+    def send_multicast(self, tokens, payload):
+        from firebase_admin import messaging
+        msg = messaging.MulticastMessage(
+            tokens       = list(tokens),
+            notification = messaging.Notification(title=payload['title'],
+                                                  body=payload['body']),
+            data         = {'link': payload['link'], 'count': str(payload['count'])},
+        )
+        resp    = messaging.send_each_for_multicast(msg)
+        # Only errors that say the token itself is gone. InvalidArgumentError
+        # is also raised for a bad payload, which would prune every token.
+        dead    = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+        invalid = [t for t, r in zip(tokens, resp.responses)
+                   if not r.success and isinstance(r.exception, dead)]
+        return resp.success_count, invalid
+
+
+TRANSPORTS = {'stub': StubTransport, 'fcm': FCMTransport}
+_transport = None
+
+
+def register_transport(name, cls):
+    TRANSPORTS[name] = cls
+
+
+def get_transport():
+    """The configured transport instance (cached per process), or None."""
+    global _transport
+    if _transport is None:
+        from flask import current_app
+        name = current_app.config.get('PUSH_TRANSPORT', '')
+        if not name:
+            return None
+        cls = TRANSPORTS[name]
+        if cls is FCMTransport:
+            _transport = cls(current_app.config.get('FCM_CREDENTIALS_FILE') or None)
+        else:
+            _transport = cls()
+    return _transport
+
+
+def set_transport(transport):
+    """Override the process transport (tests / benchmarks)."""
+    global _transport
+    _transport = transport
+
+
+# ── Batching (pure) ──────────────────────────────────────────────────────────
+def collapse(rows):
+    """rows: (id, user_id, message, link) ordered by id.
+    Returns {user_id: payload} — one push per user, newest message first."""
+    by_user = defaultdict(list)
+    for _id, uid, message, link in rows:
+        by_user[uid].append((message, link))
+    out = {}
+    for uid, items in by_user.items():
+        message, link = items[-1]
+        extra = len(items) - 1
+        out[uid] = {
+            'title': APP_TITLE,
+            'body':  f'{message} (+{extra} more)' if extra else message,
+            'link':  link or '/notifications',
+            'count': len(items),
+        }
+    return out
+
+
+def build_batches(payloads, tokens_by_user, max_batch=MULTICAST_MAX):
+    """Group users with identical payloads and split their tokens into
+    multicast-sized chunks. Returns [(payload, [tokens])]."""
+    groups = defaultdict(list)
+    for uid, payload in payloads.items():
+        tokens = tokens_by_user.get(uid)
+        if tokens:
+            key = (payload['title'], payload['body'], payload['link'], payload['count'])
+            groups[key].extend(tokens)
+    batches = []
+    for (title, body, link, count), tokens in groups.items():
+        payload = {'title': title, 'body': body, 'link': link, 'count': count}
+        for i in range(0, len(tokens), max_batch):
+            batches.append((payload, tokens[i:i + max_batch]))
+    return batches
+
+
+def deliver(batches, transport):
+    """Send every batch. Returns (requests, delivered, invalid_tokens)."""
+    delivered = 0
+    invalid   = []
+    for payload, tokens in batches:
+        ok, bad = transport.send_multicast(tokens, payload)
+        delivered += ok
+        invalid.extend(bad)
+    return len(batches), delivered, invalid
+
+
+# ── Dispatcher (needs an app context) ────────────────────────────────────────
+def _claim(limit):
+    from datetime import datetime
+    from app import db
+    from app.models import Notification
+    rows = (db.session.query(Notification.id, Notification.user_id,
+                             Notification.message, Notification.link)
+            .filter(Notification.pushed_at.is_(None))
+            .order_by(Notification.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all())
+    if rows:
+        (Notification.query
+         .filter(Notification.id.in_([r[0] for r in rows]))
+         .update({'pushed_at': datetime.utcnow()}, synchronize_session=False))
+    db.session.commit()
+    return rows
+
+
+def _tokens_for(user_ids):
+    from app import db
+    from app.models import UserDevice
+    out = defaultdict(list)
+    for uid, token in (db.session.query(UserDevice.user_id, UserDevice.fcm_token)
+                       .filter(UserDevice.user_id.in_(user_ids)).all()):
+        out[uid].append(token)
+    return out
+
+
+def _prune(tokens):
+    from app import db
+    from app.models import UserDevice
+    if tokens:
+        (UserDevice.query.filter(UserDevice.fcm_token.in_(tokens))
+         .delete(synchronize_session=False))
+        db.session.commit()
+
+
+def dispatch_pending(limit=CLAIM_BATCH, max_rounds=10):
+    """Drain pending pushes. Returns throughput stats for the run."""
+    transport = get_transport()
+    stats = dict.fromkeys(('notifications', 'users', 'requests',
+                           'delivered', 'pruned'), 0)
+    started = time.perf_counter()
+    for _ in range(max_rounds):
+        rows = _claim(limit)
+        if not rows:
+            break
+        stats['notifications'] += len(rows)
+        if transport is None:
+            continue                          # push disabled — just mark
+        payloads = collapse(rows)
+        stats['users'] += len(payloads)
+        batches  = build_batches(payloads, _tokens_for(list(payloads)),
+                                 transport.max_batch)
+        requests, delivered, invalid = deliver(batches, transport)
+        stats['requests']  += requests
+        stats['delivered'] += delivered
+        stats['pruned']    += len(invalid)
+        _prune(invalid)
+        if len(rows) < limit:
+            break
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    return stats
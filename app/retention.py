@@ -0,0 +1,166 @@
+"""
+Retention — chunked, budgeted purges of append-only tables.
+
+Usage:
+    from app.retention import run_all, run_policy, get_retention_stats
+
+    run_all()                      # every policy — the data-retention Beat task
+    run_policy(POLICIES['profile_views'], days=30)
+
+Each Policy names a model, its age column, extra filters and a default age.
+A run walks the table in primary-key order (keyset: id > last id seen), one
+short transaction per chunk of `batch_size` rows, sleeps `pause` seconds
+between chunks and stops after `max_rows` — a large backlog is worked off
+over several nightly runs instead of one long table lock.
+
+Ages and limits come from config RETENTION (per table, see config.py);
+anything not set there falls back to the Policy defaults. A policy with
+archive_to copies each chunk into that model (shared columns) before
+deleting it.
+
+Per-table metrics go to the Redis hash retention:{table} — running totals
+(rows, batches, runs) plus the last run's rows, seconds and whether it hit
+the row budget. Read them with get_retention_stats().
+"""
+import time
+from datetime import datetime, timedelta
+
+STATS_PREFIX = 'retention:'
+
+
+class Policy:
+    """What to purge from one table.
+
+    model       app.models class name
+    age_column  timestamp column compared against the cutoff
+    days        default age in days (config RETENTION[name]['days'] wins)
+    where       optional callable(model) → extra filter clauses
+    archive_to  optional app.models class name to copy rows into first
+    """
+
+    def __init__(self, name, model, age_column, days, where=None, archive_to=None,
+                 batch_size=2000, max_rows=200_000, pause=0.2):
+        self.name       = name
+        self.model      = model
+        self.age_column = age_column
+        self.days       = days
+        self.where      = where
+        self.archive_to = archive_to
+        self.batch_size = batch_size
+        self.max_rows   = max_rows
+        self.pause      = pause
+
+
+# Run in this order: rollups before the notifications they point at.
+POLICIES = {p.name: p for p in (
+    # Past every coalescing window (COALESCE_RULES max 24 h) — dead state
+    Policy('notification_rollups', 'NotificationRollup', 'window_start', days=2),
+    Policy('notifications', 'Notification', 'created_at', days=90,
+           where=lambda m: [m.is_read == True]),
+    Policy('profile_views', 'ProfileView', 'timestamp', days=180),
+    # Ranking signals decay; blocks/reports are kept as long-term negatives
+    Policy('user_signals', 'UserSignal', 'created_at', days=365,
+           where=lambda m: [m.signal_type.notin_(('blocked', 'reported'))]),
+    # Processed outbox rows (app.outbox); unprocessed ones are never aged out
+    Policy('outbox', 'OutboxEvent', 'processed_at', days=7),
+)}
+
+
+def _settings(policy, overrides):
+    from flask import current_app
+    conf = dict(current_app.config.get('RETENTION', {}).get(policy.name, {}))
+    conf.update({k: v for k, v in overrides.items() if v is not None})
+    return {k: conf.get(k, getattr(policy, k))
+            for k in ('days', 'batch_size', 'max_rows', 'pause')}
+
+
+def run_policy(policy, **overrides):
+    """Purge one table. Keyword overrides: days, batch_size, max_rows, pause.
+    Returns {'rows', 'batches', 'seconds', 'budget_hit'}."""
+    from app import db, models
+    cfg     = _settings(policy, overrides)
+    model   = getattr(models, policy.model)
+    pk      = model.id
+    cutoff  = datetime.utcnow() - timedelta(days=cfg['days'])
+    filters = [getattr(model, policy.age_column) < cutoff,
+               *(policy.where(model) if policy.where else [])]
+    archive = getattr(models, policy.archive_to) if policy.archive_to else None
+    if archive is not None:
+        cols = [c.name for c in archive.__table__.columns
+                if c.name in model.__table__.columns]
+
+    rows = batches = last_id = 0
+    started = time.perf_counter()
+    while rows < cfg['max_rows']:
+        limit = min(cfg['batch_size'], cfg['max_rows'] - rows)
+        ids   = db.session.execute(
+            db.select(pk).where(pk > last_id, *filters).order_by(pk).limit(limit)
+        ).scalars().all()
+        if not ids:
+            break
+        if archive is not None:
+            db.session.execute(db.insert(archive).from_select(
+                cols, db.select(*[getattr(model, c) for c in cols]).where(pk.in_(ids))))
+        db.session.execute(db.delete(model).where(pk.in_(ids)))
+        db.session.commit()
+        rows    += len(ids)
+        batches += 1
+        last_id  = ids[-1]
+        if len(ids) < limit:
+            break
+        time.sleep(cfg['pause'])
+    db.session.rollback()   # release the connection after the last read
+    result = {'rows': rows, 'batches': batches,
+              'seconds': round(time.perf_counter() - started, 3),
+              'budget_hit': rows >= cfg['max_rows']}
+    _record(policy.name, result)
+    return result
+
+
+def run_all(**overrides):
+    """Run every policy in order. Returns {table: result}. One table failing
+    is logged and does not stop the others."""
+    out = {}
+    for name, policy in POLICIES.items():
+        try:
+            out[name] = run_policy(policy, **overrides)
+        except Exception as e:
+            from app import db
+            db.session.rollback()
+            import logging
+            logging.getLogger(__name__).warning(f"Retention {name} failed: {e}")
+            out[name] = {'error': str(e)[:200]}
+    return out
+
+
+# ── Metrics ──────────────────────────────────────────────────────────────────
+def _record(name, result):
+    try:
+        from app.cache import _get_client
+        key  = STATS_PREFIX + name
+        pipe = _get_client().pipeline(transaction=False)
+        pipe.hincrby(key, 'rows_total', result['rows'])
+        pipe.hincrby(key, 'batches_total', result['batches'])
+        pipe.hincrby(key, 'runs', 1)
+        pipe.hset(key, mapping={
+            'last_rows':       result['rows'],
+            'last_seconds':    result['seconds'],
+            'last_budget_hit': int(result['budget_hit']),
+            'last_run':        datetime.utcnow().isoformat(timespec='seconds'),
+        })
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def get_retention_stats():
+    """{table: {'rows_total', 'runs', 'last_rows', 'last_run', ...}}."""
+    try:
+        from app.cache import _get_client
+        client = _get_client()
+        pipe   = client.pipeline(transaction=False)
+        for name in POLICIES:
+            pipe.hgetall(STATS_PREFIX + name)
+        return {name: raw for name, raw in zip(POLICIES, pipe.execute()) if raw}
+    except Exception:
+        return {}
@@ -0,0 +1,91 @@
+"""
+S3 access — one client per process, memoized presigned URLs.
+
+Usage:
+    from app.s3 import get_client, presign, presign_many, key_from_url
+
+    get_client().put_object(Bucket=bucket, Key=key, Body=data)
+    url  = presign('profiles/7/ab12.jpg', expiry=3600)
+    urls = presign_many(keys, expiry=3600)          # one call per list
+
+Building a boto3 client loads the service model and resolves credentials —
+tens of milliseconds. get_client() builds one per (region) per process and
+shares it (boto3 clients are thread-safe).
+
+presign() is pure CPU (SigV4 over the request), but a feed page signs dozens
+of URLs per render. Results are memoized in an LRU keyed by
+(key, expiry, window): time is cut into windows of PRESIGN_WINDOW_FRACTION ×
+expiry seconds, and each URL is signed for expiry + one window, so a cached
+URL still has at least `expiry` seconds of validity whenever it is served.
+Within a window every render gets the same URL — which also lets browsers
+reuse their cached copy instead of re-downloading a photo whose signature
+changed.
+"""
+import threading
+import time
+from functools import lru_cache
+
+PRESIGN_CACHE_SIZE      = 20_000   # ~ 4 MB of URLs
+PRESIGN_WINDOW_FRACTION = 0.25     # cache reuse window, as a fraction of expiry
+
+_clients = {}
+_lock    = threading.Lock()
+
+
+def get_client(region=None):
+    """The process-wide S3 client for `region` (default: config AWS_REGION)."""
+    if region is None:
+        from flask import current_app
+        region = current_app.config['AWS_REGION']
+    client = _clients.get(region)
+    if client is None:
+        import boto3
+        with _lock:
+            client = _clients.get(region)
+            if client is None:
+                client = _clients[region] = boto3.client('s3', region_name=region)
+    return client
+
+
+def key_from_url(url):
+    """'https://bucket.s3.region.amazonaws.com/<key>' → '<key>' (None if not S3)."""
+    if not url or '.amazonaws.com/' not in url:
+        return None
+    return url.split('.amazonaws.com/', 1)[1]
+
+
+@lru_cache(maxsize=PRESIGN_CACHE_SIZE)
+def _presign(bucket, region, key, expiry, window):
+    return get_client(region).generate_presigned_url(
+        'get_object',
+        Params={'Bucket': bucket, 'Key': key},
+        ExpiresIn=expiry + _window_seconds(expiry),
+    )
+
+
+def _window_seconds(expiry):
+    return max(1, int(expiry * PRESIGN_WINDOW_FRACTION))
+
+
+def presign(key, expiry=3600, bucket=None, region=None):
+    """GET URL for `key`, valid for at least `expiry` seconds. Memoized."""
+    if bucket is None or region is None:
+        from flask import current_app
+        bucket = bucket or current_app.config['AWS_S3_BUCKET']
+        region = region or current_app.config['AWS_REGION']
+    window = int(time.time()) // _window_seconds(expiry)
+    return _presign(bucket, region, key, expiry, window)
+
+
+def presign_many(keys, expiry=3600):
+    """[presign(k) for k in keys] with the config lookup done once; None
+    entries pass through."""
+    from flask import current_app
+    bucket = current_app.config['AWS_S3_BUCKET']
+    region = current_app.config['AWS_REGION']
+    return [presign(k, expiry, bucket, region) if k else k for k in keys]
+
+
+def cache_info():
+    """functools CacheInfo(hits, misses, maxsize, currsize) for this process."""
+    return _presign.cache_info()
@@ -0,0 +1,193 @@
+"""
+Storage — where uploaded files live, behind a pluggable backend.
+
+Usage:
+    from app.storage import get_backend
+
+    store = get_backend()
+    store.put('profiles/7/ab12_o.jpg', data, 'image/jpeg')
+    store.get('profiles/7/ab12_o.jpg')              # → bytes
+    store.url('profiles/7/ab12_o.jpg')              # stable URL, safe to persist
+    store.signed_url(key, expiry=3600)              # what a browser may fetch
+    store.key_for(url)                              # stored URL → key (or None)
+    store.delete(key, ...)
+
+The database stores keys (ProfileImage.original_key, ProfileImageVariant.key);
+URLs are derived from them. key_for() maps URLs written before that back to
+keys, so no caller splits URLs itself.
+
+Backends — STORAGE_BACKEND selects one by name:
+    's3'     S3Backend: AWS_S3_BUCKET in AWS_REGION, objects private,
+             signed_url() presigned and memoized (app/s3.py).
+    'local'  LocalBackend: files under STORAGE_LOCAL_DIR, served by the
+             /media/<key> route (login + the photo's visibility rules) —
+             development and offline benchmarks, no network or credentials.
+    ''       auto: 's3' when AWS_REGION and AWS_S3_BUCKET are set; 'local'
+             only in debug / testing. Anywhere else a missing bucket is a
+             configuration error, never a silent switch to local disk.
+register_backend(name, cls) adds another.
+
+Module-level imports are stdlib only; scripts/bench_images.py loads this file
+on its own.
+"""
+import os
+import tempfile
+import threading
+
+
+class Backend:
+    """Base class. Keys are '/'-separated relative paths."""
+
+    def put(self, key, data, content_type):
+        raise NotImplementedError
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+    def url(self, key):
+        raise NotImplementedError
+
+    def signed_url(self, key, expiry=3600):
+        return self.url(key)
+
+    def key_for(self, url):
+        raise NotImplementedError
+
+
+class S3Backend(Backend):
+    """Amazon S3 — private objects, shared client, memoized presigned URLs."""
+
+    def __init__(self, bucket, region):
+        self.bucket = bucket
+        self.region = region
+        self.prefix = f'https://{bucket}.s3.{region}.amazonaws.com/'
+
+    @property
+    def client(self):
+        from app.s3 import get_client
+        return get_client(self.region)
+
+    def put(self, key, data, content_type):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data,
+                               ContentType=content_type, ACL='private')
+
+    def get(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+
+    def delete(self, *keys):
+        keys = [k for k in keys if k]
+        for i in range(0, len(keys), 1000):          # DeleteObjects limit
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': [{'Key': k} for k in keys[i:i + 1000]], 'Quiet': True})
+
+    def url(self, key):
+        return self.prefix + key
+
+    def signed_url(self, key, expiry=3600):
+        from app.s3 import presign
+        return presign(key, expiry, self.bucket, self.region)
+
+    def key_for(self, url):
+        if url and url.startswith(self.prefix):
+            return url[len(self.prefix):]
+        from app.s3 import key_from_url              # other buckets / regions
+        return key_from_url(url)
+
+
+class LocalBackend(Backend):
+    """Files under `root`; url() is url_prefix + key (the /media route)."""
+
+    def __init__(self, root, url_prefix='/media/'):
+        self.root       = os.path.abspath(root)
+        self.url_prefix = url_prefix
+
+    def path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f'key escapes storage root: {key!r}')
+        return path
+
+    def put(self, key, data, content_type=None):
+        write_atomic(self.path(key), data)
+
+    def get(self, key):
+        with open(self.path(key), 'rb') as f:
+            return f.read()
+
+    def delete(self, *keys):
+        for key in keys:
+            if key:
+                try:
+                    os.remove(self.path(key))
+                except FileNotFoundError:
+                    pass
+
+    def url(self, key):
+        return self.url_prefix + key
+
+    def key_for(self, url):
+        if url and url.startswith(self.url_prefix):
+            return url[len(self.url_prefix):]
+        return None
+
+
+def write_atomic(path, data):
+    """Write via a temp file + rename, so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+BACKENDS = {'s3': S3Backend, 'local': LocalBackend}
+_backend = None
+_lock    = threading.Lock()
+
+
+def register_backend(name, cls):
+    BACKENDS[name] = cls
+
+
+def get_backend():
+    """The configured backend instance (cached per process)."""
+    global _backend
+    if _backend is None:
+        from flask import current_app
+        cfg  = current_app.config
+        name = cfg.get('STORAGE_BACKEND', '')
+        if not name:
+            if cfg.get('AWS_REGION') and cfg.get('AWS_S3_BUCKET'):
+                name = 's3'
+            elif current_app.debug or current_app.testing:
+                name = 'local'
+            else:
+                raise RuntimeError('No file storage configured: set AWS_REGION and '
+                                   "AWS_S3_BUCKET, or STORAGE_BACKEND='local'.")
+        cls = BACKENDS[name]
+        with _lock:
+            if _backend is None:
+                if cls is S3Backend:
+                    _backend = cls(cfg['AWS_S3_BUCKET'], cfg['AWS_REGION'])
+                elif cls is LocalBackend:
+                    _backend = cls(cfg.get('STORAGE_LOCAL_DIR') or 'instance/media')
+                else:
+                    _backend = cls()
+    return _backend
+
+
+def set_backend(backend):
+    """Override the process backend (tests / benchmarks)."""
+    global _backend
+    _backend = backend
@@ -0,0 +1,74 @@
+"""
+Sweepers — set-based expiry jobs run by Beat.
+
+Usage:
+    from app.sweepers import expire_subscriptions, clear_expired_tokens
+
+Each sweep is a loop of
+
+    UPDATE t SET … WHERE id IN (SELECT id FROM t WHERE <expired>
+                                ORDER BY id LIMIT n [FOR UPDATE SKIP LOCKED])
+    RETURNING id, …
+
+committed per chunk: no ORM rows are loaded, each transaction holds at most
+`n` row locks, and rows another transaction is editing are left for the
+next run instead of blocking. The <expired> predicates match partial
+indexes on the expiry columns (see the models' __table_args__), so finding
+the next chunk never scans the whole table. RETURNING drives follow-up work
+such as capability cache invalidation.
+"""
+from datetime import datetime
+
+BATCH_SIZE = 1000
+
+
+def sweep(model, where, values, returning=(), batch_size=BATCH_SIZE):
+    """Set `values` on every row of `model` matching `where`, in id-ordered
+    chunks. Returns the RETURNING rows (id first, then `returning` columns)."""
+    from app import db
+    ids = (db.select(model.id).where(*where).order_by(model.id)
+           .limit(batch_size).with_for_update(skip_locked=True)
+           .scalar_subquery())
+    stmt = (db.update(model).where(model.id.in_(ids)).values(**values)
+            .returning(model.id, *returning)
+            .execution_options(synchronize_session=False))
+    out = []
+    while True:
+        rows = db.session.execute(stmt).all()
+        db.session.commit()
+        out.extend(rows)
+        if len(rows) < batch_size:
+            return out
+
+
+def expire_subscriptions(batch_size=BATCH_SIZE):
+    """Deactivate paid subscriptions past expires_at; refresh plan caches.
+    Returns the number of subscriptions expired."""
+    from app.models import UserSubscription as S
+    from app.capabilities import invalidate_plan
+    rows = sweep(S, [S.is_active == True, S.expires_at != None,
+                     S.expires_at < datetime.utcnow()],
+                 {'is_active': False}, returning=(S.user_id,), batch_size=batch_size)
+    if rows:
+        invalidate_plan(*{uid for _id, uid in rows})
+    return len(rows)
+
+
+def clear_expired_tokens(batch_size=BATCH_SIZE):
+    """Null out expired phone OTPs, password-reset tokens and (unverified)
+    email-verify tokens — one sweep per column pair. Returns counts."""
+    from app.models import User as U
+    now  = datetime.utcnow()
+    keep = {'updated_at': U.updated_at}    # housekeeping, not account activity
+    return {
+        'phone_otp':    len(sweep(U, [U.phone_otp_expiry != None, U.phone_otp_expiry < now],
+                                  {'phone_otp': None, 'phone_otp_expiry': None, **keep},
+                                  batch_size=batch_size)),
+        'reset_token':  len(sweep(U, [U.reset_token_expiry != None, U.reset_token_expiry < now],
+                                  {'reset_token': None, 'reset_token_expiry': None, **keep},
+                                  batch_size=batch_size)),
+        'verify_token': len(sweep(U, [U.verify_token_expiry != None, U.verify_token_expiry < now,
+                                      U.is_verified == False],
+                                  {'verify_token': None, 'verify_token_expiry': None, **keep},
+                                  batch_size=batch_size)),
+    }
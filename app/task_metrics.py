@@ -0,0 +1,231 @@
+"""
+Celery task metrics — publish-to-start lag, runtimes, retries, failures,
+and broker queue depths.
+
+Usage:
+    from app.task_metrics import install, task_summary, queue_depths, sample_queues
+
+install(celery) (called from app/tasks.py) connects signal handlers:
+
+    before_task_publish   stamps an `enqueued_at` header (web and worker side)
+    task_prerun           lag = start − max(enqueued_at, eta)
+    task_postrun          runtime; success / failure by final state
+    task_retry            retries
+
+Each event adds to the Redis hash taskstats:{task}:{YYYYmmddHH} (DB2, kept
+48 h): counters plus histogram buckets `lag_le_<s>` / `run_le_<s>` over
+BUCKETS. task_summary(hours) merges the last `hours` hashes and estimates
+p50 / p95 from the buckets.
+
+Queue depth is read from the broker (LLEN of each queue's priority lists,
+plus the unacked hash). The queue-depth-sample Beat task stores one sample
+a minute in queuedepth:{queue} (last 24 h).
+
+All writes fail soft — metrics never break a task.
+"""
+import time
+from datetime import datetime, timedelta
+
+QUEUES     = ('celery', 'email', 'sms', 'notifications', 'uploads', 'push')
+BUCKETS    = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, float('inf'))
+STATS_TTL  = 48 * 3600
+DEPTH_KEEP = 1440           # one-minute samples per queue
+_PRIORITY_SEP = '\x06\x16'  # kombu Redis transport: "<queue>\x06\x16<priority>"
+
+_started = {}               # task_id → perf_counter at prerun (per process)
+
+
+def _bucket(seconds):
+    for b in BUCKETS:
+        if seconds <= b:
+            return 'inf' if b == float('inf') else f'{b:g}'
+
+
+def _hour_key(name, when=None):
+    return f"taskstats:{name}:{(when or datetime.utcnow()).strftime('%Y%m%d%H')}"
+
+
+def _record(name, **fields):
+    """HINCRBY fields on the current hour's hash; floats via HINCRBYFLOAT."""
+    try:
+        from app.cache import _get_client
+        key  = _hour_key(name)
+        pipe = _get_client().pipeline(transaction=False)
+        for f, v in fields.items():
+            if isinstance(v, float):
+                pipe.hincrbyfloat(key, f, v)
+            else:
+                pipe.hincrby(key, f, v)
+        pipe.expire(key, STATS_TTL)
+        pipe.sadd('taskstats:names', name)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+# ── Signal handlers ──────────────────────────────────────────────────────────
+def _on_publish(sender=None, headers=None, **kw):
+    if headers is not None and 'enqueued_at' not in headers:
+        headers['enqueued_at'] = time.time()
+
+
+def _on_prerun(task_id=None, task=None, **kw):
+    _started[task_id] = time.perf_counter()
+    req      = task.request
+    enqueued = getattr(req, 'enqueued_at', None) or (req.headers or {}).get('enqueued_at')
+    if not enqueued:
+        return
+    ready = float(enqueued)
+    if req.eta:
+        try:
+            ready = max(ready, datetime.fromisoformat(str(req.eta)).timestamp())
+        except ValueError:
+            pass
+    lag = max(0.0, time.time() - ready)
+    _record(task.name, started=1, lag_sum=round(lag, 4), **{f'lag_le_{_bucket(lag)}': 1})
+
+
+def _on_postrun(task_id=None, task=None, state=None, **kw):
+    t0 = _started.pop(task_id, None)
+    if t0 is None:
+        return
+    run     = time.perf_counter() - t0
+    outcome = {'SUCCESS': 'succeeded', 'FAILURE': 'failed'}.get(state)
+    fields  = {'run_sum': round(run, 4), f'run_le_{_bucket(run)}': 1, 'finished': 1}
+    if outcome:
+        fields[outcome] = 1
+    _record(task.name, **fields)
+
+
+def _on_retry(sender=None, **kw):
+    _record(getattr(sender, 'name', str(sender)), retried=1)
+
+
+def install(celery):
+    from celery.signals import before_task_publish, task_prerun, task_postrun, task_retry
+    before_task_publish.connect(_on_publish, weak=False)
+    task_prerun.connect(_on_prerun, weak=False)
+    task_postrun.connect(_on_postrun, weak=False)
+    task_retry.connect(_on_retry, weak=False)
+
+
+# ── Reading ──────────────────────────────────────────────────────────────────
+def _quantile(hist, total, q):
+    """Upper bucket bound holding the q-th observation, or None."""
+    if not total:
+        return None
+    need, seen = q * total, 0
+    for b in BUCKETS:
+        label = 'inf' if b == float('inf') else f'{b:g}'
+        seen += hist.get(label, 0)
+        if seen >= need:
+            return b
+    return None
+
+
+def task_summary(hours=1):
+    """[{name, started, finished, succeeded, failed, retried, lag_avg, lag_p50,
+    lag_p95, run_avg, run_p50, run_p95}] over the last `hours`, busiest first."""
+    try:
+        from app.cache import _get_client
+        client = _get_client()
+        names  = sorted(client.smembers('taskstats:names'))
+        now    = datetime.utcnow()
+        slots  = [now - timedelta(hours=h) for h in range(hours)]
+        pipe   = client.pipeline(transaction=False)
+        for name in names:
+            for when in slots:
+                pipe.hgetall(_hour_key(name, when))
+        raw = pipe.execute()
+    except Exception:
+        return []
+    out = []
+    for i, name in enumerate(names):
+        agg = {}
+        for h in raw[i * hours:(i + 1) * hours]:
+            for k, v in h.items():
+                agg[k] = agg.get(k, 0) + float(v)
+        if not agg:
+            continue
+        lag_hist = {k[7:]: v for k, v in agg.items() if k.startswith('lag_le_')}
+        run_hist = {k[7:]: v for k, v in agg.items() if k.startswith('run_le_')}
+        started, finished = int(agg.get('started', 0)), int(agg.get('finished', 0))
+        out.append({
+            'name':      name.rsplit('.', 1)[-1],
+            'started':   started,
+            'finished':  finished,
+            'succeeded': int(agg.get('succeeded', 0)),
+            'failed':    int(agg.get('failed', 0)),
+            'retried':   int(agg.get('retried', 0)),
+            'lag_avg':   agg.get('lag_sum', 0) / started if started else None,
+            'lag_p50':   _quantile(lag_hist, started, 0.5),
+            'lag_p95':   _quantile(lag_hist, started, 0.95),
+            'run_avg':   agg.get('run_sum', 0) / finished if finished else None,
+            'run_p50':   _quantile(run_hist, finished, 0.5),
+            'run_p95':   _quantile(run_hist, finished, 0.95),
+        })
+    return sorted(out, key=lambda r: -r['finished'])
+
+
+# ── Queue depth ──────────────────────────────────────────────────────────────
+_broker = None
+
+
+def _broker_client():
+    global _broker
+    if _broker is None:
+        import redis
+        from app.tasks import celery
+        _broker = redis.from_url(celery.conf.broker_url, socket_timeout=1)
+    return _broker
+
+
+def queue_depths():
+    """{queue: waiting messages, '_unacked': reserved-but-unacked} from the broker."""
+    try:
+        client = _broker_client()
+        pipe   = client.pipeline(transaction=False)
+        for q in QUEUES:
+            pipe.llen(q)
+            for p in (3, 6, 9):
+                pipe.llen(f'{q}{_PRIORITY_SEP}{p}')
+        pipe.hlen('unacked')
+        res = pipe.execute()
+    except Exception:
+        return {}
+    out = {q: sum(res[i * 4:(i + 1) * 4]) for i, q in enumerate(QUEUES)}
+    out['_unacked'] = res[-1]
+    return out
+
+
+def sample_queues():
+    """Store one depth sample per queue (Beat, every minute). Returns the sample."""
+    depths = queue_depths()
+    if depths:
+        try:
+            from app.cache import _get_client
+            pipe = _get_client().pipeline(transaction=False)
+            ts   = int(time.time())
+            for q, n in depths.items():
+                pipe.lpush(f'queuedepth:{q}', f'{ts}:{n}')
+                pipe.ltrim(f'queuedepth:{q}', 0, DEPTH_KEEP - 1)
+            pipe.execute()
+        except Exception:
+            pass
+    return depths
+
+
+def depth_history(minutes=60):
+    """{queue: [(ts, depth), …]} oldest first."""
+    try:
+        from app.cache import _get_client
+        client = _get_client()
+        pipe   = client.pipeline(transaction=False)
+        names  = (*QUEUES, '_unacked')
+        for q in names:
+            pipe.lrange(f'queuedepth:{q}', 0, minutes - 1)
+        raw = pipe.execute()
+    except Exception:
+        return {}
+    return {q: [tuple(int(x) for x in s.split(':')) for s in reversed(rows)]
+            for q, rows in zip(names, raw)}
@@ -4,8 +4,10 @@ app/tasks.py — Celery async task queue
 All blocking I/O (email, SMS, WhatsApp, S3) runs here.
 Gunicorn eventlet workers return immediately; Celery worker handles the work.
 
-Start worker on EC2:
-    celery -A app.tasks.celery worker --loglevel=info --concurrency=2
+Start workers on EC2 — CPU-bound queues on prefork, I/O-bound queues on gevent:
+    celery -A app.tasks.celery worker --loglevel=info --concurrency=2 -Q uploads,celery
+    celery -A app.tasks.celery worker --loglevel=info -P gevent --concurrency=200 \
+        -Q email,sms,notifications,push -n io@%h
 
 Start Beat scheduler (separate process):
     celery -A app.tasks.celery beat --loglevel=info
@@ -16,6 +18,24 @@ import os
 from celery import Celery
 from celery.schedules import crontab
 
+RATE_LIMIT_RETRIES = 10    # provider throttling (app.providers.RateLimited) is not a failure
+
+
+def _green_db_driver():
+    """Under the gevent pool (celery -P gevent patches sockets before this
+    module loads) make psycopg2 yield to other greenlets while it waits on
+    PostgreSQL, instead of blocking the whole worker."""
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('socket'):
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+    except ImportError:
+        pass
+
+
+_green_db_driver()
+
 
 # ── Lazy Flask app (created once per worker process, not per task call) ──────
 _flask_app = None
@@ -46,11 +66,26 @@ def make_celery():
         enable_utc=True,
         task_acks_late=True,
         worker_prefetch_multiplier=1,
+        # Every task is fire-and-forget (nothing reads AsyncResult) — don't
+        # write a result key to Redis per run. Opt back in per task with
+        # @celery.task(ignore_result=False). Failures still reach the logs
+        # and app.task_metrics.
+        task_ignore_result=True,
+        task_store_errors_even_if_ignored=False,
         task_routes={
             'app.tasks.send_email_task':      {'queue': 'email'},
+            'app.tasks.send_bulk_mail_task':  {'queue': 'email'},
+            'app.tasks.send_message_digest_email_task': {'queue': 'email'},
             'app.tasks.send_sms_task':        {'queue': 'sms'},
+            'app.tasks.send_sms_bulk_task':   {'queue': 'sms'},
             'app.tasks.send_whatsapp_task':   {'queue': 'notifications'},
             'app.tasks.upload_image_task':    {'queue': 'uploads'},
+            'app.tasks.make_derivative_task': {'queue': 'uploads'},
+            'app.tasks.broadcast_notification_task': {'queue': 'notifications'},
+            'app.tasks.dispatch_push':        {'queue': 'push'},
+            # OTP SMS and WhatsApp go through the relay — keep it on the gevent
+            # I/O worker, never queued behind image work on 'celery'
+            'app.tasks.relay_outbox':         {'queue': 'notifications'},
         },
         beat_schedule={
             'subscription-expiry-sweep': {
@@ -65,9 +100,33 @@ def make_celery():
                 'task':     'app.tasks.cleanup_expired_otps',
                 'schedule': crontab(hour=3, minute=0),    # daily 03:00 UTC
             },
-            'stale-notification-cleanup': {
-                'task':     'app.tasks.cleanup_stale_notifications',
-                'schedule': crontab(hour=4, minute=0, day_of_week=0),  # Sunday 04:00 UTC
+            'data-retention': {
+                'task':     'app.tasks.apply_retention',
+                'schedule': crontab(hour=4, minute=0),    # daily 04:00 UTC
+            },
+            'presence-flush': {
+                'task':     'app.tasks.flush_presence',
+                'schedule': 300.0,    # every 5 minutes
+            },
+            'outbox-relay': {
+                'task':     'app.tasks.relay_outbox',
+                'schedule': 30.0,     # safety net — commits kick the relay directly
+            },
+            'queue-depth-sample': {
+                'task':     'app.tasks.sample_queue_depths',
+                'schedule': 60.0,     # every minute — console Tasks page
+            },
+            'push-dispatch': {
+                'task':     'app.tasks.dispatch_push',
+                'schedule': 10.0,     # every 10 seconds
+            },
+            'badge-reconcile': {
+                'task':     'app.tasks.reconcile_badges',
+                'schedule': 900.0,    # every 15 minutes
+            },
+            'message-archival': {
+                'task':     'app.tasks.archive_messages',
+                'schedule': crontab(hour=3, minute=30),   # daily 03:30 UTC
             },
             'nightly-match-score-refresh': {
                 'task':     'app.tasks.refresh_match_scores',
@@ -79,13 +138,36 @@ def make_celery():
     # ContextTask — provides Flask app context to every task automatically.
     # Replaces the old `from wsgi import app; with app.app_context():` pattern
     # that lived inside each task body (circular-import risk, redundant boilerplate).
+    # Tasks published by the outbox relay (task id 'outbox-<id>') run at most
+    # once per successful completion: begin() is an atomic claim with a lease,
+    # release() frees it when the run raises (retries included) — see
+    # app/outbox.py.
     class ContextTask(celery.Task):
         abstract = True
         def __call__(self, *args, **kwargs):
             with _get_flask_app().app_context():
-                return self.run(*args, **kwargs)
+                from app import outbox
+                eid = outbox.event_id(self.request.id)
+                if eid and not outbox.begin(eid):
+                    return {'status': 'duplicate', 'outbox_id': eid}
+                try:
+                    result = self.run(*args, **kwargs)
+                except BaseException:
+                    if eid:
+                        try:
+                            outbox.release(eid)
+                        except Exception:
+                            pass       # the lease expires on its own
+                    raise
+                if eid:
+                    outbox.complete(eid)
+                return result
 
     celery.Task = ContextTask
+
+    # Lag / runtime / retry / failure per task — console Tasks page
+    from app.task_metrics import install
+    install(celery)
     return celery
 
 
@@ -100,20 +182,9 @@ celery = make_celery()
 def send_email_task(self, to: str, subject: str, html_body: str):
     """Send email via AWS SES. Retries up to 3 times on failure."""
     try:
-        mail_from  = os.environ.get('MAIL_FROM', '')
-        aws_region = os.environ.get('AWS_REGION', '')
-        if not mail_from or not aws_region:
+        from app.mail import send
+        if not send(to, subject, html_body):
             return {'status': 'skipped', 'reason': 'SES not configured'}
-        import boto3
-        ses = boto3.client('ses', region_name=aws_region)
-        ses.send_email(
-            Source=mail_from,
-            Destination={'ToAddresses': [to]},
-            Message={
-                'Subject': {'Data': subject, 'Charset': 'UTF-8'},
-                'Body':    {'Html': {'Data': html_body, 'Charset': 'UTF-8'}},
-            }
-        )
         return {'status': 'sent', 'to': to}
     except Exception as exc:
         raise self.retry(exc=exc)
@@ -246,6 +317,52 @@ def send_message_email_task(self, receiver_id: int, sender_name: str,
         raise self.retry(exc=exc)
 
 
+@celery.task(bind=True, max_retries=3, default_retry_delay=30)
+def send_message_digest_email_task(self, key: str, receiver_id: int, conv_id: int,
+                                   items=None):
+    """One email for every chat message buffered under `key` (app.dedupe) in
+    the last MESSAGE_EMAIL_WINDOW seconds. Messages the receiver has already
+    read by the time the window closes are left out."""
+    from app import dedupe
+    from app.models import User, Conversation
+    from app.utils import send_email
+    buffered = items is None
+    items    = dedupe.pending(key) if buffered else items
+    if not items:
+        return {'status': 'empty'}
+    try:
+        receiver = User.query.get(receiver_id)
+        conv     = Conversation.query.get(conv_id)
+        seen     = conv.read_watermark_for(receiver_id) if conv else 0
+        unread   = [i for i in items if (i.get('id') or 0) > seen]
+        if not receiver or not unread:
+            result = {'status': 'skipped', 'buffered': len(items)}
+        else:
+            senders = list(dict.fromkeys(i['sender'] for i in unread))
+            who     = senders[0] if len(senders) == 1 else ', '.join(senders)
+            n       = len(unread)
+            quotes  = ''.join(
+                f"<blockquote style='border-left:3px solid #dc3545;padding:8px 16px;"
+                f"color:#555;'>{i['preview'][:200]}</blockquote>" for i in unread[-3:])
+            html = (f"<h2>New Message{'s' if n > 1 else ''} on iJodidar</h2>"
+                    f"<p><strong>{who}</strong> sent you "
+                    f"{'a message' if n == 1 else f'{n} messages'}.</p>"
+                    f"{quotes}"
+                    f"<a href='https://ijodidar.com/messages/{conv_id}' "
+                    f"style='background:#dc3545;color:white;padding:10px 22px;"
+                    f"border-radius:20px;text-decoration:none;display:inline-block;'>"
+                    f"Reply Now</a>")
+            subject = (f'{who} sent you a message!' if n == 1
+                       else f'{who} sent you {n} messages')
+            send_email(receiver.email, subject, html)
+            result = {'status': 'sent', 'messages': n}
+    except Exception as exc:
+        raise self.retry(exc=exc)
+    if buffered:
+        dedupe.ack(key, len(items))
+    return result
+
+
 @celery.task(bind=True, max_retries=3, default_retry_delay=30)
 def send_password_reset_email_task(self, user_id: int, reset_url: str):
     """Send password reset email."""
@@ -276,50 +393,31 @@ def send_password_reset_email_task(self, user_id: int, reset_url: str):
 
 @celery.task(bind=True, max_retries=3, default_retry_delay=30)
 def send_sms_task(self, phone: str, otp: str):
-    """Send OTP via Fast2SMS (primary) → MSG91 (after DLT) → console (dev)."""
-    import requests as req, logging
-    log = logging.getLogger(__name__)
-
-    fast2sms_key = os.environ.get('FAST2SMS_API_KEY', '')
-    msg91_key    = os.environ.get('MSG91_AUTH_KEY', '')
-
+    """Send OTP via Fast2SMS (primary) → MSG91 (after DLT) → console (dev).
+    Pooled, rate-limited provider clients — see app/providers.py."""
+    from app.providers import send_otp_sms, RateLimited, retry_countdown
     try:
-        if fast2sms_key:
-            resp = req.get(
-                "https://www.fast2sms.com/dev/bulkV2",
-                params={"authorization": fast2sms_key,
-                        "message": f"Your iJodidar verification code is {otp}. Valid for 10 minutes. Do not share.",
-                        "route": "q",
-                        "numbers": phone},
-                headers={"cache-control": "no-cache"},
-                timeout=10,
-            )
-            data = resp.json()
-            if data.get('return') is True:
-                return {'status': 'sent', 'provider': 'fast2sms'}
-            log.error(f"Fast2SMS error: {data}")
-            return {'status': 'failed', 'provider': 'fast2sms'}
-
-        if msg91_key:
-            template_id = os.environ.get('MSG91_TEMPLATE_ID', '')
-            resp = req.post(
-                "https://api.msg91.com/api/v5/otp",
-                json={"template_id": template_id,
-                      "mobile": f"91{phone}",
-                      "authkey": msg91_key,
-                      "otp": otp},
-                timeout=10,
-            )
-            return {'status': 'sent' if resp.status_code == 200 else 'failed',
-                    'provider': 'msg91'}
-
-        log.info(f'[DEV OTP] Phone:{phone} OTP:{otp}')
-        return {'status': 'dev_logged', 'otp': otp}
-
+        return send_otp_sms(phone, otp)
+    except RateLimited as exc:
+        raise self.retry(exc=exc, max_retries=RATE_LIMIT_RETRIES,
+                         countdown=retry_countdown(exc, self.request.retries))
     except Exception as exc:
         raise self.retry(exc=exc)
 
 
+@celery.task(bind=True, max_retries=RATE_LIMIT_RETRIES)
+def send_sms_bulk_task(self, numbers: list, message: str):
+    """One SMS text to many numbers (Fast2SMS bulk endpoint, 500 per request).
+    A rate-limited retry carries only the numbers not yet sent."""
+    from app.providers import send_sms_bulk, RateLimited, retry_countdown
+    try:
+        return send_sms_bulk(numbers, message)
+    except RateLimited as exc:
+        remaining = exc.remaining if exc.remaining is not None else numbers
+        raise self.retry(args=(remaining, message), exc=exc,
+                         countdown=retry_countdown(exc, self.request.retries))
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 #  WHATSAPP TASKS
 # ─────────────────────────────────────────────────────────────────────────────
@@ -327,14 +425,52 @@ def send_sms_task(self, phone: str, otp: str):
 @celery.task(bind=True, max_retries=2, default_retry_delay=60)
 def send_whatsapp_task(self, phone: str, template: str, params: list):
     """Send WhatsApp Business API message."""
+    from app.providers import RateLimited, retry_countdown
     try:
         from app.utils import send_whatsapp
-        send_whatsapp(phone, template, params)
-        return {'status': 'sent'}
+        ok = send_whatsapp(phone, template, params)
+        return {'status': 'sent' if ok else 'failed'}
+    except RateLimited as exc:
+        raise self.retry(exc=exc, max_retries=RATE_LIMIT_RETRIES,
+                         countdown=retry_countdown(exc, self.request.retries))
     except Exception as exc:
         raise self.retry(exc=exc)
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+#  IMAGE TASKS
+# ─────────────────────────────────────────────────────────────────────────────
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=20)
+def upload_image_task(self, image_id: int):
+    """Make the 800/400/150 px sizes of an uploaded profile photo from its
+    stored original (app/images.py) and swap them in for the placeholder."""
+    from app.images import process, mark_failed
+    try:
+        return process(image_id)
+    except Exception as exc:
+        from app import db
+        db.session.rollback()
+        if self.request.retries >= self.max_retries:
+            mark_failed(image_id)
+            return {'status': 'failed', 'error': str(exc)[:200]}
+        raise self.retry(exc=exc)
+
+
+@celery.task
+def make_derivative_task(image_id: int, width: int, fmt: str):
+    """Make one on-demand size of a profile photo (app.images.make_derivative).
+    No retries: the lock is released either way, so the next request for the
+    size queues it again."""
+    from app.images import make_derivative
+    try:
+        return make_derivative(image_id, width, fmt)
+    except Exception as exc:
+        from app import db
+        db.session.rollback()
+        return {'status': 'failed', 'error': str(exc)[:200]}
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 #  CELERY BEAT — SCHEDULED TASKS
 # ─────────────────────────────────────────────────────────────────────────────
@@ -342,155 +478,142 @@ def send_whatsapp_task(self, phone: str, template: str, params: list):
 @celery.task
 def sweep_expired_subscriptions():
     """Mark paid subscriptions as inactive when their expiry has passed.
-    Runs hourly. Without this, expired users keep paid features indefinitely."""
-    from datetime import datetime
-    from app.models import UserSubscription
-    from app import db
-    now     = datetime.utcnow()
-    expired = (UserSubscription.query
-               .filter(UserSubscription.is_active == True,
-                       UserSubscription.expires_at != None,
-                       UserSubscription.expires_at < now)
-               .all())
-    count = 0
-    for sub in expired:
-        sub.is_active = False
-        count += 1
-    if count:
-        db.session.commit()
-    return {'expired_count': count}
+    Runs hourly. Without this, expired users keep paid features indefinitely.
+    Chunked UPDATE … RETURNING — see app/sweepers.py."""
+    from app.sweepers import expire_subscriptions
+    return {'expired_count': expire_subscriptions()}
 
 
 @celery.task
 def send_daily_matches_all():
     """Fan-out daily match digest to all active users with complete profiles.
-    Runs daily at 02:30 UTC (08:00 IST). Each user gets their own sub-task."""
-    from datetime import datetime, timedelta
-    from app.models import User, Profile
-    cutoff = datetime.utcnow() - timedelta(days=90)
-    users = (User.query
-             .join(Profile)
-             .filter(
-                 User.is_active_acc == True,
-                 User.is_hidden     == False,
-                 User.is_staff      == False,
-                 Profile.gender     != None,
-                 Profile.looking_for != None,
-             )
-             .filter(
-                 (User.last_active_at == None) | (User.last_active_at > cutoff)
-             )
-             .with_entities(User.id)
-             .all())
-    count = 0
-    for (uid,) in users:
-        send_daily_match_digest.delay(uid)
-        count += 1
-    return {'queued': count}
+    Runs daily at 02:30 UTC (08:00 IST). One sub-task per ~500 users
+    (app.digest.CHUNK_SIZE) instead of one per user."""
+    from app.digest import eligible_user_ids, CHUNK_SIZE
+    ids = eligible_user_ids()
+    for i in range(0, len(ids), CHUNK_SIZE):
+        send_match_digest_chunk.delay(ids[i:i + CHUNK_SIZE])
+    return {'users': len(ids), 'chunks': -(-len(ids) // CHUNK_SIZE)}
 
 
 @celery.task(bind=True, max_retries=2, default_retry_delay=120)
-def send_daily_match_digest(self, user_id: int):
-    """Send one user their top-3 new daily matches by email."""
+def send_match_digest_chunk(self, user_ids: list):
+    """Build digests for a chunk of users (shared segment pools, batch
+    scoring — see app/digest.py) and hand the emails to the email queue."""
     try:
-        from app.models import User, Profile, Interest
-        from app.utils import send_email
-        user = User.query.get(user_id)
-        if not user or not user.email:
-            return {'status': 'skipped'}
-        p = user.profile
-        if not p or not p.gender or not p.looking_for:
-            return {'status': 'skipped', 'reason': 'incomplete profile'}
-
-        # Find up to 3 matches not yet interacted with
-        sent_ids     = {i.receiver_id for i in user.interests_sent}
-        received_ids = {i.sender_id   for i in user.interests_received}
-        exclude      = sent_ids | received_ids | {user.id}
-
-        candidates = (User.query
-                      .join(Profile)
-                      .filter(
-                          User.is_active_acc  == True,
-                          User.is_hidden      == False,
-                          User.is_staff       == False,
-                          Profile.gender      == p.looking_for,
-                          Profile.looking_for == p.gender,
-                          User.id.notin_(exclude),
-                      )
-                      .limit(3).all())
-
-        if not candidates:
-            return {'status': 'no_matches'}
-
-        rows = ''.join(
-            f"<tr><td style='padding:8px'>{c.first_name} {c.last_name[0]}.</td>"
-            f"<td style='padding:8px'>"
-            f"<a href='https://ijodidar.com/profile/{c.id}' style='color:#dc3545'>View</a>"
-            f"</td></tr>"
-            for c in candidates
-        )
-        html = f"""<div style="font-family:sans-serif;max-width:500px;margin:0 auto;">
-        <h2 style="color:#dc3545;">Today's Matches, {user.first_name}!</h2>
-        <p>Here are new profiles you might like:</p>
-        <table style="width:100%;border-collapse:collapse">{rows}</table>
-        <a href="https://ijodidar.com/home"
-           style="background:#dc3545;color:white;padding:12px 28px;
-           border-radius:25px;text-decoration:none;display:inline-block;margin-top:16px;">
-           See All Matches</a>
-        <p style="color:#999;font-size:11px;margin-top:16px;">
-        <a href="https://ijodidar.com/profile/settings" style="color:#999">
-        Unsubscribe from daily digest</a></p>
-        </div>"""
-        send_email(user.email, f'Your daily matches on iJodidar, {user.first_name}!', html)
-        return {'status': 'sent', 'user_id': user_id, 'matches': len(candidates)}
+        from app.digest import build_digests, digest_message, EMAIL_BATCH
+        messages = [digest_message(u, cands) for u, cands in build_digests(user_ids)]
+        for i in range(0, len(messages), EMAIL_BATCH):
+            send_bulk_mail_task.delay('daily_digest', messages[i:i + EMAIL_BATCH])
+        return {'users': len(user_ids), 'emails': len(messages)}
     except Exception as exc:
         raise self.retry(exc=exc)
 
 
+@celery.task
+def send_daily_match_digest(user_id: int):
+    """Send one user their daily matches (manual / single-user path)."""
+    return send_match_digest_chunk([user_id])
+
+
+@celery.task(bind=True, max_retries=3)
+def send_bulk_mail_task(self, template: str, recipients: list):
+    """Send an app.mail template to [to, data] pairs, 50 per SES call.
+    Calls that hit throttling / 5xx / connection errors are retried with
+    backoff carrying only their own recipients; other failures are counted."""
+    from app.mail import send_bulk
+    retry = []
+    stats = send_bulk(template, [tuple(r) for r in recipients], retry=retry)
+    if retry:
+        if self.request.retries < self.max_retries:
+            raise self.retry(args=(template, retry),
+                             countdown=60 * 2 ** self.request.retries)
+        stats['failed'] += len(retry)
+    return stats
+
+
 @celery.task
 def cleanup_expired_otps():
-    """Clear expired OTPs, reset tokens, and verify tokens. Runs daily."""
-    from datetime import datetime
-    from app.models import User
-    from app import db
-    now   = datetime.utcnow()
-    count = 0
-    users = User.query.filter(
-        (User.phone_otp_expiry  < now) |
-        (User.reset_token_expiry < now) |
-        (User.verify_token_expiry < now)
-    ).all()
-    for u in users:
-        if u.phone_otp_expiry and u.phone_otp_expiry < now:
-            u.phone_otp        = None
-            u.phone_otp_expiry = None
-            count += 1
-        if u.reset_token_expiry and u.reset_token_expiry < now:
-            u.reset_token        = None
-            u.reset_token_expiry = None
-            count += 1
-        if u.verify_token_expiry and u.verify_token_expiry < now and not u.is_verified:
-            u.verify_token        = None
-            u.verify_token_expiry = None
-            count += 1
-    if count:
-        db.session.commit()
-    return {'cleaned': count}
+    """Clear expired OTPs, reset tokens, and verify tokens. Runs daily.
+    Chunked UPDATE … RETURNING per token column — see app/sweepers.py."""
+    from app.sweepers import clear_expired_tokens
+    counts = clear_expired_tokens()
+    return {'cleaned': sum(counts.values()), **counts}
+
+
+@celery.task
+def apply_retention():
+    """Chunked purge of notifications, rollups, profile_views, user_signals and
+    processed outbox rows. Daily; per-table ages and row budgets in config
+    RETENTION (app/retention.py)."""
+    from app.retention import run_all
+    return run_all()
 
 
 @celery.task
 def cleanup_stale_notifications():
-    """Delete read notifications older than 90 days. Runs weekly."""
-    from datetime import datetime, timedelta
-    from app.models import Notification
-    from app import db
-    cutoff = datetime.utcnow() - timedelta(days=90)
-    deleted = (Notification.query
-               .filter(Notification.is_read == True,
-                       Notification.created_at < cutoff)
-               .delete())
-    db.session.commit()
-    return {'deleted': deleted}
+    """Read notifications past retention (and dead rollups). Superseded by
+    apply_retention; kept so already-queued calls still run."""
+    from app.retention import POLICIES, run_policy
+    return {name: run_policy(POLICIES[name])
+            for name in ('notification_rollups', 'notifications')}
+
+
+@celery.task
+def relay_outbox():
+    """Publish committed outbox rows to their tasks. Kicked after each commit
+    that wrote one; also every 30 s from Beat."""
+    from app.outbox import relay
+    return {'published': relay()}
+
+
+@celery.task
+def sample_queue_depths():
+    """Record broker queue depths for the console Tasks page. Every minute."""
+    from app.task_metrics import sample_queues
+    return sample_queues()
+
+
+@celery.task
+def flush_presence():
+    """Bulk-write Redis last-seen timestamps to users.last_active_at. Every 5 min.
+    Replaces the per-user commit that used to happen in before_request."""
+    from app.presence import flush_to_db
+    return {'flushed': flush_to_db()}
+
+
+@celery.task
+def broadcast_notification_task(message: str, link: str = ''):
+    """Console broadcast — one system notification per active user."""
+    from app.utils import broadcast_system_notification
+    return {'created': broadcast_system_notification(message, link)}
+
+
+@celery.task(ignore_result=True)
+def dispatch_push():
+    """Send pending in-app notifications to users' devices, batched. Every 10 s."""
+    from app.push import dispatch_pending
+    stats = dispatch_pending()
+    if stats['notifications']:
+        import logging
+        logging.getLogger(__name__).info(f'push dispatch: {stats}')
+    return stats
+
+
+@celery.task
+def reconcile_badges():
+    """Correct drift in the Redis badge counters against the database. Every 15 min."""
+    from app.counters import reconcile
+    checked, fixed = reconcile()
+    return {'checked': checked, 'fixed': fixed}
+
+
+@celery.task
+def archive_messages():
+    """Move old messages of fully-read conversations to messages_archive. Nightly.
+    Age and chunk size: MESSAGE_ARCHIVE_DAYS / MESSAGE_ARCHIVE_BATCH."""
+    from app.messaging.service import archive_old_messages
+    return {'archived': archive_old_messages()}
 
 
 @celery.task
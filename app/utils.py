@@ -1,5 +1,5 @@
-import boto3, uuid, os, secrets
-from datetime import datetime
+import os, secrets
+from datetime import datetime, timedelta
 from flask import current_app
 from werkzeug.utils import secure_filename
 from app import db
@@ -10,101 +10,35 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
 
-def _resize_and_upload(s3, image_pil, bucket, region, key, size):
-    import io
-    img = image_pil.copy()
-    w, h    = img.size
-    min_dim = min(w, h)
-    left    = (w - min_dim) // 2
-    top     = (h - min_dim) // 2
-    img     = img.crop((left, top, left + min_dim, top + min_dim))
-    img     = img.resize((size, size))
-    buf     = io.BytesIO()
-    img.convert('RGB').save(buf, 'JPEG', quality=85, optimize=True)
-    buf.seek(0)
-    s3.upload_fileobj(buf, bucket, key, ExtraArgs={'ContentType': 'image/jpeg',
-                                                    'ACL': 'private'})  # private — use signed URLs
-    return f"https://{bucket}.s3.{region}.amazonaws.com/{key}"
-
-
 def get_signed_image_url(image_url: str, expiry: int = 3600) -> str:
     """
-    Return a pre-signed S3 URL that expires after `expiry` seconds (default 1 hour).
-    Falls back to the original URL if S3 is not configured or URL is not an S3 URL.
+    Return a URL the browser can fetch for a stored image, valid for at least
+    `expiry` seconds (S3: presigned and memoized — see app/s3.py; local disk:
+    unchanged). URLs that don't belong to the storage backend pass through.
     Used in templates via the |signed_url filter.
     """
-    if not image_url or 's3.amazonaws.com' not in image_url:
-        return image_url or ''
-    try:
-        region = current_app.config.get('AWS_REGION', '')
-        bucket = current_app.config.get('AWS_S3_BUCKET', '')
-        if not region or not bucket:
-            return image_url
-        # Extract key from full S3 URL: https://bucket.s3.region.amazonaws.com/key
-        parts = image_url.split('.amazonaws.com/')
-        if len(parts) < 2:
-            return image_url
-        key = parts[1]
-        s3  = boto3.client('s3', region_name=region)
-        return s3.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': bucket, 'Key': key},
-            ExpiresIn=expiry,
-        )
-    except Exception as e:
-        current_app.logger.warning(f'Signed URL failed for {image_url}: {e}')
-        return image_url
-
-
-def upload_image_to_s3(file, user_id=None):
-    """Upload to S3 in 3 sizes. Returns (full_url, thumb_url, card_url, error)."""
-    from PIL import Image
-    import io
-
-    if not file or file.filename == '':
-        return None, None, None, 'No file selected.'
-    if not allowed_file(file.filename):
-        return None, None, None, 'Only JPG/PNG files are allowed.'
+    return get_signed_image_urls([image_url], expiry)[0]
 
-    # Guard: check S3 is configured before attempting upload
-    bucket = current_app.config.get('AWS_S3_BUCKET', '')
-    region = current_app.config.get('AWS_REGION', '')
-    if not bucket or not region:
-        current_app.logger.warning('S3 upload skipped: AWS_S3_BUCKET or AWS_REGION not configured')
-        return None, None, None, 'Photo uploads are temporarily unavailable. Please try again later.'
 
+def get_signed_image_urls(image_urls, expiry: int = 3600):
+    """get_signed_image_url() over a list, backend looked up once.
+    Used in templates via the |signed_urls filter."""
+    from app.storage import get_backend
+    urls = [u or '' for u in image_urls]
     try:
-        raw   = file.read()
-        image = Image.open(io.BytesIO(raw))
-        image.verify()
-        image = Image.open(io.BytesIO(raw))
-        if image.mode not in ('RGB', 'RGBA'):
-            image = image.convert('RGB')
-
-        uid    = user_id or 'u'
-        base   = f"profiles/{uid}/{uuid.uuid4().hex}"
-        bucket = current_app.config['AWS_S3_BUCKET']
-        region = current_app.config['AWS_REGION']
-        s3     = boto3.client('s3', region_name=region)
-
-        full_url  = _resize_and_upload(s3, image, bucket, region, f"{base}.jpg",   800)
-        card_url  = _resize_and_upload(s3, image, bucket, region, f"{base}_c.jpg", 400)
-        thumb_url = _resize_and_upload(s3, image, bucket, region, f"{base}_t.jpg", 150)
-
-        return full_url, thumb_url, card_url, None
+        store = get_backend()
     except Exception as e:
-        current_app.logger.error(f"S3 upload error: {e}")
-        return None, None, None, 'Upload failed. Please try again.'
-
-
-def delete_image_from_s3(image_url):
-    try:
-        bucket = current_app.config['AWS_S3_BUCKET']
-        region = current_app.config['AWS_REGION']
-        key    = '/'.join(image_url.split('/')[-3:])  # profiles/uid/filename
-        boto3.client('s3', region_name=region).delete_object(Bucket=bucket, Key=key)
-    except Exception as e:
-        current_app.logger.warning(f"S3 delete error: {e}")
+        current_app.logger.warning(f'Storage backend unavailable: {e}')
+        return urls
+    out = []
+    for url in urls:
+        key = store.key_for(url)
+        try:
+            out.append(store.signed_url(key, expiry) if key else url)
+        except Exception as e:
+            current_app.logger.warning(f'Signed URL failed for {url}: {e}')
+            out.append(url)
+    return out
 
 
 def calculate_profile_completeness(user):
@@ -157,24 +91,12 @@ def generate_token(length=32):
 
 
 def send_email(to, subject, html_body):
-    """Send email via AWS SES. Returns True on success, False if not configured or on error."""
-    # Skip immediately if SES not configured — prevents hanging
-    mail_from  = current_app.config.get('MAIL_FROM', '')
-    aws_region = current_app.config.get('AWS_REGION', '')
-    if not mail_from or not aws_region:
-        current_app.logger.info(f'Email skipped (SES not configured): {to}')
-        return False
+    """Send email via app.mail (SES). Returns True on success, False if not configured or on error."""
+    from app.mail import send
     try:
-        region = current_app.config.get('AWS_REGION', 'ap-south-1')
-        ses    = boto3.client('ses', region_name=region)
-        ses.send_email(
-            Source=current_app.config.get('MAIL_FROM', 'noreply@ijodidar.in'),
-            Destination={'ToAddresses': [to]},
-            Message={
-                'Subject': {'Data': subject, 'Charset': 'UTF-8'},
-                'Body':    {'Html': {'Data': html_body, 'Charset': 'UTF-8'}}
-            }
-        )
+        if not send(to, subject, html_body):
+            current_app.logger.info(f'Email skipped (SES not configured): {to}')
+            return False
         return True
     except Exception as e:
         current_app.logger.error(f"SES email error: {e}")
@@ -184,11 +106,13 @@ def send_email(to, subject, html_body):
 # ─────────────────────────────────────────────────────────────────────────────
 #  MATCH SCORE ALGORITHM
 # ─────────────────────────────────────────────────────────────────────────────
-def calculate_match_score(current_user, candidate):
+def calculate_match_score(current_user, candidate, signal_boost=None, nakshatras=None):
     """
     Score how well candidate matches current_user's PartnerPreference.
     Returns integer 0-100. Incorporates behavioral signal boost/suppress.
     Signal boost: accepted interests +2, shortlisted +0.5, blocked -2, reported -3.
+    Batch callers (app.digest) pass signal_boost and nakshatras=(mine, theirs)
+    preloaded so scoring a candidate runs no queries.
     """
     from app.models import PartnerPreference
     from datetime import date
@@ -301,7 +225,8 @@ def calculate_match_score(current_user, candidate):
 
     # Behavioral signal boost/suppress — max ±15 points
     try:
-        boost = get_signal_boost(current_user.id, candidate.id)
+        boost = (signal_boost if signal_boost is not None
+                 else get_signal_boost(current_user.id, candidate.id))
         signal_pts = int(boost * 5)
         base_score = max(0, min(base_score + signal_pts, 100))
     except Exception:
@@ -310,12 +235,14 @@ def calculate_match_score(current_user, candidate):
     # Guna Milan compatibility boost (when both users have kundli data)
     # 28+ gunas → +5 pts  |  18-27 → +2 pts  |  <18 → -3 pts
     try:
-        from app.models import KundliDetail
-        my_kd    = KundliDetail.query.filter_by(user_id=current_user.id).first()
-        other_kd = KundliDetail.query.filter_by(user_id=candidate.id).first()
-        if my_kd and other_kd and my_kd.nakshatra and other_kd.nakshatra:
+        if nakshatras is None:
+            from app.models import KundliDetail
+            my_kd    = KundliDetail.query.filter_by(user_id=current_user.id).first()
+            other_kd = KundliDetail.query.filter_by(user_id=candidate.id).first()
+            nakshatras = (my_kd and my_kd.nakshatra, other_kd and other_kd.nakshatra)
+        if nakshatras[0] and nakshatras[1]:
             from app.utils_kundli import calculate_guna_milan
-            guna = calculate_guna_milan(my_kd.nakshatra, other_kd.nakshatra)
+            guna = calculate_guna_milan(*nakshatras)
             if guna.get('available') and guna.get('score') is not None:
                 g = guna['score']
                 if g >= 28:
@@ -342,19 +269,272 @@ def get_cached_match_score(current_user, candidate):
     return score
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+#  NOTIFICATIONS
+#  Every creation path ends in _on_commit(_deliver, ...): once the row is
+#  committed, the badge counter is bumped and the bell is updated live over
+#  Socket.IO (room user_{id}). Nothing is announced for a rolled-back row.
+# ─────────────────────────────────────────────────────────────────────────────
+def _on_commit(fn, *args):
+    """Run fn(*args) after the current db.session transaction commits;
+    dropped if it rolls back. See register_session_hooks()."""
+    db.session.info.setdefault('_after_commit', []).append((fn, args))
+
+
+def _run_after_commit(session):
+    # after_commit also fires when a SAVEPOINT (_savepoint) is released —
+    # the outer transaction, and the hooks queued in it, are still pending.
+    if session.in_nested_transaction():
+        return
+    for fn, args in session.info.pop('_after_commit', []):
+        try:
+            fn(*args)
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).warning(f"after-commit hook failed: {e}")
+
+
+def _drop_after_commit(session, previous_transaction):
+    # A released-and-rolled-back savepoint (_savepoint) leaves the outer
+    # transaction — and the hooks queued in it — alive.
+    if not previous_transaction.nested:
+        session.info.pop('_after_commit', None)
+
+
+def _savepoint(commit):
+    """Context for a helper's writes. With commit=False they join the caller's
+    transaction, so run them in a SAVEPOINT: a failure rolls back only these
+    statements and the caller can still commit its own work (PostgreSQL
+    refuses every statement after an error until the transaction is rolled
+    back). Releasing the savepoint is not the commit: _on_commit hooks queued
+    inside it wait for the caller's commit (see _run_after_commit). With
+    commit=True the helper owns the transaction anyway."""
+    from contextlib import nullcontext
+    return nullcontext() if commit else db.session.begin_nested()
+
+
+def register_session_hooks():
+    """Attach the after-commit runner to db.session. Called from create_app()."""
+    from sqlalchemy import event
+    if not event.contains(db.session, 'after_commit', _run_after_commit):
+        event.listen(db.session, 'after_commit', _run_after_commit)
+        event.listen(db.session, 'after_soft_rollback', _drop_after_commit)
+
+
+def _notif_item(notif_id, notif_type, message, link, created_at):
+    """Bell-dropdown item — same shape as /notifications/list."""
+    return {'id': notif_id, 'type': notif_type, 'message': message,
+            'link': link or '', 'is_read': False,
+            'created_at': created_at.strftime('%d %b, %I:%M %p')}
+
+
+def _deliver(deltas, items):
+    """deltas {user_id: new unread rows}, items {user_id: newest item}."""
+    from app.counters import incr_many
+    incr_many('notifs', deltas)
+    emit_notif_update(set(deltas) | set(items), items)
+
+
+def emit_notif_update(user_ids, items=None):
+    """Push each user's unread count (and newest item, if given) to their bell.
+    Count is None when Redis has no badge hash; the client then re-fetches."""
+    from app import socketio
+    from app.counters import peek_badges
+    items  = items or {}
+    badges = peek_badges(user_ids)
+    for uid in user_ids:
+        payload = {'count': badges[uid]['notifs'] if badges.get(uid) else None}
+        if items.get(uid):
+            payload['notification'] = items[uid]
+        try:
+            socketio.emit('notif_update', payload, room=f'user_{uid}')
+        except Exception:
+            pass
+
+
 def create_notification(user_id, notif_type, message, link=None):
     """Create an in-app notification. Safe to call anywhere."""
     try:
         from app.models import Notification
         n = Notification(user_id=user_id, type=notif_type,
-                         message=message, link=link or '')
+                         message=message, link=link or '',
+                         created_at=datetime.utcnow())
         db.session.add(n)
+        db.session.flush()
+        _on_commit(_deliver, {user_id: 1},
+                   {user_id: _notif_item(n.id, notif_type, n.message, n.link, n.created_at)})
         db.session.commit()
     except Exception as e:
+        db.session.rollback()
         import logging
         logging.getLogger(__name__).warning(f"Notification create failed: {e}")
 
 
+# Coalescing rules: window, single-event text, rolled-up text.
+# {actor} = latest actor, {others} = "1 other" / "14 others", {count} = events.
+COALESCE_RULES = {
+    'profile_viewed':    (timedelta(hours=24),
+                          '{actor} viewed your profile.',
+                          '{actor} and {others} viewed your profile.'),
+    'interest_received': (timedelta(hours=6),
+                          '{actor} sent you an interest request!',
+                          '{actor} and {others} sent you interest requests!'),
+    'new_message':       (timedelta(hours=1),
+                          '{actor} sent you a message.',
+                          '{actor} sent you {count} messages.'),
+}
+
+
+def notify_coalesced(user_id, notif_type, actor_name, link=None,
+                     group_key=None, commit=True):
+    """Create a notification, or fold it into the user's open one of the same
+    group (see COALESCE_RULES and NotificationRollup).
+
+    A rollup stays open for the rule's window and while its notification is
+    unread; updating it rewrites the text and link and moves it to the top of
+    the list. Only a new row bumps the badge counter. Folded events are not
+    pushed again. commit=False leaves the rows in the caller's transaction,
+    in a savepoint: a failure here never aborts the caller's work.
+    """
+    from app.models import Notification, NotificationRollup
+    window, single, rolled = COALESCE_RULES[notif_type]
+    group_key = group_key or notif_type
+    now       = datetime.utcnow()
+    try:
+        with _savepoint(commit):
+            rollup = (NotificationRollup.query
+                      .join(Notification, Notification.id == NotificationRollup.notification_id)
+                      .filter(NotificationRollup.user_id == user_id,
+                              NotificationRollup.group_key == group_key,
+                              NotificationRollup.window_start >= now - window,
+                              Notification.is_read == False)
+                      .order_by(NotificationRollup.window_start.desc())
+                      .with_for_update()
+                      .first())
+            if rollup:
+                rollup.actor_count    += 1
+                rollup.last_actor_name = actor_name[:80]
+                others = rollup.actor_count - 1
+                n = rollup.notification
+                n.message    = rolled.format(
+                    actor=actor_name, count=rollup.actor_count,
+                    others=f"{others} other{'s' if others != 1 else ''}")[:200]
+                n.link       = link or n.link
+                n.created_at = now
+            else:
+                n = Notification(user_id=user_id, type=notif_type,
+                                 message=single.format(actor=actor_name)[:200],
+                                 link=link or '', created_at=now)
+                db.session.add(n)
+                db.session.add(NotificationRollup(notification=n, user_id=user_id,
+                                                  group_key=group_key, window_start=now,
+                                                  last_actor_name=actor_name[:80]))
+            db.session.flush()
+        _on_commit(_deliver, {user_id: 0 if rollup else 1},
+                   {user_id: _notif_item(n.id, notif_type, n.message, n.link, now)})
+        if commit:
+            db.session.commit()
+    except Exception as e:
+        if commit:
+            db.session.rollback()
+        import logging
+        logging.getLogger(__name__).warning(f"Coalesced notification failed: {e}")
+
+
+def create_notifications_bulk(rows, commit=True):
+    """Insert many in-app notifications with one executemany INSERT.
+
+    rows: dicts with create_notification's keyword arguments
+          (user_id, notif_type, message, link).
+    commit=False enlists the rows in the caller's transaction — they are
+    written by the caller's own db.session.commit(); a failed INSERT rolls
+    back only its savepoint. Returns the row count.
+    Badge counters and live bell updates follow the real commit either way —
+    the caller's, never the savepoint release.
+    """
+    from collections import Counter
+    from app.models import Notification
+    now    = datetime.utcnow()
+    params = [{'user_id': r['user_id'], 'type': r['notif_type'],
+               'message': r['message'][:200], 'link': r.get('link') or '',
+               'is_read': False, 'created_at': now} for r in rows]
+    if not params:
+        return 0
+    try:
+        with _savepoint(commit):
+            db.session.execute(db.insert(Notification), params)
+        # executemany returns no ids — clients receive the count and re-fetch the list
+        _on_commit(_deliver, Counter(p['user_id'] for p in params), {})
+        if commit:
+            db.session.commit()
+        return len(params)
+    except Exception as e:
+        if commit:
+            db.session.rollback()
+        import logging
+        logging.getLogger(__name__).warning(f"Bulk notification create failed: {e}")
+        return 0
+
+
+def queue_notification(user_id, notif_type, message, link=None):
+    """Buffer a notification for the current request. Everything queued is
+    written in one INSERT + commit when the request tears down.
+
+    Socket.IO events and code outside a request (Celery, scripts) have no
+    request teardown, so there the notification is written immediately.
+    """
+    from flask import g, request, has_request_context
+    if not has_request_context() or hasattr(request, 'sid'):
+        return create_notification(user_id, notif_type, message, link)
+    g.setdefault('_notif_buffer', []).append(
+        dict(user_id=user_id, notif_type=notif_type, message=message, link=link))
+
+
+def flush_notification_buffer():
+    """Write the request's queued notifications. Called from teardown_request."""
+    from flask import g
+    rows = g.pop('_notif_buffer', None)
+    if rows:
+        create_notifications_bulk(rows)
+
+
+def broadcast_system_notification(message, link=''):
+    """Send a 'system' notification to every active, non-staff user.
+
+    One set-based INSERT … SELECT from users: recipient rows are generated by
+    the database and never pass through Python, so 100k users is a single
+    statement. Returns the number of notifications created.
+    """
+    from app.models import Notification, User
+    now = datetime.utcnow()
+    src = (db.select(User.id,
+                     db.literal('system'),
+                     db.literal(message[:200]),
+                     db.literal(link or ''),
+                     db.literal(False),
+                     db.literal(now, db.DateTime))
+           .where(User.is_active_acc == True, User.is_staff == False))
+    result = db.session.execute(db.insert(Notification).from_select(
+        ['user_id', 'type', 'message', 'link', 'is_read', 'created_at'], src))
+    db.session.commit()
+
+    def recipients(user_ids):
+        return db.session.scalars(src.with_only_columns(User.id)
+                                  .where(User.id.in_(user_ids))).all()
+
+    from app import socketio
+    from app.counters import incr_all_live
+    incr_all_live('notifs', only=recipients)
+    # One namespace-wide frame instead of one per user room. It carries no
+    # delta: staff and inactive users got no row, so every client re-fetches
+    # its own count (and list) instead.
+    try:
+        socketio.emit('notif_update', {'resync': True})
+    except Exception:
+        pass
+    return result.rowcount
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 #  REFERRAL HELPERS
 # ─────────────────────────────────────────────────────────────────────────────
@@ -449,6 +629,8 @@ def reward_referred(referred_user):
         amount_paid = 0,
     ))
     db.session.commit()
+    from app.capabilities import invalidate_plan
+    invalidate_plan(referred_user.id)
 
 
 def reward_referrer(referrer):
@@ -473,6 +655,8 @@ def reward_referrer(referrer):
         amount_paid = 0,
     ))
     db.session.commit()
+    from app.capabilities import invalidate_plan
+    invalidate_plan(referrer.id)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -526,8 +710,8 @@ def send_aadhaar_otp(aadhaar_number, phone):
 
     # Production: Surepass Aadhaar OTP API example
     try:
-        import requests
-        resp = requests.post(
+        from app.providers import get_client
+        resp = get_client('surepass').post(
             "https://kyc-api.surepass.io/api/v1/aadhaar-v2/send-otp",
             headers={"Authorization": f"Bearer {key}",
                      "Content-Type":  "application/json"},
@@ -559,8 +743,8 @@ def verify_aadhaar_otp(ref_id, otp, user):
         return False, "Enter a valid 6-digit OTP."
 
     try:
-        import requests
-        resp = requests.post(
+        from app.providers import get_client
+        resp = get_client('surepass').post(
             "https://kyc-api.surepass.io/api/v1/aadhaar-v2/submit-otp",
             headers={"Authorization": f"Bearer {key}",
                      "Content-Type":  "application/json"},
@@ -587,13 +771,13 @@ def _grant_id_verified(user):
         db.session.add(p)
     p.id_verified    = True
     p.id_verified_at = datetime.utcnow()
-    db.session.commit()
-    create_notification(
+    create_notifications_bulk([dict(
         user_id    = user.id,
         notif_type = 'system',
         message    = '🆔 Your Aadhaar-verified badge is now active on your profile!',
         link       = f'/{user.username}',
-    )
+    )], commit=False)
+    db.session.commit()
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -655,9 +839,9 @@ def send_whatsapp(phone, template_name, params):
         current_app.logger.warning(f"WhatsApp: unknown template {template_name}")
         return False
 
+    from app.providers import get_client, RateLimited
     try:
-        import requests
-        resp = requests.post(
+        resp = get_client('whatsapp').post(
             f"https://graph.facebook.com/v19.0/{phone_id}/messages",
             headers={"Authorization": f"Bearer {token}",
                      "Content-Type":  "application/json"},
@@ -674,6 +858,8 @@ def send_whatsapp(phone, template_name, params):
             return True
         current_app.logger.error(f"WhatsApp error: {result}")
         return False
+    except RateLimited:
+        raise               # send_whatsapp_task retries later
     except Exception as e:
         current_app.logger.error(f"WhatsApp exception: {e}")
         return False
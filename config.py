@@ -24,10 +24,16 @@ class Config:
 
     # AWS — leave empty until SES + S3 are configured
     # When MAIL_FROM or AWS_REGION is empty, send_email() returns False immediately
-    # When AWS_S3_BUCKET or AWS_REGION is empty, upload_image_to_s3() returns error immediately
+    # When AWS_S3_BUCKET or AWS_REGION is empty, photo storage needs STORAGE_BACKEND='local' (auto only in debug)
     AWS_REGION    = os.environ.get('AWS_REGION', '')          # set to ap-south-1 in .env after SES approved
     AWS_S3_BUCKET = os.environ.get('AWS_S3_BUCKET', 'ijodidar-images')
     MAIL_FROM     = os.environ.get('MAIL_FROM', '')            # set to noreply@ijodidar.com in .env after SES approved
+    # Mail backend (app/mail.py): 'ses' | 'file' | '' (auto: ses when MAIL_FROM + AWS_REGION set)
+    MAIL_BACKEND  = os.environ.get('MAIL_BACKEND', '')
+    MAIL_FILE_DIR = os.environ.get('MAIL_FILE_DIR', 'instance/mail')   # 'file' backend outbox
+    # File storage (app/storage.py): 's3' | 'local' | '' (auto: s3 when AWS_REGION + AWS_S3_BUCKET set, local in debug)
+    STORAGE_BACKEND   = os.environ.get('STORAGE_BACKEND', '')
+    STORAGE_LOCAL_DIR = os.environ.get('STORAGE_LOCAL_DIR', 'instance/media')        # 'local' backend root
 
     # Razorpay
     RAZORPAY_KEY_ID        = os.environ.get('RAZORPAY_KEY_ID', '')
@@ -49,6 +55,9 @@ class Config:
 
     MAX_CONTENT_LENGTH = 5 * 1024 * 1024    # 5 MB (Pillow will resize down)
     ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+    # Profile photo variants (app/images.py): JPEG + WebP always; AVIF as well
+    # when enabled and Pillow can encode it (Pillow ≥ 11.3 or pillow-avif-plugin)
+    IMAGE_AVIF = os.environ.get('IMAGE_AVIF', 'false').lower() == 'true'
     # ── Monitoring (Sentry) ─────────────────────────────────────────────────
     SENTRY_DSN = os.environ.get('SENTRY_DSN', '')   # Get from sentry.io → New Project → Python/Flask
 
@@ -74,9 +83,47 @@ class Config:
     JWT_HEADER_TYPE            = 'Bearer'
     # Blocklist: Redis DB4 — populated on logout / password change
     JWT_REDIS_BLOCKLIST_URL    = os.environ.get('REDIS_URL', 'redis://localhost:6379/4')
+    # Socket.IO message queue — lets Celery workers and every Gunicorn worker
+    # emit to any connected client (live notification bell). Empty = in-process.
+    # .env: SOCKETIO_MESSAGE_QUEUE=redis://localhost:6379/3
+    SOCKETIO_MESSAGE_QUEUE     = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
     # App-layer cache: Redis DB2 — badge counts (60s TTL), match scores (1hr TTL)
     CACHE_REDIS_URL            = os.environ.get('REDIS_URL', 'redis://localhost:6379/2')
 
+    # Message archival — read-out conversations' messages older than this move
+    # to messages_archive (nightly Beat task). History pages fall through to it.
+    MESSAGE_ARCHIVE_DAYS  = int(os.environ.get('MESSAGE_ARCHIVE_DAYS', 180))
+    MESSAGE_ARCHIVE_BATCH = int(os.environ.get('MESSAGE_ARCHIVE_BATCH', 5000))
+
+    # Email side effects (app/dedupe.py) — chat emails to one receiver per
+    # conversation are summarised once per window; a repeated interest from
+    # the same sender emails the receiver at most once per dedupe period.
+    MESSAGE_EMAIL_WINDOW  = int(os.environ.get('MESSAGE_EMAIL_WINDOW', 600))
+    INTEREST_EMAIL_DEDUPE = int(os.environ.get('INTEREST_EMAIL_DEDUPE', 86400))
+
+    # Data retention — daily chunked purge (app/retention.py). Per table:
+    # days, batch_size (rows per transaction), max_rows (budget per run),
+    # pause (seconds between chunks). Unset keys use the policy defaults.
+    RETENTION = {
+        'notifications':  {'days': int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 90))},
+        'profile_views':  {'days': int(os.environ.get('PROFILE_VIEW_RETENTION_DAYS', 180))},
+        'user_signals':   {'days': int(os.environ.get('USER_SIGNAL_RETENTION_DAYS', 365))},
+    }
+
+    # Outbound provider rate limits (app/providers.py) — shared across all workers
+    # via Redis token buckets. rate = requests/s, burst = bucket size,
+    # pool = kept-alive connections per process, max_wait = s before RateLimited.
+    PROVIDER_LIMITS = {
+        'fast2sms': {'rate': 10, 'burst': 20},
+        'msg91':    {'rate': 20, 'burst': 40},
+        'whatsapp': {'rate': 60, 'burst': 80},     # Cloud API: 80 msg/s per number
+        'surepass': {'rate': 5,  'burst': 10, 'max_wait': 2.0},   # interactive KYC
+    }
+
+    # Push notifications — 'fcm' | 'stub' | '' (disabled). See app/push.py
+    PUSH_TRANSPORT       = os.environ.get('PUSH_TRANSPORT', '')
+    FCM_CREDENTIALS_FILE = os.environ.get('FCM_CREDENTIALS_FILE', '')   # service-account JSON
+
     # Aadhaar / KYC Verification (Phase 14.2)
     KYC_API_KEY      = os.environ.get('KYC_API_KEY', '')   # Surepass/Signzy/Karza
     KYC_PROVIDER     = os.environ.get('KYC_PROVIDER', 'surepass')
@@ -0,0 +1,35 @@
+"""profile_image_variants: every size × format of a profile photo
+
+Revision ID: a5b6c7d8e9f0
+Revises: f4a5b6c7d8e9
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'a5b6c7d8e9f0'
+down_revision = 'f4a5b6c7d8e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'profile_image_variants',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('image_id', sa.Integer(), nullable=False),
+        sa.Column('format', sa.String(length=8), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=False),
+        sa.Column('url', sa.String(length=500), nullable=False),
+        sa.Column('bytes', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['image_id'], ['profile_images.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('image_id', 'format', 'width', name='uq_image_variant'),
+    )
+    op.create_index('ix_profile_image_variants_image_id', 'profile_image_variants',
+                    ['image_id'])
+
+
+def downgrade():
+    op.drop_index('ix_profile_image_variants_image_id', table_name='profile_image_variants')
+    op.drop_table('profile_image_variants')
@@ -0,0 +1,31 @@
+"""notifications.pushed_at + partial index on pending pushes
+
+Existing rows are back-filled as already pushed so enabling push does not
+deliver the whole history.
+
+Revision ID: a9b0c1d2e3f4
+Revises: f8a9b0c1d2e3
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'a9b0c1d2e3f4'
+down_revision = 'f8a9b0c1d2e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notifications') as batch_op:
+        batch_op.add_column(sa.Column('pushed_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE notifications SET pushed_at = created_at')
+    op.create_index('ix_notifications_push_pending', 'notifications', ['id'],
+                    postgresql_where=sa.text('pushed_at IS NULL'),
+                    sqlite_where=sa.text('pushed_at IS NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_notifications_push_pending', table_name='notifications')
+    with op.batch_alter_table('notifications') as batch_op:
+        batch_op.drop_column('pushed_at')
@@ -0,0 +1,37 @@
+"""notification_rollups: coalescing state for "X and N others" notifications
+
+Revision ID: b0c1d2e3f4a5
+Revises: a9b0c1d2e3f4
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'b0c1d2e3f4a5'
+down_revision = 'a9b0c1d2e3f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'notification_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('notification_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('group_key', sa.String(length=60), nullable=False),
+        sa.Column('window_start', sa.DateTime(), nullable=False),
+        sa.Column('actor_count', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('last_actor_name', sa.String(length=80), nullable=False),
+        sa.ForeignKeyConstraint(['notification_id'], ['notifications.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('notification_id'),
+    )
+    op.create_index('ix_notif_rollup_open', 'notification_rollups',
+                    ['user_id', 'group_key', 'window_start'])
+
+
+def downgrade():
+    op.drop_index('ix_notif_rollup_open', table_name='notification_rollups')
+    op.drop_table('notification_rollups')
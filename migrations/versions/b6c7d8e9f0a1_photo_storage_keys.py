@@ -0,0 +1,50 @@
+"""photos: store storage keys, not URLs (original_key, variant key)
+
+Revision ID: b6c7d8e9f0a1
+Revises: a5b6c7d8e9f0
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'b6c7d8e9f0a1'
+down_revision = 'a5b6c7d8e9f0'
+branch_labels = None
+depends_on = None
+
+_S3_HOST = '.amazonaws.com/'
+
+
+def _key(url):
+    return url.split(_S3_HOST, 1)[1] if url and _S3_HOST in url else None
+
+
+def upgrade():
+    with op.batch_alter_table('profile_images') as batch_op:
+        batch_op.add_column(sa.Column('original_key', sa.String(length=300), nullable=True))
+    with op.batch_alter_table('profile_image_variants') as batch_op:
+        batch_op.add_column(sa.Column('key', sa.String(length=300), nullable=True))
+
+    # Both tables only hold rows written by the pipeline so far — S3 URLs
+    bind = op.get_bind()
+    for id_, url in bind.execute(sa.text(
+            'SELECT id, original_url FROM profile_images WHERE original_url IS NOT NULL')).fetchall():
+        bind.execute(sa.text('UPDATE profile_images SET original_key = :k WHERE id = :i'),
+                     {'k': _key(url), 'i': id_})
+    for id_, url in bind.execute(sa.text('SELECT id, url FROM profile_image_variants')).fetchall():
+        bind.execute(sa.text('UPDATE profile_image_variants SET key = :k WHERE id = :i'),
+                     {'k': _key(url) or url, 'i': id_})
+
+    with op.batch_alter_table('profile_image_variants') as batch_op:
+        batch_op.alter_column('key', existing_type=sa.String(length=300), nullable=False)
+    with op.batch_alter_table('profile_images') as batch_op:
+        batch_op.drop_column('original_url')
+
+
+def downgrade():
+    with op.batch_alter_table('profile_images') as batch_op:
+        batch_op.add_column(sa.Column('original_url', sa.String(length=500), nullable=True))
+    with op.batch_alter_table('profile_image_variants') as batch_op:
+        batch_op.drop_column('key')
+    with op.batch_alter_table('profile_images') as batch_op:
+        batch_op.drop_column('original_key')
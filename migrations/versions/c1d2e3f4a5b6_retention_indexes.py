@@ -0,0 +1,26 @@
+"""retention indexes: notifications (is_read, created_at), profile_views.timestamp,
+user_signals.created_at
+
+Revision ID: c1d2e3f4a5b6
+Revises: b0c1d2e3f4a5
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = 'c1d2e3f4a5b6'
+down_revision = 'b0c1d2e3f4a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_notifications_read_created', 'notifications',
+                    ['is_read', 'created_at'])
+    op.create_index('ix_profile_views_timestamp', 'profile_views', ['timestamp'])
+    op.create_index('ix_signal_created', 'user_signals', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_signal_created', table_name='user_signals')
+    op.drop_index('ix_profile_views_timestamp', table_name='profile_views')
+    op.drop_index('ix_notifications_read_created', table_name='notifications')
@@ -0,0 +1,75 @@
+"""denormalized inbox: last-message + per-participant unread counters on conversations
+
+Revision ID: c5d6e7f8a9b0
+Revises: b4c5d6e7f8a9
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'c5d6e7f8a9b0'
+down_revision = 'b4c5d6e7f8a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_message_id',        sa.Integer(),     nullable=True))
+        batch_op.add_column(sa.Column('last_message_sender_id', sa.Integer(),     nullable=True))
+        batch_op.add_column(sa.Column('last_message_at',        sa.DateTime(),    nullable=True))
+        batch_op.add_column(sa.Column('last_message_preview',   sa.String(120),   nullable=True))
+        batch_op.add_column(sa.Column('unread_count_user1', sa.Integer(), nullable=False,
+                                      server_default='0'))
+        batch_op.add_column(sa.Column('unread_count_user2', sa.Integer(), nullable=False,
+                                      server_default='0'))
+
+    # Backfill from existing messages (portable correlated subqueries — PG + SQLite)
+    op.execute("""
+        UPDATE conversations SET
+            last_message_id = (
+                SELECT m.id FROM messages m WHERE m.conversation_id = conversations.id
+                ORDER BY m.sent_at DESC, m.id DESC LIMIT 1),
+            unread_count_user1 = (
+                SELECT COUNT(*) FROM messages m
+                WHERE m.conversation_id = conversations.id
+                  AND m.sender_id != conversations.user1_id
+                  AND m.is_read = FALSE),
+            unread_count_user2 = (
+                SELECT COUNT(*) FROM messages m
+                WHERE m.conversation_id = conversations.id
+                  AND m.sender_id != conversations.user2_id
+                  AND m.is_read = FALSE)
+    """)
+    op.execute("""
+        UPDATE conversations SET
+            last_message_sender_id = (SELECT m.sender_id FROM messages m
+                                      WHERE m.id = conversations.last_message_id),
+            last_message_at        = (SELECT m.sent_at FROM messages m
+                                      WHERE m.id = conversations.last_message_id),
+            last_message_preview   = (SELECT SUBSTR(m.body, 1, 120) FROM messages m
+                                      WHERE m.id = conversations.last_message_id)
+        WHERE last_message_id IS NOT NULL
+    """)
+    op.execute("""
+        UPDATE conversations
+        SET last_message_at = COALESCE(updated_at, created_at, CURRENT_TIMESTAMP)
+        WHERE last_message_at IS NULL
+    """)
+
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.alter_column('last_message_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index('ix_conv_user1_last_msg', ['user1_id', 'last_message_at'])
+        batch_op.create_index('ix_conv_user2_last_msg', ['user2_id', 'last_message_at'])
+
+
+def downgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_index('ix_conv_user2_last_msg')
+        batch_op.drop_index('ix_conv_user1_last_msg')
+        batch_op.drop_column('unread_count_user2')
+        batch_op.drop_column('unread_count_user1')
+        batch_op.drop_column('last_message_preview')
+        batch_op.drop_column('last_message_at')
+        batch_op.drop_column('last_message_sender_id')
+        batch_op.drop_column('last_message_id')
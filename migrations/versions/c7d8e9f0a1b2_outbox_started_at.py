@@ -0,0 +1,26 @@
+"""outbox: started_at lease for the consumer's atomic claim
+
+Revision ID: c7d8e9f0a1b2
+Revises: b6c7d8e9f0a1
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'c7d8e9f0a1b2'
+down_revision = 'b6c7d8e9f0a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('outbox') as batch_op:
+        batch_op.add_column(sa.Column('started_at', sa.DateTime(), nullable=True))
+
+    # Exhausted rows written before parking cleared payloads
+    op.execute("UPDATE outbox SET payload = '[]' WHERE processed_at IS NULL AND attempts >= 5")
+
+
+def downgrade():
+    with op.batch_alter_table('outbox') as batch_op:
+        batch_op.drop_column('started_at')
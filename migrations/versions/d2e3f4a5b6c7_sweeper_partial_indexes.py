@@ -0,0 +1,33 @@
+"""partial indexes for the expiry sweepers: user_subscriptions.expires_at
+(active rows), users phone_otp / reset_token / verify_token expiries
+
+Revision ID: d2e3f4a5b6c7
+Revises: c1d2e3f4a5b6
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd2e3f4a5b6c7'
+down_revision = 'c1d2e3f4a5b6'
+branch_labels = None
+depends_on = None
+
+_TOKEN_COLS = ('phone_otp_expiry', 'reset_token_expiry', 'verify_token_expiry')
+
+
+def upgrade():
+    true = '1' if op.get_bind().dialect.name == 'sqlite' else 'true'
+    where = sa.text(f'is_active = {true} AND expires_at IS NOT NULL')
+    op.create_index('ix_subs_active_expiry', 'user_subscriptions', ['expires_at'],
+                    postgresql_where=where, sqlite_where=where)
+    for col in _TOKEN_COLS:
+        op.create_index(f'ix_users_{col}', 'users', [col],
+                        postgresql_where=sa.text(f'{col} IS NOT NULL'),
+                        sqlite_where=sa.text(f'{col} IS NOT NULL'))
+
+
+def downgrade():
+    for col in _TOKEN_COLS:
+        op.drop_index(f'ix_users_{col}', table_name='users')
+    op.drop_index('ix_subs_active_expiry', table_name='user_subscriptions')
@@ -0,0 +1,54 @@
+"""read watermarks: per-participant last_read_id on conversations
+
+messages.is_read is kept (no longer written) so older app builds and any
+ad-hoc reporting keep working; the API derives is_read from the watermark.
+
+Revision ID: d6e7f8a9b0c1
+Revises: c5d6e7f8a9b0
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd6e7f8a9b0c1'
+down_revision = 'c5d6e7f8a9b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_read_id_user1', sa.Integer(), nullable=False,
+                                      server_default='0'))
+        batch_op.add_column(sa.Column('last_read_id_user2', sa.Integer(), nullable=False,
+                                      server_default='0'))
+
+    # Watermark = highest message from the other participant already flagged read
+    op.execute("""
+        UPDATE conversations SET
+            last_read_id_user1 = COALESCE((
+                SELECT MAX(m.id) FROM messages m
+                WHERE m.conversation_id = conversations.id
+                  AND m.sender_id != conversations.user1_id
+                  AND m.is_read = TRUE), 0),
+            last_read_id_user2 = COALESCE((
+                SELECT MAX(m.id) FROM messages m
+                WHERE m.conversation_id = conversations.id
+                  AND m.sender_id != conversations.user2_id
+                  AND m.is_read = TRUE), 0)
+    """)
+
+
+def downgrade():
+    # Re-materialise is_read from the watermarks before dropping them
+    op.execute("""
+        UPDATE messages SET is_read = TRUE
+        WHERE is_read = FALSE AND EXISTS (
+            SELECT 1 FROM conversations c
+            WHERE c.id = messages.conversation_id
+              AND ((messages.sender_id = c.user2_id AND messages.id <= c.last_read_id_user1)
+                OR (messages.sender_id = c.user1_id AND messages.id <= c.last_read_id_user2)))
+    """)
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_column('last_read_id_user2')
+        batch_op.drop_column('last_read_id_user1')
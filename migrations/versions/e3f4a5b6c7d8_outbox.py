@@ -0,0 +1,35 @@
+"""outbox: side-effect tasks written in the business transaction
+
+Revision ID: e3f4a5b6c7d8
+Revises: d2e3f4a5b6c7
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e3f4a5b6c7d8'
+down_revision = 'd2e3f4a5b6c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task', sa.String(length=80), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('dispatched_at', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_outbox_unprocessed', 'outbox', ['id'],
+                    postgresql_where=sa.text('processed_at IS NULL'),
+                    sqlite_where=sa.text('processed_at IS NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_outbox_unprocessed', table_name='outbox')
+    op.drop_table('outbox')
@@ -0,0 +1,21 @@
+"""messages: composite (conversation_id, id) index for keyset history pagination
+
+Revision ID: e7f8a9b0c1d2
+Revises: d6e7f8a9b0c1
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e7f8a9b0c1d2'
+down_revision = 'd6e7f8a9b0c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_messages_conv_id', 'messages', ['conversation_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_messages_conv_id', table_name='messages')
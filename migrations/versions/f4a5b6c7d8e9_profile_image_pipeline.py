@@ -0,0 +1,26 @@
+"""profile_images: original_url + status for the async resize pipeline
+
+Revision ID: f4a5b6c7d8e9
+Revises: e3f4a5b6c7d8
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'f4a5b6c7d8e9'
+down_revision = 'e3f4a5b6c7d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('profile_images') as batch_op:
+        batch_op.add_column(sa.Column('original_url', sa.String(length=500), nullable=True))
+        batch_op.add_column(sa.Column('status', sa.String(length=12), nullable=False,
+                                      server_default='ready'))
+
+
+def downgrade():
+    with op.batch_alter_table('profile_images') as batch_op:
+        batch_op.drop_column('status')
+        batch_op.drop_column('original_url')
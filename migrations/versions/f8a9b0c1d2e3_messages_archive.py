@@ -0,0 +1,66 @@
+"""messages_archive: cold storage for old messages of fully-read conversations
+
+On PostgreSQL the table is range-partitioned by month on sent_at (primary key
+(id, sent_at), as partitioning requires). Monthly partitions are created on
+demand by app.messaging.service.archive_old_messages(); the DEFAULT partition
+only exists so an insert can never fail for want of one.
+
+Revision ID: f8a9b0c1d2e3
+Revises: e7f8a9b0c1d2
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'f8a9b0c1d2e3'
+down_revision = 'e7f8a9b0c1d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""
+            CREATE TABLE messages_archive (
+                id                     INTEGER   NOT NULL,
+                conversation_id        INTEGER   NOT NULL REFERENCES conversations (id),
+                sender_id              INTEGER   NOT NULL REFERENCES users (id),
+                body                   TEXT      NOT NULL,
+                sent_at                TIMESTAMP NOT NULL,
+                is_deleted_by_sender   BOOLEAN   NOT NULL DEFAULT false,
+                is_deleted_by_receiver BOOLEAN   NOT NULL DEFAULT false,
+                archived_at            TIMESTAMP NOT NULL,
+                PRIMARY KEY (id, sent_at)
+            ) PARTITION BY RANGE (sent_at)
+        """)
+        op.execute('CREATE TABLE messages_archive_default PARTITION OF messages_archive DEFAULT')
+    else:
+        op.create_table(
+            'messages_archive',
+            sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('conversation_id', sa.Integer(), nullable=False),
+            sa.Column('sender_id', sa.Integer(), nullable=False),
+            sa.Column('body', sa.Text(), nullable=False),
+            sa.Column('sent_at', sa.DateTime(), nullable=False),
+            sa.Column('is_deleted_by_sender', sa.Boolean(), nullable=False, server_default=sa.false()),
+            sa.Column('is_deleted_by_receiver', sa.Boolean(), nullable=False, server_default=sa.false()),
+            sa.Column('archived_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id']),
+            sa.ForeignKeyConstraint(['sender_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    op.create_index('ix_messages_archive_conv_id', 'messages_archive',
+                    ['conversation_id', 'id'])
+
+
+def downgrade():
+    # Move everything back into the hot table before dropping the archive
+    op.execute("""
+        INSERT INTO messages (id, conversation_id, sender_id, body, is_read, sent_at,
+                              is_deleted_by_sender, is_deleted_by_receiver)
+        SELECT id, conversation_id, sender_id, body, true, sent_at,
+               is_deleted_by_sender, is_deleted_by_receiver
+        FROM messages_archive
+    """)
+    op.drop_index('ix_messages_archive_conv_id', table_name='messages_archive')
+    op.drop_table('messages_archive')   # drops all partitions on PostgreSQL
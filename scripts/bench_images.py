@@ -0,0 +1,101 @@
+"""
+bench_images.py — Profile photo processing cost, old vs new, on local disk.
+
+For `--photos` synthetic camera-sized JPEGs (default 4032×3024):
+
+  old        — verify + reopen + three copy/crop/resize/encode passes
+               (the former in-request upload_image_to_s3), JPEG only
+  pipeline   — app.images._derivatives(): one draft() decode, one crop,
+               800 → 400 → 150 cascade, JPEG + WebP
+  on-demand  — a size that was never pre-generated, as the uploads worker
+               makes it (app.images.make_derivative): read the original,
+               resize, encode, store
+
+Loads app/images.py and app/storage.py on their own (stdlib-only module
+imports) with a LocalBackend in a temp dir — no Flask, AWS or network.
+Needs Pillow:
+    python scripts/bench_images.py [--photos 10] [--width 96]
+"""
+import argparse, importlib.util, io, os, tempfile, time
+
+_here = os.path.dirname(os.path.abspath(__file__))
+
+
+def _load(name):
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(_here, '..', 'app', f'{name}.py'))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+images  = _load('images')
+storage = _load('storage')
+
+
+def photo(seed, size=(4032, 3024)):
+    from PIL import Image
+    img = Image.effect_noise(size, 40 + seed).convert('RGB')
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=92)
+    return buf.getvalue()
+
+
+def old_way(raw):
+    from PIL import Image
+    image = Image.open(io.BytesIO(raw))
+    image.verify()
+    image = Image.open(io.BytesIO(raw))
+    out = []
+    for size in (800, 400, 150):
+        img = image.copy()
+        w, h = img.size
+        m = min(w, h)
+        img = img.crop(((w - m) // 2, (h - m) // 2, (w - m) // 2 + m, (h - m) // 2 + m))
+        img = img.resize((size, size))
+        buf = io.BytesIO()
+        img.convert('RGB').save(buf, 'JPEG', quality=85, optimize=True)
+        out.append(buf.getvalue())
+    return out
+
+
+def on_demand(store, key, width, fmt='webp'):
+    img = images._square(store.get(key), width)
+    out = f"{key.rsplit('_o.', 1)[0]}_w{width}.{images.ENCODERS[fmt][0]}"
+    store.put(out, images._encode(images._resize(img, width), fmt), images.ENCODERS[fmt][1])
+    return out
+
+
+def timed(fn, items):
+    t = time.perf_counter()
+    for it in items:
+        fn(it)
+    return (time.perf_counter() - t) * 1000 / len(items)
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--photos', type=int, default=10)
+    ap.add_argument('--width',  type=int, default=96)
+    a = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = storage.LocalBackend(os.path.join(tmp, 'media'))
+        raws  = [photo(i) for i in range(a.photos)]
+        keys  = []
+        for i, raw in enumerate(raws):
+            keys.append(f'profiles/{i}/bench_o.jpg')
+            store.put(keys[-1], raw, 'image/jpeg')
+
+        print(f'{a.photos} photos, 4032×3024 JPEG\n')
+        print(f'old (3× JPEG)         {timed(old_way, raws):8.1f} ms / photo')
+        print(f'pipeline (JPEG+WebP)  '
+              f'{timed(lambda r: images._derivatives(r, ["jpeg", "webp"]), raws):8.1f} ms / photo')
+        width = images.snap_width(a.width)
+        print(f'on-demand {width}px webp  '
+              f'{timed(lambda k: on_demand(store, k, width), keys):8.1f} ms / photo (worker)')
+
+        sizes = images._derivatives(raws[0], ['jpeg', 'webp'])
+        print('\nbytes per variant (photo 0):')
+        for w, fmt, data in sizes:
+            print(f'  {w:4}px {fmt:5} {len(data):8,}')
@@ -0,0 +1,65 @@
+"""
+bench_mail.py — Digest email throughput: one API call per email vs bulk.
+
+Renders a synthetic daily-digest run through app.mail.FileBackend (writes to
+a temp outbox) with a simulated per-API-call latency:
+
+  per-email  — render + one send() per recipient (old send_email path)
+  bulk       — send_bulk(): BULK_MAX recipients per call
+
+Loads app/mail.py on its own (stdlib-only module imports), so no Flask,
+AWS or database is needed:
+    python scripts/bench_mail.py [--recipients 5000] [--latency 0.05]
+"""
+import argparse, importlib.util, os, tempfile, time
+
+_here = os.path.dirname(os.path.abspath(__file__))
+_spec = importlib.util.spec_from_file_location(
+    'mail', os.path.join(_here, '..', 'app', 'mail.py'))
+mail  = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(mail)
+
+
+def recipients(n):
+    return [(f'user{i}@example.com',
+             {'first_name': f'User{i}',
+              'matches': [{'id': i * 10 + k, 'name': f'Match{k} K.'} for k in range(3)]})
+            for i in range(n)]
+
+
+def bench_single(rows, backend):
+    t = time.perf_counter()
+    for to, data in rows:
+        backend.send(to, *mail.render('daily_digest', data))
+    return time.perf_counter() - t, len(rows)
+
+
+def bench_bulk(rows, backend):
+    mail.set_backend(backend)
+    t = time.perf_counter()
+    stats = mail.send_bulk('daily_digest', rows)
+    return time.perf_counter() - t, stats['requests']
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--recipients', type=int,   default=5_000)
+    ap.add_argument('--latency',    type=float, default=0.05,
+                    help='simulated seconds per API call')
+    args = ap.parse_args()
+
+    rows = recipients(args.recipients)
+    print(f'\n{len(rows):,} digest emails, {args.latency * 1000:.0f} ms/API call\n')
+    with tempfile.TemporaryDirectory() as d:
+        single_t, single_req = bench_single(rows, mail.FileBackend(d, latency=args.latency))
+        bulk_t,   bulk_req   = bench_bulk(rows, mail.FileBackend(d, latency=args.latency))
+
+    print(f'  per-email (1 call / email) : {single_req:7,d} calls  '
+          f'{single_t:7.1f} s  {len(rows) / single_t:8,.0f} emails/s')
+    print(f'  bulk ({mail.BULK_MAX} / call)           : {bulk_req:7,d} calls  '
+          f'{bulk_t:7.1f} s  {len(rows) / bulk_t:8,.0f} emails/s')
+    print(f'  speed-up                   : {single_t / bulk_t:7.1f}×')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+bench_message_history.py — Compare old vs keyset message-history pagination.
+
+Builds a throwaway SQLite database with one 50,000-message conversation
+(plus background noise from other conversations) and times paging through
+the newest N pages with:
+
+  old     — ORDER BY sent_at pivot lookup + separate COUNT for has_more,
+            no composite index (what get_messages() used to do)
+  keyset  — WHERE conversation_id = ? AND id < ? ORDER BY id DESC LIMIT n+1
+            on ix_messages_conv_id, soft-delete filtered in SQL
+
+Stdlib only — runs anywhere:
+    python scripts/bench_message_history.py [--messages 50000] [--pages 50]
+"""
+import argparse, os, random, sqlite3, tempfile, time
+from datetime import datetime, timedelta
+
+SCHEMA = """
+CREATE TABLE messages (
+    id INTEGER PRIMARY KEY,
+    conversation_id INTEGER NOT NULL,
+    sender_id INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    is_read BOOLEAN DEFAULT 0,
+    sent_at DATETIME NOT NULL,
+    is_deleted_by_sender BOOLEAN NOT NULL DEFAULT 0,
+    is_deleted_by_receiver BOOLEAN NOT NULL DEFAULT 0
+);
+"""
+
+OLD_PAGE = """
+SELECT * FROM messages WHERE conversation_id = ? {pivot}
+ORDER BY sent_at DESC LIMIT ?
+"""
+OLD_HAS_MORE = "SELECT COUNT(*) FROM messages WHERE conversation_id = ? AND sent_at < ?"
+
+KEYSET_PAGE = """
+SELECT * FROM messages
+WHERE conversation_id = ? {before}
+  AND ((sender_id = ? AND is_deleted_by_sender = 0)
+    OR (sender_id != ? AND is_deleted_by_receiver = 0))
+ORDER BY id DESC LIMIT ?
+"""
+
+
+def build(path, n_messages, noise_convs=200):
+    con = sqlite3.connect(path)
+    con.executescript(SCHEMA)
+    start = datetime(2026, 1, 1)
+    rows  = []
+    # Interleave the hot conversation with noise so its rows aren't contiguous
+    for i in range(n_messages):
+        rows.append((1, random.choice((10, 11)), f'msg {i}',
+                     (start + timedelta(seconds=i)).isoformat(sep=' '),
+                     int(random.random() < 0.02), int(random.random() < 0.02)))
+        if i % 5 == 0:
+            c = random.randint(2, noise_convs + 1)
+            rows.append((c, c * 2, 'noise', (start + timedelta(seconds=i)).isoformat(sep=' '), 0, 0))
+    con.executemany(
+        'INSERT INTO messages (conversation_id, sender_id, body, sent_at, '
+        'is_deleted_by_sender, is_deleted_by_receiver) VALUES (?,?,?,?,?,?)', rows)
+    con.commit()
+    return con
+
+
+def bench_old(con, pages, per):
+    q = 0
+    t = time.perf_counter()
+    pivot_sent = None
+    for _ in range(pages):
+        if pivot_sent:
+            rows = con.execute(OLD_PAGE.format(pivot='AND sent_at < ?'),
+                               (1, pivot_sent, per)).fetchall()
+        else:
+            rows = con.execute(OLD_PAGE.format(pivot=''), (1, per)).fetchall()
+        q += 1
+        if not rows:
+            break
+        # web page used to filter soft-deletes in Python after loading rows
+        rows = [r for r in rows if not (r[2] == 10 and r[6]) and not (r[2] != 10 and r[7])]
+        oldest = min(r[5] for r in rows) if rows else pivot_sent
+        con.execute(OLD_HAS_MORE, (1, oldest)).fetchone()
+        q += 1
+        pivot_sent = oldest
+    return time.perf_counter() - t, q
+
+
+def bench_keyset(con, pages, per):
+    q = 0
+    t = time.perf_counter()
+    before = None
+    for _ in range(pages):
+        if before:
+            rows = con.execute(KEYSET_PAGE.format(before='AND id < ?'),
+                               (1, before, 10, 10, per + 1)).fetchall()
+        else:
+            rows = con.execute(KEYSET_PAGE.format(before=''),
+                               (1, 10, 10, per + 1)).fetchall()
+        q += 1
+        has_more = len(rows) > per
+        rows = rows[:per]
+        if not rows or not has_more:
+            break
+        before = rows[-1][0]
+    return time.perf_counter() - t, q
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--messages', type=int, default=50_000)
+    ap.add_argument('--pages',    type=int, default=50)
+    ap.add_argument('--per-page', type=int, default=30)
+    args = ap.parse_args()
+
+    random.seed(42)
+    with tempfile.TemporaryDirectory() as d:
+        con = build(os.path.join(d, 'bench.db'), args.messages)
+        total = con.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+        print(f'\n{args.messages:,} messages in conversation 1 ({total:,} rows total), '
+              f'{args.pages} pages × {args.per_page}\n')
+
+        old_t, old_q = bench_old(con, args.pages, args.per_page)
+        con.execute('CREATE INDEX ix_messages_conv_id ON messages (conversation_id, id)')
+        con.execute('ANALYZE')
+        new_t, new_q = bench_keyset(con, args.pages, args.per_page)
+
+        plan = con.execute('EXPLAIN QUERY PLAN ' + KEYSET_PAGE.format(before='AND id < ?'),
+                           (1, 1000, 10, 10, 31)).fetchall()
+        print(f'  old (sent_at pivot + COUNT) : {old_t * 1000:8.1f} ms  {old_q:4d} queries')
+        print(f'  keyset (conv_id, id)        : {new_t * 1000:8.1f} ms  {new_q:4d} queries')
+        if new_t:
+            print(f'  speed-up                    : {old_t / new_t:8.1f}×')
+        print('\n  keyset plan: ' + ' | '.join(str(r[-1]) for r in plan))
+        con.close()
+
+
+if __name__ == '__main__':
+    main()
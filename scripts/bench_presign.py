@@ -0,0 +1,75 @@
+"""
+bench_presign.py — Cost of signing a feed page's photo URLs.
+
+Three ways to sign the URLs of `--cards` profile cards, `--renders` times:
+
+  per-url client  — boto3.client('s3') + generate_presigned_url per image
+                    (the old get_signed_image_url)
+  shared client   — one client, one signature per image per render
+  memoized        — app.s3.presign(): shared client + LRU per expiry window
+
+Loads app/s3.py on its own (stdlib-only module imports) and passes bucket and
+region explicitly, so no Flask app is needed. Signing is local — dummy
+credentials are set and no request reaches AWS. Needs boto3:
+    python scripts/bench_presign.py [--cards 24] [--renders 50]
+"""
+import argparse, importlib.util, os, time
+
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'AKIABENCHMARK0000000')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'bench' * 8)
+
+_here = os.path.dirname(os.path.abspath(__file__))
+_spec = importlib.util.spec_from_file_location(
+    's3', os.path.join(_here, '..', 'app', 's3.py'))
+s3    = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(s3)
+
+BUCKET, REGION = 'bench-bucket', 'ap-south-1'
+
+
+def keys(n):
+    return [f'profiles/{i}/{i:032x}_c.jpg' for i in range(n)]
+
+
+def per_url_client(ks, renders):
+    import boto3
+    t = time.perf_counter()
+    for _ in range(renders):
+        for k in ks:
+            boto3.client('s3', region_name=REGION).generate_presigned_url(
+                'get_object', Params={'Bucket': BUCKET, 'Key': k}, ExpiresIn=3600)
+    return time.perf_counter() - t
+
+
+def shared_client(ks, renders):
+    client = s3.get_client(REGION)
+    t = time.perf_counter()
+    for _ in range(renders):
+        for k in ks:
+            client.generate_presigned_url(
+                'get_object', Params={'Bucket': BUCKET, 'Key': k}, ExpiresIn=3600)
+    return time.perf_counter() - t
+
+
+def memoized(ks, renders):
+    s3.get_client(REGION)                    # built once per process, not per render
+    t = time.perf_counter()
+    for _ in range(renders):
+        for k in ks:
+            s3.presign(k, 3600, BUCKET, REGION)
+    return time.perf_counter() - t
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--cards',   type=int, default=24)
+    ap.add_argument('--renders', type=int, default=50)
+    a  = ap.parse_args()
+    ks = keys(a.cards)
+    print(f'{a.cards} cards × {a.renders} renders\n')
+    for name, fn in (('per-url client', per_url_client),
+                     ('shared client', shared_client),
+                     ('memoized', memoized)):
+        secs = fn(ks, a.renders)
+        print(f'{name:16} {secs * 1000 / a.renders:9.2f} ms / render')
+    print(f'\n{s3.cache_info()}')
@@ -0,0 +1,87 @@
+"""
+bench_push.py — Push delivery throughput per worker: naive vs batched.
+
+Generates a synthetic pending-notification backlog (personal notifications
+for a slice of users plus one system broadcast to everyone) and delivers it
+through app.push.StubTransport with a simulated per-request latency:
+
+  naive    — one request per notification per device token
+  batched  — app.push.collapse() + build_batches(): one push per user,
+             identical payloads merged, ≤500 tokens per multicast request
+
+Loads app/push.py on its own (stdlib-only module imports), so no database,
+Flask or Redis is needed:
+    python scripts/bench_push.py [--users 20000] [--latency 0.03]
+"""
+import argparse, importlib.util, os, random, time
+
+_here = os.path.dirname(os.path.abspath(__file__))
+_spec = importlib.util.spec_from_file_location(
+    'push', os.path.join(_here, '..', 'app', 'push.py'))
+push  = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(push)
+
+
+def backlog(n_users, active_share=0.2):
+    rows, nid = [], 0
+    for uid in range(1, n_users + 1):
+        if random.random() < active_share:
+            for _ in range(random.randint(1, 6)):
+                nid += 1
+                rows.append((nid, uid, f'User {random.randint(1, 999)} viewed your profile.', '/x'))
+    for uid in range(1, n_users + 1):
+        nid += 1
+        rows.append((nid, uid, 'Diwali offer: 30% off Gold this week!', '/plans'))
+    rows.sort()
+    tokens = {uid: [f'tok-{uid}-{d}' for d in range(random.choice((1, 1, 1, 2, 3)))]
+              for uid in range(1, n_users + 1)}
+    return rows, tokens
+
+
+def bench_naive(rows, tokens, transport):
+    t = time.perf_counter()
+    for _id, uid, message, link in rows:
+        for tok in tokens.get(uid, ()):
+            transport.send_multicast([tok], {'title': push.APP_TITLE, 'body': message,
+                                             'link': link, 'count': 1})
+    return time.perf_counter() - t, len(transport.sent)
+
+
+def bench_batched(rows, tokens, transport):
+    t = time.perf_counter()
+    batches = push.build_batches(push.collapse(rows), tokens, transport.max_batch)
+    requests, _delivered, _invalid = push.deliver(batches, transport)
+    return time.perf_counter() - t, requests
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--users',   type=int,   default=20_000)
+    ap.add_argument('--latency', type=float, default=0.03,
+                    help='simulated seconds per transport request')
+    ap.add_argument('--naive-sample', type=int, default=2_000,
+                    help='naive run is timed on this many notifications and extrapolated')
+    args = ap.parse_args()
+
+    random.seed(7)
+    rows, tokens = backlog(args.users)
+    n_tokens = sum(len(v) for v in tokens.values())
+    print(f'\n{len(rows):,} pending notifications, {args.users:,} users, '
+          f'{n_tokens:,} device tokens, {args.latency * 1000:.0f} ms/request\n')
+
+    sample = rows[:args.naive_sample]
+    naive_t, naive_req = bench_naive(sample, tokens, push.StubTransport(latency=args.latency))
+    scale  = len(rows) / len(sample)
+    naive_t, naive_req = naive_t * scale, int(naive_req * scale)
+
+    batched_t, batched_req = bench_batched(rows, tokens, push.StubTransport(latency=args.latency))
+
+    print(f'  naive   (1 req / notif / token) : {naive_req:8,d} requests  '
+          f'{naive_t:8.1f} s  {len(rows) / naive_t:9,.0f} notif/s  (extrapolated)')
+    print(f'  batched (collapse + multicast)  : {batched_req:8,d} requests  '
+          f'{batched_t:8.1f} s  {len(rows) / batched_t:9,.0f} notif/s')
+    print(f'  speed-up                        : {naive_t / batched_t:8.1f}×')
+
+
+if __name__ == '__main__':
+    main()